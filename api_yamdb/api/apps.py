@@ -3,3 +3,10 @@ from django.apps import AppConfig
 
 class ApiConfig(AppConfig):
     name = 'api'
+
+    def ready(self):
+        from reviews.signals import data_changed
+
+        from .caching import invalidate_model
+
+        data_changed.connect(invalidate_model)
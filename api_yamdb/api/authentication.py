@@ -0,0 +1,65 @@
+"""Аутентификация по JWT без запроса пользователя к базе.
+
+Токены, выданные RequestTokenView, содержат имя, роль и is_staff
+пользователя. Если включен JWT_STATELESS_AUTH, пользователь запроса
+восстанавливается из этих утверждений (reviews.models.TokenUser). Чтобы
+смена роли или имени, блокировка и удаление пользователя действовали
+сразу, утверждения сверяются с текущим состоянием пользователя, которое
+хранится в кэше JWT_USER_STATE_TIMEOUT секунд и сбрасывается при
+изменении пользователя через API. Не совпавший с ним токен отклоняется.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt import authentication
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from reviews.models import TokenUser, User
+
+USER_STATE_KEY = 'auth:user-state:{}'
+CLAIMS = ('username', 'role', 'is_staff')
+STALE_TOKEN_ERROR = 'Данные пользователя изменились, получите новый токен'
+
+
+def get_tokens_for_user(user):
+    refresh = RefreshToken.for_user(user)
+    for claim in CLAIMS:
+        refresh[claim] = getattr(user, claim)
+    return refresh
+
+
+def get_user_state(user_id):
+    """Имя, роль и is_staff активного пользователя или пустой список."""
+    key = USER_STATE_KEY.format(user_id)
+    state = cache.get(key)
+    if state is None:
+        state = list(
+            User.objects.filter(pk=user_id, is_active=True)
+            .values_list(*CLAIMS).first() or ()
+        )
+        cache.set(key, state, settings.JWT_USER_STATE_TIMEOUT)
+    return state
+
+
+def forget_user(user_id):
+    """Сбрасывает состояние пользователя после фиксации транзакции."""
+    transaction.on_commit(
+        lambda: cache.delete(USER_STATE_KEY.format(user_id))
+    )
+
+
+class JWTAuthentication(authentication.JWTAuthentication):
+
+    def get_user(self, validated_token):
+        if not settings.JWT_STATELESS_AUTH or any(
+            claim not in validated_token for claim in CLAIMS
+        ):
+            return super().get_user(validated_token)
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+        claims = [validated_token[claim] for claim in CLAIMS]
+        if get_user_state(user_id) != claims:
+            raise AuthenticationFailed(
+                STALE_TOKEN_ERROR, code='token_not_valid'
+            )
+        return TokenUser(id=user_id, **dict(zip(CLAIMS, claims)))
@@ -0,0 +1,180 @@
+"""Массовое создание и изменение объектов справочников и произведений.
+
+POST .../bulk/ создает, PATCH .../bulk/ изменяет объекты из JSON-массива
+или NDJSON (по объекту в строке). Каждый объект проверяется отдельно, а
+запросы к базе выполняются для всей пачки сразу: корректные объекты
+сохраняются, по остальным в ответе возвращаются ошибки с номером объекта.
+"""
+import json
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ParseError, ValidationError
+from rest_framework.parsers import BaseParser
+from rest_framework.response import Response
+
+from . import permissions
+from .parsers import FastJSONParser
+
+NOT_A_LIST_ERROR = 'Ожидается список объектов'
+NOT_AN_OBJECT_ERROR = 'Ожидается объект'
+TOO_MANY_ITEMS_ERROR = 'Можно передать не больше {} объектов'
+LINE_ERROR = 'Строка {}: {}'
+LOOKUP_REQUIRED_ERROR = 'Обязательное поле.'
+NOT_FOUND_ERROR = 'Объект не найден.'
+EXISTS_ERROR = 'Объект с таким {} уже существует.'
+SLUG_NOT_FOUND_ERROR = 'Объект с slug={} не существует.'
+DUPLICATE_ERROR = 'Повторяется в запросе.'
+
+
+class NDJSONParser(BaseParser):
+    """Построчный JSON: каждая непустая строка - отдельный объект."""
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        items = []
+        for number, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                items.append(json.loads(line.decode(encoding)))
+            except ValueError as err:
+                raise ParseError(LINE_ERROR.format(number, err))
+        return items
+
+
+class BulkWriteMixin:
+    """Действие bulk вьюсета.
+
+    bulk_serializer_class проверяет отдельный объект, bulk_lookup -
+    уникальное поле, по которому находятся изменяемые объекты.
+    bulk_create_objects и bulk_update_objects получают словарь
+    {номер: проверенные данные}, дополняют словарь ошибок и возвращают
+    {номер: сохраненный объект}. По умолчанию они сохраняют простые поля
+    модели вьюсета; вьюсет со связями переопределяет их.
+    """
+    bulk_serializer_class = None
+    bulk_lookup = 'slug'
+
+    def get_bulk_items(self, request):
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError({'detail': NOT_A_LIST_ERROR})
+        if len(items) > settings.API_BULK_MAX_ITEMS:
+            raise ValidationError({
+                'detail': TOO_MANY_ITEMS_ERROR.format(
+                    settings.API_BULK_MAX_ITEMS
+                )
+            })
+        return items
+
+    def validate_bulk_items(self, items, partial):
+        valid, errors = {}, {}
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                errors[index] = {'detail': [NOT_AN_OBJECT_ERROR]}
+                continue
+            serializer = self.bulk_serializer_class(
+                data=item, partial=partial,
+                context=self.get_serializer_context()
+            )
+            if not serializer.is_valid():
+                errors[index] = serializer.errors
+            elif partial and self.bulk_lookup not in serializer.validated_data:
+                errors[index] = {self.bulk_lookup: [LOOKUP_REQUIRED_ERROR]}
+            else:
+                valid[index] = serializer.validated_data
+        return valid, errors
+
+    def pop_duplicates(self, valid, errors, key):
+        """Убирает объекты, значение key которых уже встречалось."""
+        seen = set()
+        for index, data in list(valid.items()):
+            if data[key] in seen:
+                errors[index] = {key: [DUPLICATE_ERROR]}
+                del valid[index]
+            seen.add(data[key])
+
+    def bulk_create_objects(self, valid, errors):
+        """Создает объекты модели вьюсета без связей многие-ко-многим.
+
+        Объекты, значение bulk_lookup которых уже занято, попадают в errors.
+        """
+        model = self.queryset.model
+        lookup = self.bulk_lookup
+        self.pop_duplicates(valid, errors, lookup)
+        existing = set(
+            model.objects.filter(**{
+                lookup + '__in': [data[lookup] for data in valid.values()]
+            }).values_list(lookup, flat=True)
+        )
+        objects = {}
+        for index, data in valid.items():
+            if data[lookup] in existing:
+                errors[index] = {lookup: [EXISTS_ERROR.format(lookup)]}
+            else:
+                objects[index] = model(**data)
+        model.objects.bulk_create(objects.values())
+        return objects
+
+    def bulk_update_objects(self, valid, errors):
+        """Изменяет переданные поля объектов, найденных по bulk_lookup."""
+        model = self.queryset.model
+        lookup = self.bulk_lookup
+        self.pop_duplicates(valid, errors, lookup)
+        existing = model.objects.in_bulk(
+            [data[lookup] for data in valid.values()], field_name=lookup
+        )
+        objects, fields = {}, set()
+        for index, data in valid.items():
+            obj = existing.get(data[lookup])
+            if obj is None:
+                errors[index] = {lookup: [NOT_FOUND_ERROR]}
+                continue
+            for field, value in data.items():
+                if field != lookup:
+                    setattr(obj, field, value)
+                    fields.add(field)
+            objects[index] = obj
+        if fields:
+            model.objects.bulk_update(objects.values(), sorted(fields))
+        return objects
+
+    @action(
+        detail=False, methods=['post', 'patch'], url_path='bulk',
+        permission_classes=(permissions.IsAdmin,),
+        parser_classes=(FastJSONParser, NDJSONParser)
+    )
+    def bulk(self, request):
+        creating = request.method == 'POST'
+        valid, errors = self.validate_bulk_items(
+            self.get_bulk_items(request), partial=not creating
+        )
+        with transaction.atomic():
+            if creating:
+                saved = self.bulk_create_objects(valid, errors)
+            else:
+                saved = self.bulk_update_objects(valid, errors)
+            if saved:
+                self.invalidate_cache()
+        if errors and not saved:
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif creating:
+            response_status = status.HTTP_201_CREATED
+        else:
+            response_status = status.HTTP_200_OK
+        return Response({
+            'saved': [
+                {'index': index,
+                 self.bulk_lookup: getattr(obj, self.bulk_lookup)}
+                for index, obj in sorted(saved.items())
+            ],
+            'errors': [
+                {'index': index, 'errors': item_errors}
+                for index, item_errors in sorted(errors.items())
+            ],
+        }, status=response_status)
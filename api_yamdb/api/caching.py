@@ -0,0 +1,185 @@
+import time
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.response import Response
+from reviews import routers
+
+VERSION_KEY = 'api-cache:version:{}'
+MODIFIED_KEY = 'api-cache:modified:{}'
+RESPONSE_KEY = 'api-cache:{}:{}:{}'
+STATS_KEY = 'api-cache:{}:{}'
+CACHE_HEADER = 'X-Cache'
+# ответы о произведениях со статистикой (?stats=1)
+TITLE_STATS_NAMESPACE = 'title-stats'
+# пространства, которые устаревают вместе с данным: ответы со
+# статистикой включают и сами произведения
+DEPENDENT_NAMESPACES = {
+    'titles': (TITLE_STATS_NAMESPACE,),
+}
+# пространства ключей, устаревающие при изменении модели в обход API
+MODEL_NAMESPACES = {
+    # удаление произведения делает недействительными и его отзывы
+    'reviews.Title': ('titles', 'reviews'),
+    'reviews.TitleGenre': ('titles',),
+    'reviews.TitleStats': (TITLE_STATS_NAMESPACE,),
+    'reviews.Genre': ('genres', 'titles'),
+    'reviews.Category': ('categories', 'titles'),
+    # отзывы меняют рейтинг
+    'reviews.Review': ('reviews', 'titles'),
+    'reviews.Comment': ('comments', TITLE_STATS_NAMESPACE),
+    # имена авторов входят в отзывы и комментарии
+    'reviews.User': ('reviews', 'comments'),
+}
+
+
+def increment(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        return cache.incr(key)
+
+
+def get_version(namespace):
+    # начальная версия от времени, чтобы после вытеснения ключа из кэша
+    # не вернуться к версии, под которой лежат устаревшие ответы
+    return cache.get_or_set(
+        VERSION_KEY.format(namespace), lambda: int(time.time() * 1000), None
+    )
+
+
+def get_modified(namespace):
+    """Время последнего изменения пространства ключей.
+
+    Если отметка потеряна, считается, что изменение было только что.
+    """
+    return cache.get_or_set(MODIFIED_KEY.format(namespace), time.time, None)
+
+
+def invalidate(*namespaces):
+    """Сбрасывает закэшированные ответы после фиксации транзакции."""
+    namespaces = set(namespaces)
+    for namespace in list(namespaces):
+        namespaces.update(DEPENDENT_NAMESPACES.get(namespace, ()))
+
+    def bump():
+        for namespace in namespaces:
+            try:
+                cache.incr(VERSION_KEY.format(namespace))
+            except ValueError:
+                get_version(namespace)
+            cache.set(MODIFIED_KEY.format(namespace), time.time(), None)
+    transaction.on_commit(bump)
+
+
+def invalidate_model(sender, **kwargs):
+    """Получатель reviews.signals.data_changed."""
+    namespaces = MODEL_NAMESPACES.get(sender._meta.label)
+    if namespaces:
+        invalidate(*namespaces)
+
+
+def get_stats(namespace):
+    return {
+        event: cache.get(STATS_KEY.format(event, namespace), 0)
+        for event in ('hits', 'misses')
+    }
+
+
+def get_role(user):
+    if not user.is_authenticated:
+        return 'anonymous'
+    if user.is_staff:
+        return 'staff'
+    return user.role
+
+
+def get_signature(request, *values):
+    """Хэш пути, параметров запроса, роли и дополнительных значений."""
+    signature = '{}|{}|{}|{}'.format(
+        request.path, sorted(request.query_params.lists()),
+        get_role(request.user), values
+    )
+    return md5(signature.encode()).hexdigest()
+
+
+def get_response_key(request, namespace):
+    return RESPONSE_KEY.format(
+        namespace, get_version(namespace), get_signature(request)
+    )
+
+
+class CachedReadMixin:
+    """Кэширует list вьюсета, сбрасывая кэш при записи.
+
+    cache_namespace - пространство ключей вьюсета, invalidates -
+    пространства, устаревающие при его изменении. Ответы на чтение
+    кэшируются в пространстве get_cache_namespace.
+    """
+    cache_namespace = None
+    invalidates = ()
+
+    def get_cache_namespace(self):
+        return self.cache_namespace
+
+    def get_cached_response(self, request, action, *args, **kwargs):
+        timeout = settings.API_CACHE_TIMEOUT
+        if not timeout:
+            return action(request, *args, **kwargs)
+        namespace = self.get_cache_namespace()
+        key = get_response_key(request, namespace)
+        data = cache.get(key)
+        if data is not None:
+            increment(STATS_KEY.format('hits', namespace))
+            return Response(data, headers={CACHE_HEADER: 'HIT'})
+        increment(STATS_KEY.format('misses', namespace))
+        response = action(request, *args, **kwargs)
+        if response.status_code == 200 and not self.may_be_stale():
+            cache.set(key, response.data, timeout)
+        response[CACHE_HEADER] = 'MISS'
+        return response
+
+    def may_be_stale(self):
+        """Ответ прочитан с реплики, которая может еще не видеть записи.
+
+        Такой ответ не кэшируется под новой версией пространства ключей.
+        """
+        return routers.used_replica() and (
+            time.time() - get_modified(self.get_cache_namespace())
+            < settings.DB_REPLICA_PIN_SECONDS
+        )
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            request, super().list, *args, **kwargs
+        )
+
+    def invalidate_cache(self):
+        invalidate(self.cache_namespace, *self.invalidates)
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        self.invalidate_cache()
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        self.invalidate_cache()
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        self.invalidate_cache()
+
+
+class CachedRetrieveMixin(CachedReadMixin):
+    """Кэширует и retrieve.
+
+    Только для вьюсетов с retrieve: иначе роутер откроет адрес объекта.
+    """
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            request, super().retrieve, *args, **kwargs
+        )
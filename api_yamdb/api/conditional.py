@@ -0,0 +1,63 @@
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from . import caching
+
+
+class ConditionalGetMixin:
+    """Условные GET-запросы для list вьюсета.
+
+    ETag и Last-Modified строятся по версиям пространств кэша из
+    etag_namespaces (и дополнительным признакам из get_validators), а не по
+    телу ответа, поэтому ответ 304 отдается без выборки и сериализации.
+    """
+    etag_namespaces = ()
+
+    def get_etag_namespaces(self):
+        return self.etag_namespaces
+
+    def get_validators(self):
+        """Значения для ETag и время последнего изменения ответа."""
+        namespaces = self.get_etag_namespaces()
+        versions = [
+            caching.get_version(namespace) for namespace in namespaces
+        ]
+        modified = max(
+            (caching.get_modified(namespace) for namespace in namespaces),
+            default=None
+        )
+        return versions, modified
+
+    def get_conditional_response(self, request, action, *args, **kwargs):
+        values, modified = self.get_validators()
+        if modified is not None:
+            modified = int(modified)
+        etag = quote_etag(caching.get_signature(request, *values))
+        response = get_conditional_response(
+            request, etag=etag, last_modified=modified
+        )
+        if response is None:
+            response = action(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        response['ETag'] = etag
+        if modified is not None:
+            response['Last-Modified'] = http_date(modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.get_conditional_response(
+            request, super().list, *args, **kwargs
+        )
+
+
+class ConditionalRetrieveMixin(ConditionalGetMixin):
+    """Условные GET-запросы и для retrieve.
+
+    Только для вьюсетов с retrieve: иначе роутер откроет адрес объекта.
+    """
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_conditional_response(
+            request, super().retrieve, *args, **kwargs
+        )
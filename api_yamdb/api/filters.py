@@ -1,18 +1,66 @@
 import django_filters
-from reviews.models import Title
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from reviews.models import Category, Genre, Title
+
+from . import slugs
+
+SEARCH_CONFIG = 'russian'
+
+
+def search_supported():
+    return connection.vendor == 'postgresql'
 
 
 class TitleFilter(django_filters.FilterSet):
+    """Фильтр произведений.
+
+    name ищет подстроку (на PostgreSQL по триграммному индексу), category и
+    genre сравнивают slug целиком по id из api.slugs, без соединения со
+    справочниками, search - полнотекстовый поиск по названию и описанию с
+    сортировкой по релевантности.
+    """
     name = django_filters.CharFilter(
         lookup_expr='icontains'
     )
-    category = django_filters.CharFilter(
-        field_name='category__slug', lookup_expr='icontains'
-    )
-    genre = django_filters.CharFilter(
-        field_name='genre__slug', lookup_expr='icontains'
-    )
+    category = django_filters.CharFilter(method='filter_category')
+    genre = django_filters.CharFilter(method='filter_genre')
+    search = django_filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Title
-        fields = ('name', 'year', 'category', 'genre',)
+        fields = ('name', 'year', 'category', 'genre', 'search')
+
+    def filter_category(self, queryset, name, value):
+        category_id = slugs.get_id(Category, value)
+        if category_id is None:
+            return queryset.none()
+        return queryset.filter(category_id=category_id)
+
+    def filter_genre(self, queryset, name, value):
+        # пара (title, genre) уникальна, поэтому повторов строк нет
+        genre_id = slugs.get_id(Genre, value)
+        if genre_id is None:
+            return queryset.none()
+        return queryset.filter(genre=genre_id)
+
+    def filter_search(self, queryset, name, value):
+        if not search_supported():
+            # без полнотекстового поиска совпадение в названии важнее;
+            # LIKE в SQLite не различает регистр только для латиницы
+            return queryset.filter(
+                Q(name__icontains=value) | Q(description__icontains=value)
+            ).annotate(rank=Case(
+                When(name__icontains=value, then=Value(2)),
+                default=Value(1), output_field=IntegerField()
+            )).order_by('-rank', 'id')
+        vector = (
+            SearchVector('name', weight='A', config=SEARCH_CONFIG)
+            + SearchVector('description', weight='B', config=SEARCH_CONFIG)
+        )
+        query = SearchQuery(value, config=SEARCH_CONFIG)
+        return queryset.annotate(
+            search_vector=vector, rank=SearchRank(vector, query)
+        ).filter(search_vector=query).order_by('-rank', 'id')
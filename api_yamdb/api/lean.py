@@ -0,0 +1,123 @@
+"""Списки без сериализаторов DRF.
+
+Для списков произведений, отзывов и комментариев ответ собирается из
+строк .values() функциями, повторяющими вывод TitleSerializerRead,
+ReviewSerializer и CommentSerializer, без создания объектов моделей и
+полей сериализатора на каждую строку. Отключается API_LEAN_READS=false.
+"""
+from django.conf import settings
+from rest_framework import serializers
+from rest_framework.response import Response
+from reviews.models import TitleGenre
+
+DATETIME_FIELD = serializers.DateTimeField()
+
+
+class ValuesSerializer:
+    """Собирает ответ из строк queryset.values(*fields)."""
+    fields = ()
+
+    def __init__(self, context=None):
+        self.context = context or {}
+
+    def get_rows(self, queryset):
+        return queryset.prefetch_related(None).values(*self.fields)
+
+    def prefetch(self, rows):
+        """Загружает связанные данные для всех строк страницы сразу."""
+
+    def to_representation(self, row):
+        return {field: row[field] for field in self.fields}
+
+    def serialize(self, rows):
+        rows = list(rows)
+        self.prefetch(rows)
+        return [self.to_representation(row) for row in rows]
+
+
+class TitleValuesSerializer(ValuesSerializer):
+    """Вывод TitleSerializerRead без статистики."""
+    fields = (
+        'id', 'name', 'year', 'description', 'category__name',
+        'category__slug', 'rating_sum', 'rating_count',
+    )
+
+    def prefetch(self, rows):
+        self.genres = {row['id']: [] for row in rows}
+        links = TitleGenre.objects.filter(
+            title_id__in=self.genres
+        ).order_by('genre__name', 'genre_id').values_list(
+            'title_id', 'genre__name', 'genre__slug'
+        )
+        for title_id, name, slug in links:
+            self.genres[title_id].append({'name': name, 'slug': slug})
+
+    def to_representation(self, row):
+        category = None
+        if row['category__slug'] is not None:
+            category = {
+                'name': row['category__name'], 'slug': row['category__slug']
+            }
+        rating = None
+        if row['rating_count']:
+            rating = int(row['rating_sum'] / row['rating_count'])
+        return {
+            'id': row['id'],
+            'name': row['name'],
+            'year': row['year'],
+            'category': category,
+            'genre': self.genres[row['id']],
+            'description': row['description'],
+            'rating': rating,
+        }
+
+
+class ReviewValuesSerializer(ValuesSerializer):
+    """Вывод ReviewSerializer."""
+    fields = ('id', 'author__username', 'pub_date', 'text', 'score', 'title')
+
+    def to_representation(self, row):
+        return {
+            'id': row['id'],
+            'author': row['author__username'],
+            'pub_date': DATETIME_FIELD.to_representation(row['pub_date']),
+            'text': row['text'],
+            'score': row['score'],
+            'title': row['title'],
+        }
+
+
+class CommentValuesSerializer(ValuesSerializer):
+    """Вывод CommentSerializer."""
+    fields = ('id', 'author__username', 'pub_date', 'text', 'review')
+
+    def to_representation(self, row):
+        return {
+            'id': row['id'],
+            'author': row['author__username'],
+            'pub_date': DATETIME_FIELD.to_representation(row['pub_date']),
+            'text': row['text'],
+            'review': row['review'],
+        }
+
+
+class LeanListMixin:
+    """list вьюсета через values_serializer_class."""
+    values_serializer_class = None
+
+    def use_lean_list(self):
+        return settings.API_LEAN_READS
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_lean_list():
+            return super().list(request, *args, **kwargs)
+        serializer = self.values_serializer_class(
+            self.get_serializer_context()
+        )
+        rows = serializer.get_rows(
+            self.filter_queryset(self.get_queryset())
+        )
+        page = self.paginate_queryset(rows)
+        if page is None:
+            return Response(serializer.serialize(rows))
+        return self.get_paginated_response(serializer.serialize(page))
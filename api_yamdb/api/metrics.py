@@ -0,0 +1,143 @@
+"""Метрики запросов в формате Prometheus.
+
+Метрики копятся в памяти процесса и отдаются в текстовом формате
+экспозиции Prometheus, каждый процесс gunicorn считает свои запросы.
+Меткой view служит вьюсет и действие DRF (TitleViewSet.list), для
+остальных представлений - имя маршрута.
+"""
+import threading
+from bisect import bisect_left
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+QUERIES_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000)
+UNRESOLVED_VIEW = '<unresolved>'
+PREFIX = 'yamdb_'
+
+
+class Histogram:
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            yield name + '_bucket', {**labels, 'le': str(bound)}, cumulative
+        yield name + '_sum', labels, self.sum
+        yield name + '_count', labels, self.count
+
+
+# имя: (тип, описание, границы корзин гистограммы)
+METRICS = {
+    'requests_total': ('counter', 'Количество запросов', None),
+    'request_duration_seconds': (
+        'histogram', 'Время обработки запроса', DURATION_BUCKETS
+    ),
+    'request_sql_queries': (
+        'histogram', 'Количество SQL-запросов на запрос', QUERIES_BUCKETS
+    ),
+    'request_sql_seconds_total': (
+        'counter', 'Суммарное время SQL-запросов', None
+    ),
+    'response_size_bytes': ('histogram', 'Размер тела ответа', SIZE_BUCKETS),
+}
+
+
+class Registry:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.values = {name: {} for name in METRICS}
+
+    def increment(self, name, labels, value=1):
+        key = tuple(sorted(labels.items()))
+        self.values[name][key] = self.values[name].get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        key = tuple(sorted(labels.items()))
+        histograms = self.values[name]
+        if key not in histograms:
+            histograms[key] = Histogram(METRICS[name][2])
+        histograms[key].observe(value)
+
+    def record(self, view, method, status, duration, queries, sql_time,
+               size=None):
+        labels = {'view': view}
+        with self.lock:
+            self.increment('requests_total', {
+                **labels, 'method': method, 'status': str(status)
+            })
+            self.increment('request_sql_seconds_total', labels, sql_time)
+            self.observe('request_duration_seconds', labels, duration)
+            self.observe('request_sql_queries', labels, queries)
+            if size is not None:
+                self.observe('response_size_bytes', labels, size)
+
+    def samples(self, name):
+        samples = []
+        with self.lock:
+            for key, value in sorted(self.values[name].items()):
+                if isinstance(value, Histogram):
+                    samples.extend(value.samples(PREFIX + name, dict(key)))
+                else:
+                    samples.append((PREFIX + name, dict(key), value))
+        return samples
+
+
+registry = Registry()
+
+
+def escape(value):
+    return (
+        str(value).replace('\\', '\\\\').replace('"', '\\"')
+        .replace('\n', '\\n')
+    )
+
+
+def format_sample(name, labels, value):
+    if not labels:
+        return '{} {}'.format(name, value)
+    return '{}{{{}}} {}'.format(name, ','.join(
+        '{}="{}"'.format(label, escape(labels[label]))
+        for label in sorted(labels)
+    ), value)
+
+
+def render(metrics_registry=registry):
+    """Метрики в текстовом формате экспозиции Prometheus."""
+    lines = []
+    for name, (metric_type, help_text, _) in METRICS.items():
+        lines.append('# HELP {}{} {}'.format(PREFIX, name, help_text))
+        lines.append('# TYPE {}{} {}'.format(PREFIX, name, metric_type))
+        lines.extend(
+            format_sample(*sample)
+            for sample in metrics_registry.samples(name)
+        )
+    return '\n'.join(lines) + '\n'
+
+
+def get_view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return UNRESOLVED_VIEW
+    view_class = getattr(match.func, 'cls', None)
+    if view_class is None:
+        return match.view_name
+    actions = getattr(match.func, 'actions', None) or {}
+    action = actions.get(request.method.lower(), request.method.lower())
+    return '{}.{}'.format(view_class.__name__, action)
@@ -0,0 +1,116 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from reviews import routers
+
+from . import metrics
+
+logger = logging.getLogger('api.slow_requests')
+SLOW_REQUEST_MESSAGE = '{} {} ({}): {:.0f} мс, SQL-запросов: {}, {:.0f} мс'
+MAX_LOGGED_QUERIES = 100
+
+
+class QueryRecorder:
+    """Считает SQL-запросы и их время, при capture запоминает их текст."""
+
+    def __init__(self, capture=False):
+        self.capture = capture
+        self.count = 0
+        self.time = 0
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.time += duration
+            if self.capture and len(self.queries) < MAX_LOGGED_QUERIES:
+                self.queries.append((duration, sql))
+
+
+class ConnectionHealthCheckMiddleware:
+    """Проверяет соединения с базой, оставшиеся от прошлых запросов.
+
+    При CONN_MAX_AGE больше нуля соединение переживает запрос и могло быть
+    разорвано базой или пулером. Такое соединение закрывается до обработки
+    запроса, и запрос открывает новое, а не завершается ошибкой.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if settings.DB_CONN_HEALTH_CHECKS:
+            for connection in connections.all():
+                if (
+                    connection.connection is not None
+                    and not connection.in_atomic_block
+                    and not connection.is_usable()
+                ):
+                    connection.close()
+        return self.get_response(request)
+
+
+class ReplicaRoutingMiddleware:
+    """Передает запрос reviews.routers.ReplicaRouter."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routers.start_request(request)
+        try:
+            response = self.get_response(request)
+            routers.pin_writer(request, response)
+        finally:
+            routers.finish_request()
+        return response
+
+
+class InstrumentationMiddleware:
+    """Записывает в api.metrics время, SQL-запросы и размер ответа.
+
+    Запросы дольше SLOW_REQUEST_MS миллисекунд пишутся в лог
+    api.slow_requests вместе с выполненными SQL-запросами.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+        slow_ms = settings.SLOW_REQUEST_MS
+        recorder = QueryRecorder(capture=slow_ms > 0)
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+        view = metrics.get_view_name(request)
+        metrics.registry.record(
+            view, request.method, response.status_code, duration,
+            recorder.count, recorder.time,
+            None if response.streaming else len(response.content)
+        )
+        if slow_ms > 0 and duration * 1000 >= slow_ms:
+            self.log_slow_request(request, view, duration, recorder)
+        return response
+
+    def log_slow_request(self, request, view, duration, recorder):
+        logger.warning(
+            SLOW_REQUEST_MESSAGE.format(
+                request.method, request.get_full_path(), view,
+                duration * 1000, recorder.count, recorder.time * 1000
+            ) + ''.join(
+                '\n  {:.1f} мс: {}'.format(query_time * 1000, sql)
+                for query_time, sql in recorder.queries
+            )
+        )
@@ -0,0 +1,103 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+INVALID_CURSOR_ERROR = 'Неверный курсор'
+
+
+class KeysetPagination(BasePagination):
+    """Постраничный вывод по ключу (pub_date, id) без COUNT и OFFSET.
+
+    Курсор хранит ключ последней записи страницы, следующая страница
+    выбирается условием по индексу, поэтому стоимость не зависит от глубины.
+    """
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    ordering = ('-pub_date', '-id')
+
+    def encode_cursor(self, obj):
+        # страница из объектов моделей или из строк .values()
+        if isinstance(obj, dict):
+            pub_date, pk = obj['pub_date'], obj['id']
+        else:
+            pub_date, pk = obj.pub_date, obj.id
+        key = '{}|{}'.format(pub_date.isoformat(), pk)
+        return urlsafe_b64encode(key.encode()).decode()
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            pub_date, pk = urlsafe_b64decode(cursor.encode()).decode().split(
+                '|'
+            )
+            pub_date, pk = parse_datetime(pub_date), int(pk)
+        except (BinasciiError, UnicodeDecodeError, ValueError):
+            raise NotFound(INVALID_CURSOR_ERROR)
+        if pub_date is None:
+            raise NotFound(INVALID_CURSOR_ERROR)
+        return pub_date, pk
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            pub_date, pk = position
+            queryset = queryset.filter(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, id__lt=pk)
+            )
+        page = list(queryset[:self.page_size + 1])
+        self.has_next = len(page) > self.page_size
+        self.page = page[:self.page_size]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param,
+            self.encode_cursor(self.page[-1])
+        )
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+
+class FeedPagination(PageNumberPagination):
+    """Номера страниц по умолчанию, курсор - по выбору клиента.
+
+    Режим курсора включается параметром ?pagination=cursor, ссылки на
+    следующие страницы содержат ?cursor=.
+    """
+    mode_query_param = 'pagination'
+    cursor_mode = 'cursor'
+
+    def use_keyset(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == self.cursor_mode
+            or KeysetPagination.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.use_keyset(request):
+            self.keyset = KeysetPagination()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -7,7 +7,8 @@ class IsAuthorOrAdminOrModeratorOrReadonly(IsAuthenticatedOrReadOnly):
     def has_object_permission(self, request, view, obj):
         return (
             request.method in SAFE_METHODS
-            or obj.author == request.user
+            # сравнение ключей не загружает автора объекта
+            or obj.author_id == request.user.id
             or request.user.is_admin
             or request.user.is_moderator
         )
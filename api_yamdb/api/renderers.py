@@ -0,0 +1,70 @@
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer на orjson, без него - стандартный рендерер DRF.
+
+    Форматированный вывод (indent в Accept) тоже отдается стандартным
+    рендерером, типы, неизвестные orjson, переводятся кодировщиком DRF.
+    """
+    encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        if orjson is None or self.get_indent(
+            accepted_media_type, renderer_context
+        ):
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        # ошибки ListField и DictField приходят с ключами-номерами
+        return orjson.dumps(
+            data, default=self.encoder.default,
+            option=orjson.OPT_NON_STR_KEYS
+        )
+
+
+class StreamRenderer(BaseRenderer):
+    """Формат потоковой выгрузки.
+
+    Сами выгрузки отдаются StreamingHttpResponse, рендерер выбирает
+    формат по Accept или ?format= и выводит ответы об ошибках.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return json.dumps(data, ensure_ascii=False).encode() + b'\n'
+
+
+class NDJSONRenderer(StreamRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+class CSVRenderer(StreamRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class PrometheusRenderer(BaseRenderer):
+    """Текстовый формат экспозиции Prometheus, ошибки выводятся как JSON."""
+    media_type = 'text/plain'
+    format = 'prometheus'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, str):
+            return data.encode()
+        return StreamRenderer().render(data)
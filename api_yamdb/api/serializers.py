@@ -1,16 +1,29 @@
 from re import search
 
-from django.shortcuts import get_object_or_404
+from django.db import IntegrityError, transaction
+from django.utils.encoding import smart_str
 from rest_framework import serializers
 from rest_framework.relations import SlugRelatedField
+from rest_framework.settings import api_settings
 from rest_framework.validators import UniqueTogetherValidator
-from reviews.models import Category, Comment, Genre, Review, Title, User
+from reviews.models import (Category, Comment, Genre, Review, Title,
+                            TitleStats, User)
 from reviews.utils import get_current_year
 
+from . import slugs
+
 USER_ME_ERROR = 'Имя пользователя "me" зарезервировано!'
 USER_REGEXP_ERROR = 'Имя пользователя содержит запрещенные символы'
 YEAR_VALIDATION_ERROR = 'Год выпуска не может быть больше текущего!'
 REVIEW_VALIDATION_ERROR = 'Нельзя оставить повторный отзыв'
+STATS_PARAM = 'stats'
+
+
+def stats_requested(request):
+    """Нужна ли статистика в ответе о произведениях (?stats=1)."""
+    return request is not None and request.query_params.get(
+        STATS_PARAM, ''
+    ).lower() in ('1', 'true')
 
 
 class UserModelSerializer(serializers.ModelSerializer):
@@ -64,24 +77,98 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ('name', 'slug',)
 
 
+class GenresBulkSerializer(GenresSerializer):
+    """Жанр из пачки, уникальность slug проверяется для всей пачки."""
+
+    class Meta(GenresSerializer.Meta):
+        extra_kwargs = {'slug': {'validators': []}}
+
+
+class CategoryBulkSerializer(CategorySerializer):
+    """Категория из пачки, уникальность slug проверяется для всей пачки."""
+
+    class Meta(CategorySerializer.Meta):
+        extra_kwargs = {'slug': {'validators': []}}
+
+
+class TitleStatsSerializer(serializers.ModelSerializer):
+    scores = serializers.DictField(
+        source='histogram', child=serializers.IntegerField()
+    )
+
+    class Meta:
+        model = TitleStats
+        fields = ('reviews_count', 'comments_count', 'last_activity', 'scores')
+
+
 class TitleSerializerRead(serializers.ModelSerializer):
     category = CategorySerializer(required=True)
     genre = GenresSerializer(many=True, required=True,)
     rating = serializers.IntegerField()
+    stats = TitleStatsSerializer(source='get_stats', read_only=True)
 
     class Meta:
         model = Title
         fields = (
-            'id', 'name', 'year', 'category', 'genre', 'description', 'rating'
+            'id', 'name', 'year', 'category', 'genre', 'description',
+            'rating', 'stats'
         )
         read_only_fields = ('__all__',)
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if not stats_requested(self.context.get('request')):
+            self.fields.pop('stats')
+
+
+class CachedSlugRelatedField(SlugRelatedField):
+    """Находит жанр или категорию по слагу через api.slugs.
+
+    Возвращает несохраненный объект только с id и слагом: этого
+    достаточно для записи связей и для ответа.
+    """
+
+    def to_internal_value(self, data):
+        if not isinstance(data, (str, int)):
+            self.fail('invalid')
+        model = self.get_queryset().model
+        slug = str(data)
+        pk = slugs.get_id(model, slug)
+        if pk is None:
+            self.fail(
+                'does_not_exist', slug_name=self.slug_field,
+                value=smart_str(data)
+            )
+        return model(pk=pk, **{self.slug_field: slug})
+
+    def verify(self, objects):
+        """Сверяет id объектов с базой одним запросом через api.slugs.
+
+        Исправляет id пересозданных объектов и возвращает ошибки для
+        удаленных: справочник в памяти мог устареть.
+        """
+        model = self.get_queryset().model
+        ids = slugs.get_ids(
+            model, [getattr(obj, self.slug_field) for obj in objects],
+            verify=True
+        )
+        errors = []
+        for obj in objects:
+            slug = getattr(obj, self.slug_field)
+            if slug in ids:
+                obj.pk = ids[slug]
+            else:
+                errors.append(self.error_messages['does_not_exist'].format(
+                    slug_name=self.slug_field, value=slug
+                ))
+        return errors
+
 
 class TitleSerializerWrite(serializers.ModelSerializer):
-    category = SlugRelatedField(
+    category = CachedSlugRelatedField(
         slug_field='slug', required=True, queryset=Category.objects.all()
     )
-    genre = SlugRelatedField(
+    genre = CachedSlugRelatedField(
         many=True, required=True, slug_field='slug',
         queryset=Genre.objects.all()
     )
@@ -95,23 +182,46 @@ class TitleSerializerWrite(serializers.ModelSerializer):
             raise serializers.ValidationError(YEAR_VALIDATION_ERROR)
         return value
 
+    def validate(self, attrs):
+        errors = {}
+        for name, field in self.fields.items():
+            field = getattr(field, 'child_relation', field)
+            if name not in attrs or not isinstance(
+                    field, CachedSlugRelatedField):
+                continue
+            value = attrs[name]
+            field_errors = field.verify(
+                value if isinstance(value, list) else [value]
+            )
+            if field_errors:
+                errors[name] = field_errors
+        if errors:
+            raise serializers.ValidationError(errors)
+        return attrs
+
+
+class TitleBulkSerializer(TitleSerializerWrite):
+    """Произведение из пачки, слаги ищутся в базе для всей пачки сразу."""
+    id = serializers.IntegerField(required=False)
+    category = serializers.SlugField()
+    genre = serializers.ListField(child=serializers.SlugField())
+
 
 class ReviewSerializer(serializers.ModelSerializer):
     author = serializers.SlugRelatedField(
         read_only=True, slug_field='username'
     )
 
-    def validate(self, data):
-        request = self.context['request']
-        if request.method != 'POST':
-            return data
-        title = get_object_or_404(
-            Title,
-            id=self.context['view'].kwargs.get('title_id')
-        )
-        if request.user.reviews.filter(title=title).exists():
-            raise serializers.ValidationError(REVIEW_VALIDATION_ERROR)
-        return data
+    def create(self, validated_data):
+        # повторный отзыв отклоняет ограничение unique_author_title,
+        # отдельный запрос на проверку не нужен
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [REVIEW_VALIDATION_ERROR]
+            })
 
     class Meta:
         fields = '__all__'
@@ -0,0 +1,89 @@
+"""Соответствие слагов жанров и категорий их id в памяти процесса.
+
+Справочники маленькие и почти не меняются, поэтому запись произведений и
+фильтры по жанру и категории находят id по слагу без запроса к базе.
+Справочник перечитывается целиком, когда меняется версия его
+пространства ключей в общем кэше (BaseNameSlugViewSet увеличивает ее при
+создании, изменении и удалении) или прошло API_SLUG_CACHE_TIMEOUT секунд,
+на случай изменений в обход API. Слаг, которого нет в памяти, ищется в
+базе: объект мог быть создан, пока версия еще не увеличена.
+
+Запись произведений дополнительно сверяет найденные id с базой одним
+запросом (verify=True): объект мог быть удален в обход API или в другом
+процессе, а у каждого процесса свой справочник. Фильтры обходятся без
+проверки.
+"""
+import time
+
+from django.conf import settings
+from reviews.models import Category, Genre
+
+from . import caching
+
+
+class SlugCache:
+
+    def __init__(self, model, namespace):
+        self.model = model
+        self.namespace = namespace
+        self.clear()
+
+    def clear(self):
+        # версия, время загрузки и словарь {слаг: id} меняются вместе
+        self.state = (None, 0, {})
+
+    def get_ids(self):
+        version = caching.get_version(self.namespace)
+        loaded_version, loaded, ids = self.state
+        if (
+            version != loaded_version
+            or time.monotonic() - loaded > settings.API_SLUG_CACHE_TIMEOUT
+        ):
+            ids = dict(self.model.objects.values_list('slug', 'id'))
+            self.state = (version, time.monotonic(), ids)
+        return ids
+
+    def get_many(self, slugs, verify=False):
+        """Словарь {слаг: id} для найденных слагов."""
+        ids = self.get_ids()
+        found = {slug: ids[slug] for slug in slugs if slug in ids}
+        if verify and found:
+            existing = set(
+                self.model.objects.filter(pk__in=found.values())
+                .values_list('pk', flat=True)
+            )
+            stale = {slug for slug, pk in found.items() if pk not in existing}
+            if stale:
+                # удаленные слаги ищутся в базе как отсутствующие в памяти
+                self.clear()
+                for slug in stale:
+                    del found[slug]
+        missing = set(slugs) - set(found)
+        if missing:
+            found.update(
+                self.model.objects.filter(slug__in=missing)
+                .values_list('slug', 'id')
+            )
+        return found
+
+    def get(self, slug):
+        return self.get_many([slug]).get(slug)
+
+
+caches = {
+    Genre: SlugCache(Genre, 'genres'),
+    Category: SlugCache(Category, 'categories'),
+}
+
+
+def get_id(model, slug):
+    return caches[model].get(slug)
+
+
+def get_ids(model, slugs, verify=False):
+    return caches[model].get_many(slugs, verify)
+
+
+def clear():
+    for slug_cache in caches.values():
+        slug_cache.clear()
@@ -0,0 +1,35 @@
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class AuthRateThrottle(SimpleRateThrottle):
+    """Ограничение частоты запросов к эндпоинтам аутентификации.
+
+    Частота берется из DEFAULT_THROTTLE_RATES при каждом запросе, без
+    частоты для scope ограничение не действует. Счетчики хранятся в кэше.
+    """
+
+    def get_rate(self):
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+
+class AuthIPRateThrottle(AuthRateThrottle):
+    scope = 'auth-ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            'scope': self.scope, 'ident': self.get_ident(request)
+        }
+
+
+class AuthUsernameRateThrottle(AuthRateThrottle):
+    """Ограничение по имени пользователя - против перебора кода с разных IP."""
+    scope = 'auth-username'
+
+    def get_cache_key(self, request, view):
+        username = getattr(request.data, 'get', lambda key: None)('username')
+        if not isinstance(username, str) or not username:
+            return None
+        return self.cache_format % {
+            'scope': self.scope, 'ident': username.lower()
+        }
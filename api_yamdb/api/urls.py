@@ -25,5 +25,7 @@ auth_urls = [
 urlpatterns = [
     path('v1/auth/', include(auth_urls)),
     path('v1/users/me/', views.UserMeViewSet.as_view(), name='users_me'),
+    path('v1/export/<str:name>/', views.ExportView.as_view(), name='export'),
+    path('v1/metrics/', views.MetricsView.as_view(), name='metrics'),
     path('v1/', include(api_v1.urls)),
 ]
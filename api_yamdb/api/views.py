@@ -1,22 +1,31 @@
 from random import randint
 
-from django.core.mail import send_mail
-from django.db import IntegrityError
-from django.db.models import Avg
+from django.db import connection, transaction
+from django.db.models import Count, Max, Sum
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.functional import cached_property
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.filters import SearchFilter
 from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
-from reviews.models import Category, Genre, Review, Title, User
+from reviews import export
+from reviews.mail import enqueue_email
+from reviews.models import (Category, Comment, Genre, Review, Title,
+                            TitleGenre, TitleStats, TokenUser, User)
+from reviews.registration import SignupConflictError, register_user
+from reviews.stats import rebuild_title_stats
 from reviews.utils import is_read_method
 
-from api_yamdb.settings import EMAIL_FROM
+from api_yamdb.settings import EMAIL_FROM, EXPORT_CHUNK_SIZE
 
-from . import filters, permissions, serializers
+from . import (authentication, bulk, caching, conditional, filters, lean,
+               metrics, pagination, permissions, renderers, serializers, slugs,
+               throttling)
 
 EMAIL_SUBJECT = 'Письмо с кодом подтверждения'
 EMAIL_MESSAGE = 'Ваш код подтверждения {}.'
@@ -27,41 +36,183 @@ EMAIL_EXISTS_ERROR = {
     'error': ('Пользователь с данным email существует!')
 }
 CODE_ERROR = {'error': 'Неправильный confirmation_code!'}
+EXPORT_NOT_FOUND_ERROR = 'Выгрузка {} не найдена'
+EXPORT_DISPOSITION = 'attachment; filename="{}.{}"'
 
 
 class BaseNameSlugViewSet(
-        mixins.CreateModelMixin, mixins.DestroyModelMixin,
-        mixins.ListModelMixin, viewsets.GenericViewSet):
+        bulk.BulkWriteMixin, conditional.ConditionalGetMixin,
+        caching.CachedReadMixin, mixins.CreateModelMixin,
+        mixins.DestroyModelMixin, mixins.ListModelMixin,
+        viewsets.GenericViewSet):
     permission_classes = (permissions.IsReadOnly | permissions.IsAdmin,)
     filter_backends = (SearchFilter,)
     search_fields = ('name',)
     lookup_field = 'slug'
+    # названия жанров и категорий входят в ответы о произведениях
+    invalidates = ('titles',)
 
 
 class GenreViewSet(BaseNameSlugViewSet):
     queryset = Genre.objects.all()
+    cache_namespace = 'genres'
+    etag_namespaces = ('genres',)
     serializer_class = serializers.GenresSerializer
+    bulk_serializer_class = serializers.GenresBulkSerializer
 
 
 class CategoryViewSet(BaseNameSlugViewSet):
     queryset = Category.objects.all()
     serializer_class = serializers.CategorySerializer
+    bulk_serializer_class = serializers.CategoryBulkSerializer
+    cache_namespace = 'categories'
+    etag_namespaces = ('categories',)
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(
+        bulk.BulkWriteMixin, conditional.ConditionalRetrieveMixin,
+        caching.CachedRetrieveMixin, lean.LeanListMixin,
+        viewsets.ModelViewSet):
     queryset = (
-        Title.objects.all().order_by('id')
-        .annotate(rating=Avg('reviews__score'))
+        Title.objects.select_related('category')
+        .prefetch_related('genre').order_by('id')
     )
     permission_classes = (permissions.IsReadOnly | permissions.IsAdmin,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = filters.TitleFilter
+    cache_namespace = 'titles'
+    etag_namespaces = ('titles',)
+    bulk_serializer_class = serializers.TitleBulkSerializer
+    bulk_lookup = 'id'
+    values_serializer_class = lean.TitleValuesSerializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if serializers.stats_requested(self.request):
+            return queryset.select_related('stats')
+        return queryset
+
+    def use_lean_list(self):
+        return super().use_lean_list() and not serializers.stats_requested(
+            self.request
+        )
+
+    def get_cache_namespace(self):
+        # статистика меняется с каждым отзывом и комментарием, ответы с
+        # ней не должны сбрасывать кэш остальных ответов о произведениях
+        if serializers.stats_requested(self.request):
+            return caching.TITLE_STATS_NAMESPACE
+        return super().get_cache_namespace()
+
+    def get_etag_namespaces(self):
+        return (self.get_cache_namespace(),)
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        # вместе с произведением удаляются его отзывы и комментарии
+        caching.invalidate('reviews')
 
     def get_serializer_class(self):
         if is_read_method(self.request.method):
             return serializers.TitleSerializerRead
         return serializers.TitleSerializerWrite
 
+    @action(detail=True)
+    def stats(self, request, pk=None):
+        title = get_object_or_404(Title.objects.select_related('stats'), pk=pk)
+        serializer = serializers.TitleStatsSerializer(title.get_stats())
+        return Response(serializer.data)
+
+    def resolve_slugs(self, valid, errors):
+        """Находит id категорий и жанров всей пачки через api.slugs.
+
+        Найденные id сверяются с базой. Объекты с несуществующими
+        слагами переносятся в errors.
+        """
+        ids = {
+            Category: slugs.get_ids(Category, {
+                data['category'] for data in valid.values()
+                if 'category' in data
+            }, verify=True),
+            Genre: slugs.get_ids(Genre, {
+                slug for data in valid.values()
+                for slug in data.get('genre', ())
+            }, verify=True),
+        }
+        for index, data in list(valid.items()):
+            missing = {
+                field: [bulk.SLUG_NOT_FOUND_ERROR.format(slug)]
+                for field, slug, found in (
+                    ('category', data.get('category'), ids[Category]),
+                    *(('genre', slug, ids[Genre])
+                      for slug in data.get('genre', ())),
+                )
+                if slug is not None and slug not in found
+            }
+            if missing:
+                errors[index] = missing
+                del valid[index]
+        return ids[Category], ids[Genre]
+
+    def add_genres(self, titles, valid, genre_ids):
+        TitleGenre.objects.bulk_create(
+            TitleGenre(title=title, genre_id=genre_ids[slug])
+            for index, title in titles.items()
+            for slug in dict.fromkeys(valid[index]['genre'])
+        )
+
+    def bulk_create_objects(self, valid, errors):
+        category_ids, genre_ids = self.resolve_slugs(valid, errors)
+        titles = {
+            index: Title(
+                name=data['name'], year=data['year'],
+                description=data['description'],
+                category_id=category_ids[data['category']]
+            )
+            for index, data in valid.items()
+        }
+        if connection.features.can_return_ids_from_bulk_insert:
+            Title.objects.bulk_create(titles.values())
+        else:
+            # без RETURNING первичные ключи получаются только при save
+            for title in titles.values():
+                title.save()
+        self.add_genres(titles, valid, genre_ids)
+        return titles
+
+    def bulk_update_objects(self, valid, errors):
+        self.pop_duplicates(valid, errors, 'id')
+        category_ids, genre_ids = self.resolve_slugs(valid, errors)
+        existing = Title.objects.in_bulk(
+            [data['id'] for data in valid.values()]
+        )
+        titles, fields = {}, set()
+        for index, data in valid.items():
+            title = existing.get(data['id'])
+            if title is None:
+                errors[index] = {'id': [bulk.NOT_FOUND_ERROR]}
+                continue
+            changes = {
+                field: data[field] for field in ('name', 'year', 'description')
+                if field in data
+            }
+            if 'category' in data:
+                changes['category_id'] = category_ids[data['category']]
+            for field, value in changes.items():
+                setattr(title, field, value)
+            fields.update(changes)
+            titles[index] = title
+        if fields:
+            Title.objects.bulk_update(titles.values(), fields)
+        with_genres = {
+            index: title for index, title in titles.items()
+            if 'genre' in valid[index]
+        }
+        if with_genres:
+            TitleGenre.objects.filter(title__in=with_genres.values()).delete()
+            self.add_genres(with_genres, valid, genre_ids)
+        return titles
+
 
 class UserViewSet(viewsets.ModelViewSet):
     serializer_class = serializers.UserModelSerializer
@@ -69,30 +220,79 @@ class UserViewSet(viewsets.ModelViewSet):
     permission_classes = (permissions.IsAdmin | IsAdminUser,)
     lookup_field = 'username'
 
+    def perform_update(self, serializer):
+        username = serializer.instance.username
+        super().perform_update(serializer)
+        authentication.forget_user(serializer.instance.pk)
+        if serializer.instance.username != username:
+            # имя автора выводится в отзывах и комментариях
+            caching.invalidate('reviews', 'comments')
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        totals = (
+            instance.reviews.values('title_id')
+            .annotate(score_sum=Sum('score'), score_count=Count('id'))
+            .order_by()
+        )
+        totals = list(totals)
+        for row in totals:
+            Title.update_rating(
+                row['title_id'], -row['score_sum'], -row['score_count']
+            )
+        # вместе с пользователем удаляются его отзывы и комментарии,
+        # а также чужие комментарии к его отзывам
+        title_ids = {row['title_id'] for row in totals} | set(
+            Comment.objects.filter(author=instance)
+            .values_list('review__title_id', flat=True)
+        )
+        authentication.forget_user(instance.pk)
+        instance.delete()
+        if title_ids:
+            rebuild_title_stats(title_ids)
+            caching.invalidate('titles', 'reviews', 'comments')
+
 
 class UserMeViewSet(APIView):
     permission_classes = (IsAuthenticated,)
 
+    def get_user(self):
+        # в пользователе из токена нет профиля, он читается из базы
+        if isinstance(self.request.user, TokenUser):
+            return User.objects.get(pk=self.request.user.pk)
+        return self.request.user
+
     def get(self, request):
-        serializer = serializers.UserModelSerializer(self.request.user)
+        serializer = serializers.UserModelSerializer(self.get_user())
         return Response(serializer.data)
 
     def patch(self, request):
+        user = self.get_user()
+        username = user.username
         serializer = serializers.UserModelSerializer(
-            self.request.user,
+            user,
             data=self.request.data,
             partial=True
         )
         serializer.is_valid(raise_exception=True)
         serializer.save(role=request.user.role)
+        authentication.forget_user(request.user.pk)
+        if user.username != username:
+            caching.invalidate('reviews', 'comments')
         return Response(
             {**serializer.validated_data, 'role': request.user.role},
             status=status.HTTP_200_OK
         )
 
 
-class RegisterUserView(APIView):
+class AuthThrottledView(APIView):
     permission_classes = (AllowAny,)
+    throttle_classes = (
+        throttling.AuthIPRateThrottle, throttling.AuthUsernameRateThrottle
+    )
+
+
+class RegisterUserView(AuthThrottledView):
 
     def code_generator(self):
         return '-'.join(map(str, (randint(1000, 9999) for i in range(5))))
@@ -101,12 +301,20 @@ class RegisterUserView(APIView):
         serializer = serializers.RegisterUserSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         try:
-            user, created = User.objects.get_or_create(
-                **serializer.validated_data
-            )
-        except IntegrityError as err:
-            created = False
-            if 'username' in err.args[0]:
+            with transaction.atomic():
+                code = register_user(
+                    serializer.validated_data['username'],
+                    serializer.validated_data['email'],
+                    self.code_generator()
+                )
+                enqueue_email(
+                    subject=EMAIL_SUBJECT,
+                    message=EMAIL_MESSAGE.format(code),
+                    recipient=serializer.validated_data['email'],
+                    from_email=EMAIL_FROM,
+                )
+        except SignupConflictError as err:
+            if err.field == 'username':
                 error_message = USERNAME_EXISTS_ERROR
             else:
                 error_message = EMAIL_EXISTS_ERROR
@@ -114,32 +322,24 @@ class RegisterUserView(APIView):
                 error_message,
                 status=status.HTTP_400_BAD_REQUEST
             )
-        if created:
-            user.confirmation_code = self.code_generator()
-            user.save()
-        send_mail(
-            subject=EMAIL_SUBJECT,
-            message=EMAIL_MESSAGE.format(user.confirmation_code),
-            from_email=EMAIL_FROM,
-            recipient_list=(serializer.validated_data['email'],),
-        )
         return Response(serializer.validated_data, status=status.HTTP_200_OK)
 
 
-class RequestTokenView(APIView):
-    permission_classes = (AllowAny,)
+class RequestTokenView(AuthThrottledView):
 
     def post(self, request):
         serializer = serializers.RequestTokenSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         user = get_object_or_404(
-            User,
+            User.objects.only(
+                'id', 'confirmation_code', *authentication.CLAIMS
+            ),
             username=serializer.validated_data['username']
         )
         if (user.confirmation_code
            != serializer.validated_data['confirmation_code']):
             return Response(CODE_ERROR, status=status.HTTP_400_BAD_REQUEST)
-        refresh = RefreshToken.for_user(user)
+        refresh = authentication.get_tokens_for_user(user)
         return Response(
             {
                 'refresh': str(refresh),
@@ -147,39 +347,195 @@ class RequestTokenView(APIView):
             })
 
 
-class RelatedBaseSet(viewsets.ModelViewSet):
+class ExportView(APIView):
+    """Выгрузка таблицы целиком в NDJSON или CSV (?format=csv)."""
+    permission_classes = (permissions.IsAdmin,)
+    renderer_classes = (renderers.NDJSONRenderer, renderers.CSVRenderer)
+
+    def get(self, request, name):
+        if name not in export.EXPORTS:
+            raise NotFound(EXPORT_NOT_FOUND_ERROR.format(name))
+        since = request.query_params.get('since')
+        if since is not None:
+            try:
+                since = export.parse_since(since)
+            except ValueError as err:
+                raise ValidationError({'since': str(err)})
+            if not export.supports_since(name):
+                raise ValidationError({
+                    'since': export.SINCE_NOT_SUPPORTED_ERROR.format(name)
+                })
+        output_format = request.accepted_renderer.format
+        response = StreamingHttpResponse(
+            export.export_lines(name, output_format, since, EXPORT_CHUNK_SIZE),
+            content_type=request.accepted_renderer.media_type
+        )
+        response['Content-Disposition'] = EXPORT_DISPOSITION.format(
+            name, output_format
+        )
+        return response
+
+
+class MetricsView(APIView):
+    """Метрики запросов процесса в формате Prometheus."""
+    permission_classes = (permissions.IsAdmin | IsAdminUser,)
+    renderer_classes = (renderers.PrometheusRenderer,)
+
+    def get(self, request):
+        return Response(metrics.render())
+
+
+class RelatedBaseSet(
+        conditional.ConditionalRetrieveMixin, lean.LeanListMixin,
+        viewsets.ModelViewSet):
     permission_classes = (permissions.IsAuthorOrAdminOrModeratorOrReadonly,)
+    pagination_class = pagination.FeedPagination
     parent_model = None
     url_lookup = None
     child_relation = None
     field_name = None
+    cache_namespace = None
+    # счетчик TitleStats, который сдвигают записи вьюсета
+    stats_counter = None
+
+    def get_parent_filters(self):
+        return {'id': self.kwargs.get(self.url_lookup)}
 
-    def get_parent_object(self):
+    @cached_property
+    def parent_object(self):
+        """Родитель из URL, выбирается один раз за запрос."""
         return get_object_or_404(
-            self.parent_model, id=self.kwargs.get(self.url_lookup)
+            self.parent_model, **self.get_parent_filters()
         )
 
     def get_queryset(self):
-        return getattr(self.get_parent_object(), self.child_relation).all()
+        # имена авторов выбираются вместе со страницей
+        return getattr(
+            self.parent_object, self.child_relation
+        ).select_related('author')
+
+    def get_validators(self):
+        """Добавляет к версиям дату последней записи и число записей.
+
+        Так изменения в обход API (админка, импорт) тоже меняют ETag.
+        """
+        values, modified = super().get_validators()
+        children = self.parent_model._meta.get_field(
+            self.child_relation
+        ).related_model.objects.filter(
+            **{self.field_name + '_id': self.kwargs.get(self.url_lookup)}
+        )
+        stats = children.aggregate(latest=Max('pub_date'), count=Count('id'))
+        values.extend(stats.values())
+        if stats['latest'] is not None:
+            modified = max(modified, stats['latest'].timestamp())
+        return values, modified
+
+    def get_stats_counters(self, instance, sign):
+        """Сдвиги счетчиков TitleStats при создании (1) или удалении (-1)."""
+        return {self.stats_counter: sign}
+
+    def update_stats(self, instance, sign):
+        # отзывы и комментарии вложены в адрес произведения
+        TitleStats.update_counters(
+            self.kwargs.get('title_id'),
+            activity=instance.pub_date if sign > 0 else None,
+            **self.get_stats_counters(instance, sign)
+        )
 
+    @transaction.atomic
     def perform_create(self, serializer):
         save_kwargs = {
-            self.field_name: self.get_parent_object()
+            self.field_name: self.parent_object
         }
         serializer.save(author=self.request.user, **save_kwargs)
+        self.update_stats(serializer.instance, 1)
+        # статистика входит в ответы о произведениях с ?stats=1
+        caching.invalidate(self.cache_namespace, caching.TITLE_STATS_NAMESPACE)
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        caching.invalidate(self.cache_namespace)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        self.update_stats(instance, -1)
+        super().perform_destroy(instance)
+        caching.invalidate(self.cache_namespace, caching.TITLE_STATS_NAMESPACE)
 
 
 class ReviewViewSet(RelatedBaseSet):
     serializer_class = serializers.ReviewSerializer
+    values_serializer_class = lean.ReviewValuesSerializer
     parent_model = Title
     url_lookup = 'title_id'
     child_relation = 'reviews'
     field_name = 'title'
+    cache_namespace = 'reviews'
+    stats_counter = 'reviews'
+    etag_namespaces = ('reviews',)
+
+    def get_locked_score(self, review):
+        return (
+            Review.objects.select_for_update()
+            .filter(pk=review.pk)
+            .values_list('score', flat=True)
+            .first()
+        )
+
+    def get_stats_counters(self, review, sign):
+        return {
+            **super().get_stats_counters(review, sign),
+            'scores': {review.score: sign},
+            # комментарии удаляются вместе с отзывом
+            'comments': -review.comments.count() if sign < 0 else 0,
+        }
+
+    @transaction.atomic
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        review = serializer.instance
+        Title.update_rating(review.title_id, review.score, 1)
+        # рейтинг входит в ответы о произведениях
+        caching.invalidate('titles')
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        old_score = self.get_locked_score(serializer.instance)
+        super().perform_update(serializer)
+        review = serializer.instance
+        if old_score is not None and review.score != old_score:
+            Title.update_rating(review.title_id, review.score - old_score)
+            TitleStats.update_counters(
+                review.title_id, scores={old_score: -1, review.score: 1}
+            )
+            caching.invalidate('titles')
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        score = self.get_locked_score(instance)
+        if score is None:
+            return
+        instance.score = score
+        super().perform_destroy(instance)
+        Title.update_rating(instance.title_id, -score, -1)
+        caching.invalidate('titles')
 
 
 class CommentViewSet(RelatedBaseSet):
     serializer_class = serializers.CommentSerializer
+    values_serializer_class = lean.CommentValuesSerializer
     parent_model = Review
     url_lookup = 'review_id'
     child_relation = 'comments'
     field_name = 'review'
+    cache_namespace = 'comments'
+    stats_counter = 'comments'
+    etag_namespaces = ('reviews', 'comments')
+
+    def get_parent_filters(self):
+        # отзыв должен относиться к произведению из URL
+        return {
+            **super().get_parent_filters(),
+            'title_id': self.kwargs.get('title_id'),
+        }
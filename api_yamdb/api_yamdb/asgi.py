@@ -0,0 +1,88 @@
+"""
+ASGI config for YaMDb project.
+
+It exposes the ASGI callable as a module-level variable named ``application``
+for uvicorn or ``gunicorn -k uvicorn.workers.UvicornWorker``.
+
+Django 2.2 handles requests only synchronously, so the WSGI application runs
+in a pool of ASGI_THREADS threads. Connections, request bodies and response
+sending are served by the event loop, so slow clients do not hold worker
+processes. Each request runs entirely in one pool thread: it owns the
+thread's database connection and closes the response there, which fires
+request_finished and releases the connection like under gunicorn.
+"""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
+
+
+class ThreadPoolInstance(WsgiToAsgiInstance):
+
+    def __init__(self, wsgi_application, executor):
+        super().__init__(wsgi_application)
+        self.executor = executor
+
+    async def run_wsgi_app(self, body):
+        await asyncio.get_event_loop().run_in_executor(
+            self.executor, self.handle, body
+        )
+
+    def handle(self, body):
+        response = self.wsgi_application(
+            self.build_environ(self.scope, body), self.start_response
+        )
+        try:
+            for output in response:
+                if not self.response_started:
+                    self.response_started = True
+                    self.sync_send(self.response_start)
+                self.sync_send({
+                    'type': 'http.response.body', 'body': output,
+                    'more_body': True
+                })
+        finally:
+            if hasattr(response, 'close'):
+                response.close()
+        if not self.response_started:
+            self.response_started = True
+            self.sync_send(self.response_start)
+        self.sync_send({'type': 'http.response.body'})
+
+
+class ThreadPoolWsgiToAsgi(WsgiToAsgi):
+
+    def __init__(self, wsgi_application, max_workers):
+        super().__init__(wsgi_application)
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='asgi'
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        else:
+            await ThreadPoolInstance(self.wsgi_application, self.executor)(
+                scope, receive, send
+            )
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+application = ThreadPoolWsgiToAsgi(
+    get_wsgi_application(), settings.ASGI_THREADS
+)
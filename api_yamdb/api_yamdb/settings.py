@@ -33,6 +33,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.ConnectionHealthCheckMiddleware',
+    'api.middleware.ReplicaRoutingMiddleware',
+    'api.middleware.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -62,6 +65,9 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'api_yamdb.wsgi.application'
+# потоки, в которых api_yamdb.asgi выполняет запросы; у каждого потока
+# свое соединение с базой
+ASGI_THREADS = int(os.getenv('ASGI_THREADS', 20))
 
 DATABASES = {
     'default': {
@@ -70,9 +76,69 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', 'postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', 'postgres'),
         'HOST': os.getenv('DB_HOST', 'db'),
-        'PORT': os.getenv('DB_PORT', 5432)
+        'PORT': os.getenv('DB_PORT', 5432),
+        # секунды жизни соединения между запросами, 0 - новое на каждый
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        # серверные курсоры не работают через PgBouncer в режиме transaction
+        'DISABLE_SERVER_SIDE_CURSORS': os.getenv(
+            'DB_DISABLE_SERVER_SIDE_CURSORS', 'false'
+        ).lower() == 'true',
     }
 }
+# реплики для чтения каталога: DB_REPLICAS=хост[:порт],... (для SQLite -
+# файлы баз), доли запросов к ним - DB_REPLICA_WEIGHTS=вес,...
+DB_REPLICAS = {}
+replica_weights = os.getenv('DB_REPLICA_WEIGHTS', '').split(',')
+for number, address in enumerate(
+    filter(None, os.getenv('DB_REPLICAS', '').split(','))
+):
+    host, _, port = address.strip().partition(':')
+    replica = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+    if replica['ENGINE'] == 'django.db.backends.sqlite3':
+        replica['NAME'] = address.strip()
+    else:
+        replica.update(HOST=host, PORT=port or replica['PORT'])
+    DATABASES[f'replica_{number + 1}'] = replica
+    DB_REPLICAS[f'replica_{number + 1}'] = int(
+        replica_weights[number] if number < len(replica_weights)
+        and replica_weights[number] else 1
+    )
+DATABASE_ROUTERS = ['reviews.routers.ReplicaRouter']
+# после записи пользователь столько секунд читает с основной базы
+DB_REPLICA_PIN_SECONDS = int(os.getenv('DB_REPLICA_PIN_SECONDS', 5))
+# недоступная реплика пропускается столько секунд
+DB_REPLICA_RETRY_SECONDS = int(os.getenv('DB_REPLICA_RETRY_SECONDS', 30))
+# проверка соединений, оставшихся от прошлых запросов, перед запросом
+DB_CONN_HEALTH_CHECKS = os.getenv(
+    'DB_CONN_HEALTH_CHECKS', 'true'
+).lower() == 'true'
+
+# локальная память процесса по умолчанию; для нескольких процессов
+# gunicorn нужен общий бэкенд (Memcached, Redis), иначе сброс кэша
+# после записи виден только в процессе, обработавшем запрос
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'yamdb'),
+    }
+}
+
+# время жизни ответов каталога в кэше, 0 отключает кэширование
+API_CACHE_TIMEOUT = int(os.getenv('API_CACHE_TIMEOUT', 300))
+# списки произведений, отзывов и комментариев собираются из .values()
+API_LEAN_READS = os.getenv('API_LEAN_READS', 'true').lower() == 'true'
+# сколько секунд id жанров и категорий по слагу хранятся в памяти процесса
+# без проверки базы; изменения через API видны сразу
+API_SLUG_CACHE_TIMEOUT = int(os.getenv('API_SLUG_CACHE_TIMEOUT', 300))
+# наибольшее число объектов в запросе к .../bulk/
+API_BULK_MAX_ITEMS = int(os.getenv('API_BULK_MAX_ITEMS', 1000))
+# метрики запросов для /api/v1/metrics/ и лог запросов дольше SLOW_REQUEST_MS
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+SLOW_REQUEST_MS = int(os.getenv('SLOW_REQUEST_MS', 0))
+# число строк, читаемых серверным курсором за раз при выгрузке
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 2000))
 
 AUTH_USER_MODEL = 'reviews.User'
 
@@ -81,10 +147,27 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.JWTAuthentication',
+    ],
+    # orjson, если установлен, иначе стандартные JSON-рендерер и парсер
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 5,
+    # ограничения /auth/signup/ и /auth/token/ (api.throttling)
+    'DEFAULT_THROTTLE_RATES': {
+        'auth-ip': os.getenv('AUTH_IP_THROTTLE_RATE', '30/min'),
+        'auth-username': os.getenv('AUTH_USERNAME_THROTTLE_RATE', '5/min'),
+    },
+    # адрес клиента берется из X-Forwarded-For, который выставляет nginx
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', 1)),
 }
 
 LANGUAGE_CODE = 'ru-ru'
@@ -111,6 +194,10 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
+# пользователь запроса восстанавливается из токена без запроса к базе,
+# а его роль сверяется с состоянием, закэшированным на указанное время
+JWT_STATELESS_AUTH = os.getenv('JWT_STATELESS_AUTH', 'false').lower() == 'true'
+JWT_USER_STATE_TIMEOUT = int(os.getenv('JWT_USER_STATE_TIMEOUT', 60))
 
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
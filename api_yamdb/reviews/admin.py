@@ -1,35 +1,100 @@
 from django.contrib import admin
 
 from .models import Category, Comment, Genre, Review, Title, User
+from .signals import notify_changed
+from .stats import rebuild_title_ratings, rebuild_title_stats
+
+
+class NotifyChangedAdmin(admin.ModelAdmin):
+    """Сообщает об изменениях, сделанных в админке (reviews.signals).
+
+    Рейтинг и статистика произведений, которые затрагивают измененные
+    объекты (get_title_ids), пересчитываются.
+    """
+    # меняет ли сохранение объекта рейтинг или статистику
+    save_changes_titles = True
+
+    def get_title_ids(self, queryset):
+        """id произведений, рейтинг или статистику которых меняют объекты."""
+        return set()
+
+    def get_object_title_ids(self, obj):
+        return self.get_title_ids(self.model.objects.filter(pk=obj.pk))
+
+    def changed(self, title_ids):
+        if title_ids:
+            rebuild_title_ratings(title_ids)
+            rebuild_title_stats(title_ids)
+            notify_changed(self.model, Title)
+        else:
+            notify_changed(self.model)
+
+    def save_model(self, request, obj, form, change):
+        title_ids = set()
+        # при изменении объект мог перейти к другому произведению
+        if change and self.save_changes_titles:
+            title_ids = self.get_object_title_ids(obj)
+        super().save_model(request, obj, form, change)
+        if self.save_changes_titles:
+            title_ids |= self.get_object_title_ids(obj)
+        self.changed(title_ids)
+
+    def delete_model(self, request, obj):
+        title_ids = self.get_object_title_ids(obj)
+        super().delete_model(request, obj)
+        self.changed(title_ids)
+
+    def delete_queryset(self, request, queryset):
+        title_ids = self.get_title_ids(queryset)
+        super().delete_queryset(request, queryset)
+        self.changed(title_ids)
 
 
 @admin.register(Category)
-class CategoryAdmin(admin.ModelAdmin):
+class CategoryAdmin(NotifyChangedAdmin):
     list_display = ('name', 'slug')
 
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(NotifyChangedAdmin):
     list_display = ('author', 'text', 'review',)
 
+    def get_title_ids(self, queryset):
+        return set(queryset.values_list('review__title_id', flat=True))
+
 
 @admin.register(Genre)
-class GenreAdmin(admin.ModelAdmin):
+class GenreAdmin(NotifyChangedAdmin):
     list_display = ('name', 'slug')
 
 
 @admin.register(Review)
-class ReviewAdmin(admin.ModelAdmin):
+class ReviewAdmin(NotifyChangedAdmin):
     list_display = ('title', 'score', 'author', 'text')
 
+    def get_title_ids(self, queryset):
+        return set(queryset.values_list('title_id', flat=True))
+
 
 @admin.register(Title)
-class TitleAdmin(admin.ModelAdmin):
+class TitleAdmin(NotifyChangedAdmin):
     list_display = ('name', 'year', 'description', 'category')
 
 
 @admin.register(User)
-class UserAdmin(admin.ModelAdmin):
+class UserAdmin(NotifyChangedAdmin):
     fields = ('username', 'first_name', 'last_name', 'email',
               'confirmation_code', 'bio', 'role')
     list_display = ('username', 'role', 'first_name', 'last_name', 'email')
+    save_changes_titles = False
+
+    def get_title_ids(self, queryset):
+        # вместе с пользователями удаляются их отзывы и комментарии,
+        # а также чужие комментарии к их отзывам
+        return set(
+            Review.objects.filter(author__in=queryset)
+            .values_list('title_id', flat=True)
+        ) | set(
+            Comment.objects.filter(author__in=queryset)
+            .values_list('review__title_id', flat=True)
+        )
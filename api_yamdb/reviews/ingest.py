@@ -0,0 +1,163 @@
+"""Массовая загрузка строк в таблицы моделей.
+
+Строки передаются в виде значений полей модели (как они прочитаны из
+CSV). На PostgreSQL пачка без создания объектов моделей потоком уходит
+через COPY FROM STDIN во временную таблицу и переносится в основную одним
+INSERT ... SELECT. На остальных СУБД (SQLite в тестах) строки сохраняются
+через bulk_create.
+
+В обоих случаях поля auto_now/auto_now_add получают текущее время, а
+отсутствующие в строках поля - значения по умолчанию, как при bulk_create.
+"""
+import io
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+STAGING_TABLE = '{}_staging'
+
+
+def copy_supported():
+    return connection.vendor == 'postgresql'
+
+
+def is_auto_now(field):
+    return (getattr(field, 'auto_now', False)
+            or getattr(field, 'auto_now_add', False))
+
+
+def get_update_fields(model, columns):
+    """Поля, перезаписываемые у существующих записей при upsert."""
+    fields = (model._meta.get_field(column) for column in columns)
+    return [
+        field for field in fields
+        if not field.primary_key and not is_auto_now(field)
+    ]
+
+
+def prepare_rows(model, columns, rows):
+    """Пустые значения nullable-полей превращает в NULL."""
+    nullable = [
+        index for index, column in enumerate(columns)
+        if model._meta.get_field(column).null
+    ]
+    for row in rows:
+        for index in nullable:
+            if row[index] == '':
+                row[index] = None
+    return rows
+
+
+def format_csv_row(values):
+    # в формате CSV команды COPY NULL - это пустое значение без кавычек
+    return ','.join(
+        '' if value is None
+        else '"' + str(value).replace('"', '""') + '"'
+        for value in values
+    ) + '\n'
+
+
+def get_merge_sql(model, staged, defaults, columns, update):
+    quote_name = connection.ops.quote_name
+    staged_columns = [quote_name(field.column) for field in staged]
+    sql = 'INSERT INTO {} ({}) SELECT {} FROM {}'.format(
+        quote_name(model._meta.db_table),
+        ', '.join(
+            staged_columns + [quote_name(field.column) for field in defaults]
+        ),
+        ', '.join(staged_columns + ['%s'] * len(defaults)),
+        quote_name(STAGING_TABLE.format(model._meta.db_table))
+    )
+    if not update:
+        return sql
+    sql += ' ON CONFLICT ({})'.format(quote_name(model._meta.pk.column))
+    update_fields = get_update_fields(model, columns)
+    if not update_fields:
+        return sql + ' DO NOTHING'
+    return sql + ' DO UPDATE SET ' + ', '.join(
+        '{0} = EXCLUDED.{0}'.format(quote_name(field.column))
+        for field in update_fields
+    )
+
+
+def copy_rows(model, columns, rows, update=False):
+    quote_name = connection.ops.quote_name
+    fields = [model._meta.get_field(column) for column in columns]
+    staged = [field for field in fields if not is_auto_now(field)]
+    staged_indexes = [fields.index(field) for field in staged]
+    defaults = [
+        field for field in model._meta.concrete_fields
+        if is_auto_now(field)
+        or (field not in fields and not field.primary_key)
+    ]
+    default_params = [
+        field.get_db_prep_save(
+            timezone.now() if is_auto_now(field) else field.get_default(),
+            connection
+        )
+        for field in defaults
+    ]
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(format_csv_row(row[index] for index in staged_indexes))
+    buffer.seek(0)
+    table = quote_name(model._meta.db_table)
+    staging = quote_name(STAGING_TABLE.format(model._meta.db_table))
+    staged_columns = ', '.join(quote_name(field.column) for field in staged)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            'CREATE TEMPORARY TABLE {} AS SELECT {} FROM {} WITH NO DATA'
+            .format(staging, staged_columns, table)
+        )
+        # copy_expert идет мимо обертки Django, ошибки приводятся вручную
+        with connection.wrap_database_errors:
+            cursor.copy_expert(
+                'COPY {} ({}) FROM STDIN WITH (FORMAT csv)'.format(
+                    staging, staged_columns
+                ),
+                buffer
+            )
+        cursor.execute(
+            get_merge_sql(model, staged, defaults, columns, update),
+            default_params
+        )
+        cursor.execute('DROP TABLE {}'.format(staging))
+
+
+def orm_save_rows(model, columns, rows, update=False):
+    objects = [model(**dict(zip(columns, row))) for row in rows]
+    if not update:
+        model.objects.bulk_create(objects)
+        return
+    existing = {
+        str(pk) for pk in
+        model.objects.filter(pk__in=[obj.pk for obj in objects])
+        .values_list('pk', flat=True)
+    }
+    model.objects.bulk_create(
+        [obj for obj in objects if str(obj.pk) not in existing]
+    )
+    update_fields = get_update_fields(model, columns)
+    if update_fields:
+        model.objects.bulk_update(
+            [obj for obj in objects if str(obj.pk) in existing],
+            [field.name for field in update_fields]
+        )
+
+
+def save_rows(model, columns, rows, update=False, use_copy=None):
+    """Сохраняет пачку строк в таблицу модели.
+
+    columns - имена полей модели (attname), rows - списки значений в том
+    же порядке. Без update повторяющийся первичный ключ приводит к
+    IntegrityError, с update такие записи обновляются.
+    """
+    if not rows:
+        return
+    if use_copy is None:
+        use_copy = copy_supported()
+    rows = prepare_rows(model, columns, rows)
+    if use_copy:
+        copy_rows(model, columns, rows, update)
+    else:
+        orm_save_rows(model, columns, rows, update)
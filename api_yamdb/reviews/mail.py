@@ -0,0 +1,80 @@
+"""Очередь исходящих писем.
+
+Письма сохраняются в таблицу OutboxEmail в запросе и отправляются
+отдельным процессом (команда sendqueuedmail), поэтому время ответа API не
+зависит от почтового сервера. Несколько отправителей могут работать
+одновременно: выбранные письма блокируются на время аренды.
+"""
+from datetime import timedelta
+
+from django.core.mail import send_mail
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 30
+BACKOFF_MAX = 3600
+LEASE = 300
+
+
+def enqueue_email(subject, message, recipient, from_email):
+    return OutboxEmail.objects.create(
+        subject=subject, message=message, recipient=recipient,
+        from_email=from_email
+    )
+
+
+def get_backoff(attempts):
+    """Задержка перед повторной отправкой, удваивается с каждой попыткой."""
+    return timedelta(
+        seconds=min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+    )
+
+
+def claim_batch(limit, lease=LEASE):
+    """Выбирает письма, которым пора отправляться, и берет их в аренду.
+
+    До окончания аренды письма не достанутся другим отправителям, а если
+    отправитель упадет, после нее будут отправлены повторно.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        emails = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboxEmail.PENDING, next_attempt__lte=now)
+            .order_by('next_attempt')[:limit]
+        )
+        OutboxEmail.objects.filter(
+            pk__in=[email.pk for email in emails]
+        ).update(next_attempt=now + timedelta(seconds=lease))
+    return emails
+
+
+def deliver(email):
+    send_mail(
+        subject=email.subject,
+        message=email.message,
+        from_email=email.from_email,
+        recipient_list=(email.recipient,),
+    )
+
+
+def mark_sent(emails):
+    OutboxEmail.objects.filter(pk__in=[email.pk for email in emails]).update(
+        status=OutboxEmail.SENT, sent=timezone.now(),
+        attempts=F('attempts') + 1, last_error=''
+    )
+
+
+def mark_failed(email, error, max_attempts=MAX_ATTEMPTS):
+    """Откладывает письмо до следующей попытки или отмечает неотправленным."""
+    attempts = email.attempts + 1
+    changes = {'attempts': attempts, 'last_error': repr(error)}
+    if attempts >= max_attempts:
+        changes['status'] = OutboxEmail.FAILED
+    else:
+        changes['next_attempt'] = timezone.now() + get_backoff(attempts)
+    OutboxEmail.objects.filter(pk=email.pk).update(**changes)
@@ -0,0 +1,184 @@
+import json
+import re
+from contextlib import ExitStack
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from reviews.models import Category, Comment, Genre, Review, Title
+
+SQLITE_SCAN = re.compile(r'SCAN (?:TABLE )?(\w+)')
+SEQ_SCANS_FOUND_ERROR = 'Последовательный просмотр больших таблиц: {}'
+
+
+def get_endpoints():
+    """Ресурсы API для чтения с параметрами из существующих данных."""
+    endpoints = [
+        ('categories', '/api/v1/categories/'),
+        ('genres', '/api/v1/genres/'),
+        ('titles', '/api/v1/titles/'),
+    ]
+    title = Title.objects.filter(category__isnull=False).order_by(
+        'id'
+    ).first() or Title.objects.order_by('id').first()
+    category = title.category if title and title.category_id else (
+        Category.objects.order_by('id').first()
+    )
+    genre = Genre.objects.order_by('id').first()
+    review = Review.objects.filter(comments__isnull=False).order_by(
+        'id'
+    ).first() or Review.objects.order_by('id').first()
+    comment = Comment.objects.order_by('id').first()
+    if category is not None:
+        endpoints.append(('titles-category', (
+            f'/api/v1/titles/?category={category.slug}'
+            f'&year={title.year if title else 2000}'
+        )))
+    if genre is not None:
+        endpoints.append(
+            ('titles-genre', f'/api/v1/titles/?genre={genre.slug}')
+        )
+    if title is not None:
+        endpoints += [
+            ('titles-search',
+             f'/api/v1/titles/?search={title.name.split()[0]}'),
+            ('titles-detail', f'/api/v1/titles/{title.id}/'),
+            ('titles-stats', f'/api/v1/titles/{title.id}/stats/'),
+        ]
+    if review is not None:
+        reviews = f'/api/v1/titles/{review.title_id}/reviews/'
+        endpoints += [
+            ('reviews', reviews),
+            ('reviews-cursor', reviews + '?pagination=cursor'),
+            ('reviews-detail', f'{reviews}{review.id}/'),
+            ('comments', f'{reviews}{review.id}/comments/'),
+        ]
+    if comment is not None:
+        endpoints.append(('comments-detail', (
+            f'/api/v1/titles/{comment.review.title_id}/reviews/'
+            f'{comment.review_id}/comments/{comment.id}/'
+        )))
+    return endpoints
+
+
+def capture_queries(path):
+    """Ответ и пары (соединение, SQL) выполненных SELECT."""
+    with ExitStack() as stack:
+        contexts = {
+            connection.alias: stack.enter_context(
+                CaptureQueriesContext(connection)
+            )
+            for connection in connections.all()
+        }
+        response = Client().get(path)
+    return response, [
+        (alias, query['sql'])
+        for alias, context in contexts.items()
+        for query in context.captured_queries
+        if query['sql'].lstrip().upper().startswith('SELECT')
+    ]
+
+
+def walk_plan(plan):
+    yield plan
+    for child in plan.get('Plans', ()):
+        yield from walk_plan(child)
+
+
+def explain(connection, sql):
+    """План запроса и таблицы, просматриваемые последовательно."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            tables = [
+                node['Relation Name'] for node in walk_plan(plan[0]['Plan'])
+                if node['Node Type'] == 'Seq Scan'
+            ]
+            return json.dumps(plan[0]['Plan'], indent=2), tables
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+        details = [row[-1] for row in cursor.fetchall()]
+    # кроме таблиц, SCAN бывает у подзапросов и временных результатов
+    known = set(connection.introspection.table_names())
+    tables = []
+    for detail in details:
+        match = SQLITE_SCAN.match(detail)
+        if match and 'USING' not in detail and match.group(1) in known:
+            tables.append(match.group(1))
+    return '\n'.join(details), tables
+
+
+def count_rows(connection, table):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                [table]
+            )
+        else:
+            cursor.execute(
+                'SELECT COUNT(*) FROM {}'.format(
+                    connection.ops.quote_name(table)
+                )
+            )
+        row = cursor.fetchone()
+    return max(row[0], 0) if row else 0
+
+
+class Command(BaseCommand):
+    help = (
+        'EXPLAIN для SQL-запросов ресурсов API на чтение и отчет '
+        'о последовательном просмотре таблиц'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-rows', type=int, default=1000,
+            help='Отмечать просмотр таблиц не меньше указанного числа строк'
+        )
+        parser.add_argument(
+            '--fail', action='store_true',
+            help='Завершиться ошибкой, если есть отмеченный просмотр'
+        )
+
+    def handle(self, *args, **options):
+        rows = {}
+        flagged = set()
+        with override_settings(API_CACHE_TIMEOUT=0):
+            for name, path in get_endpoints():
+                flagged.update(self.check_endpoint(
+                    name, path, rows, options['min_rows'],
+                    options['verbosity']
+                ))
+        if flagged and options['fail']:
+            raise CommandError(
+                SEQ_SCANS_FOUND_ERROR.format(', '.join(sorted(flagged)))
+            )
+
+    def check_endpoint(self, name, path, rows, min_rows, verbosity):
+        response, queries = capture_queries(path)
+        self.stdout.write(
+            f'{name} {path}: {response.status_code}, '
+            f'SQL-запросов: {len(queries)}'
+        )
+        scanned = {}
+        for alias, sql in queries:
+            plan, tables = explain(connections[alias], sql)
+            if verbosity > 1:
+                self.stdout.write(f'  {sql}\n{plan}')
+            for table in tables:
+                if (alias, table) not in rows:
+                    rows[alias, table] = count_rows(connections[alias], table)
+                scanned[table] = rows[alias, table]
+        flagged = set()
+        for table, count in scanned.items():
+            line = f'  последовательный просмотр {table}: {count} строк'
+            if count >= min_rows:
+                flagged.add(table)
+                self.stdout.write(self.style.WARNING(line))
+            else:
+                self.stdout.write(line)
+        return flagged
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+from reviews.export import (DEFAULT_CHUNK_SIZE, EXPORTS, FORMATS, NDJSON,
+                            SINCE_NOT_SUPPORTED_ERROR, export_lines,
+                            parse_since, supports_since)
+
+
+class Command(BaseCommand):
+    help = 'Выгрузка произведений, отзывов или комментариев в NDJSON или CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=tuple(EXPORTS))
+        parser.add_argument(
+            '--format', choices=FORMATS, default=NDJSON, dest='output_format'
+        )
+        parser.add_argument(
+            '--since',
+            help='Выгрузить записи, опубликованные позже указанного момента'
+        )
+        parser.add_argument(
+            '--output', help='Файл для выгрузки (по умолчанию stdout)'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+            help='Количество строк, читаемых из базы за раз'
+        )
+
+    def handle(self, *args, **options):
+        name, since = options['name'], options['since']
+        if since is not None:
+            if not supports_since(name):
+                raise CommandError(SINCE_NOT_SUPPORTED_ERROR.format(name))
+            try:
+                since = parse_since(since)
+            except ValueError as err:
+                raise CommandError(err)
+        lines = export_lines(
+            name, options['output_format'], since, options['chunk_size']
+        )
+        if options['output'] is None:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        with open(options['output'], 'w', encoding='utf-8',
+                  newline='') as file:
+            file.writelines(lines)
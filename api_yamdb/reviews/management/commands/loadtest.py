@@ -0,0 +1,133 @@
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+REQUEST = (
+    'GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n'
+    'Accept: application/json\r\n{headers}\r\n'
+)
+URL_ERROR = 'Ожидается адрес вида http://host:port/path, получен {}'
+
+
+def percentile(values, percent):
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+def build_request(url, token=None):
+    parts = urlsplit(url)
+    if parts.scheme != 'http' or not parts.hostname:
+        raise CommandError(URL_ERROR.format(url))
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+    headers = f'Authorization: Bearer {token}\r\n' if token else ''
+    request = REQUEST.format(path=path, host=parts.netloc, headers=headers)
+    return parts.hostname, parts.port or 80, request.encode()
+
+
+async def fetch(host, port, request, trickle=0):
+    """Статус ответа; trickle - время, за которое клиент отправит запрос."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        if trickle:
+            for byte in range(len(request)):
+                writer.write(request[byte:byte + 1])
+                await writer.drain()
+                await asyncio.sleep(trickle / len(request))
+        else:
+            writer.write(request)
+            await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+    return int(response.split(b' ', 2)[1])
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузка на запущенный сервер: параллельные GET-запросы по кругу '
+        'к указанным адресам, задержка ответов и число запросов в секунду'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+', metavar='url')
+        parser.add_argument(
+            '--concurrency', type=int, default=100,
+            help='Количество одновременных клиентов'
+        )
+        parser.add_argument(
+            '--requests', type=int, default=2000,
+            help='Общее количество запросов'
+        )
+        parser.add_argument(
+            '--slow-clients', type=int, default=0,
+            help='Количество медленных клиентов, занимающих соединения'
+        )
+        parser.add_argument(
+            '--slow-seconds', type=float, default=5,
+            help='Время, за которое медленный клиент отправляет запрос'
+        )
+        parser.add_argument('--token', help='JWT-токен для заголовка')
+
+    def handle(self, *args, **options):
+        targets = [
+            build_request(url, options['token']) for url in options['urls']
+        ]
+        latencies, statuses, elapsed = asyncio.get_event_loop(
+        ).run_until_complete(self.run(targets, options))
+        self.report(latencies, statuses, elapsed)
+
+    async def run(self, targets, options):
+        latencies, statuses = [], {}
+        numbers = iter(range(options['requests']))
+
+        async def client():
+            for number in numbers:
+                host, port, request = targets[number % len(targets)]
+                started = time.perf_counter()
+                try:
+                    status = await fetch(host, port, request)
+                except (OSError, IndexError, ValueError) as err:
+                    status = type(err).__name__
+                else:
+                    latencies.append(time.perf_counter() - started)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        async def slow_client():
+            host, port, request = targets[0]
+            try:
+                await fetch(host, port, request, options['slow_seconds'])
+            except (OSError, IndexError, ValueError):
+                pass
+
+        slow = [
+            asyncio.ensure_future(slow_client())
+            for _ in range(options['slow_clients'])
+        ]
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(client() for _ in range(options['concurrency']))
+        )
+        elapsed = time.perf_counter() - started
+        await asyncio.gather(*slow)
+        return latencies, statuses, elapsed
+
+    def report(self, latencies, statuses, elapsed):
+        total = sum(statuses.values())
+        self.stdout.write(
+            f'Запросов: {total} за {elapsed:.2f} с, '
+            f'{total / elapsed:.1f} в секунду'
+        )
+        self.stdout.write('Ответы: ' + ', '.join(
+            f'{status}: {count}'
+            for status, count in sorted(statuses.items(), key=str)
+        ))
+        self.stdout.write('Задержка, мс: ' + ', '.join(
+            f'p{percent} {percentile(latencies, percent) * 1000:.1f}'
+            for percent in (50, 95, 99)
+        ) + f', max {max(latencies, default=0) * 1000:.1f}')
@@ -1,143 +1,312 @@
 import csv
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from itertools import islice
 
+import django
+from django.core.management import call_command
 from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
 from django.db.utils import IntegrityError
-from reviews.models import (Category, Comment, Genre, Review, Title,
-                            TitleGenre, User)
+from reviews.ingest import copy_supported, save_rows
+from reviews.models import (Category, Comment, Genre, ImportCheckpoint, Review,
+                            Title, TitleGenre, User)
+from reviews.signals import notify_changed
 
 from api_yamdb.settings import BASE_DIR
 
 DATA_FILES_DIR = os.path.join(BASE_DIR, 'static/data/')
-DATA_FILES_LIST = (
-    'users.csv',
-    'category.csv',
-    'titles.csv',
-    'review.csv',
-    'comments.csv',
-    'genre.csv',
-    'genre_title.csv'
+# Файлы в порядке импорта: модель и внешние ключи в виде
+# {колонка CSV: (поле модели, связанная модель)}
+DATA_FILES = (
+    ('users.csv', User, {}),
+    ('category.csv', Category, {}),
+    ('titles.csv', Title, {'category': ('category_id', Category)}),
+    ('review.csv', Review, {
+        'title_id': ('title_id', Title),
+        'author': ('author_id', User),
+    }),
+    ('comments.csv', Comment, {
+        'review_id': ('review_id', Review),
+        'author': ('author_id', User),
+    }),
+    ('genre.csv', Genre, {}),
+    ('genre_title.csv', TitleGenre, {
+        'title_id': ('title_id', Title),
+        'genre_id': ('genre_id', Genre),
+    }),
 )
+DATA_FILES_MAP = {file: (model, keys) for file, model, keys in DATA_FILES}
+DATA_FILES_LIST = tuple(DATA_FILES_MAP)
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_COPY_BATCH_SIZE = 20000
 DATA_IMPORT_ERROR = ('Ошибка при импорте файла! '
-                     'Возможно данные эту таблицу уже импортированы.')
+                     'Возможно данные эту таблицу уже импортированы. '
+                     'Для продолжения прерванного импорта используйте '
+                     '--resume, для повторной загрузки - --upsert.')
+FOREIGN_KEY_ERROR = 'Строка {} файла {}: не найден объект {} с id={}!'
+INVALID_ID_ERROR = 'Строка {} файла {}: некорректный id в колонке {}: {}!'
+SQLITE_WORKERS_WARNING = ('SQLite не поддерживает параллельную запись, '
+                          'импорт будет выполнен в одном процессе.')
+
+
+def get_import_stages():
+    """Группирует файлы по уровням зависимостей.
+
+    Файлы одного уровня ссылаются только на модели предыдущих уровней,
+    поэтому могут загружаться параллельно.
+    """
+    model_stages = {}
+    stages = []
+    for file, model, foreign_keys in DATA_FILES:
+        stage = max(
+            (model_stages[related] + 1
+             for _, related in foreign_keys.values()),
+            default=0
+        )
+        model_stages[model] = stage
+        while len(stages) <= stage:
+            stages.append([])
+        stages[stage].append(file)
+    return stages
+
+
+def parse_id(value, file, line_num, column):
+    try:
+        return int(value)
+    except ValueError:
+        raise CommandError(
+            INVALID_ID_ERROR.format(line_num, file, column, value)
+        )
+
+
+def import_file_worker(file, options):
+    command = Command()
+    command.configure(**options)
+    return command.import_file(file)
 
 
 class Command(BaseCommand):
     help = 'Импорт набора тестовых данных для приложения Review'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--data-dir', default=DATA_FILES_DIR,
+            help='Каталог с CSV-файлами для импорта'
+        )
+        parser.add_argument(
+            '--batch-size', type=int,
+            help='Количество строк в одной пачке вставки (по умолчанию '
+                 '{} для COPY и {} для ORM)'.format(
+                     DEFAULT_COPY_BATCH_SIZE, DEFAULT_BATCH_SIZE
+                 )
+        )
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Количество процессов для параллельного импорта'
+        )
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Продолжить прерванный импорт с последней пачки'
+        )
+        parser.add_argument(
+            '--upsert', action='store_true',
+            help='Обновлять уже существующие записи вместо ошибки'
+        )
+        parser.add_argument(
+            '--no-copy', action='store_false', dest='use_copy',
+            help='Загружать через ORM даже на PostgreSQL'
+        )
+
+    def configure(self, data_dir, batch_size, resume, upsert, use_copy,
+                  verbosity=1):
+        self.data_dir = data_dir
+        self.use_copy = use_copy and copy_supported()
+        self.batch_size = batch_size or (
+            DEFAULT_COPY_BATCH_SIZE if self.use_copy else DEFAULT_BATCH_SIZE
+        )
+        self.resume = resume
+        self.upsert = upsert
+        self.verbosity = verbosity
+        self.known_ids = {}
+
     def check_files(self):
         for file in DATA_FILES_LIST:
-            if file not in os.listdir(DATA_FILES_DIR):
+            if file not in os.listdir(self.data_dir):
                 raise CommandError(
                     'Отсутсвует необходимый для импорта файл  {}!'.format(file)
                 )
             self.stdout.write('  {}... '.format(file), ending='')
             self.stdout.write(self.style.SUCCESS('OK'))
 
-    def import_users(self):
-        self.stdout.write('  Импорт из users.csv... ', ending='')
-        with open(os.path.join(DATA_FILES_DIR, 'users.csv'),
-                  encoding='utf-8') as f:
-            csv_dict = csv.DictReader(f)
-            for line in csv_dict:
-                try:
-                    User.objects.create(**line)
-                except IntegrityError:
-                    raise CommandError(DATA_IMPORT_ERROR)
-        self.stdout.write(self.style.SUCCESS('OK'))
-
-    def import_category(self):
-        self.stdout.write('  Импорт из category.csv... ', ending='')
-        with open(os.path.join(DATA_FILES_DIR, 'category.csv'),
-                  encoding='utf-8') as f:
-            csv_dict = csv.DictReader(f)
-            for line in csv_dict:
-                try:
-                    Category.objects.create(**line)
-                except IntegrityError:
-                    raise CommandError(DATA_IMPORT_ERROR)
-        self.stdout.write(self.style.SUCCESS('OK'))
-
-    def import_titles(self):
-        self.stdout.write('  Импорт из titles.csv... ', ending='')
-        with open(os.path.join(DATA_FILES_DIR, 'titles.csv'),
-                  encoding='utf-8') as f:
-            csv_dict = csv.DictReader(f)
-            for line in csv_dict:
-                line['category'] = Category.objects.get(pk=line['category'])
-                try:
-                    Title.objects.create(**line)
-                except IntegrityError:
-                    raise CommandError(DATA_IMPORT_ERROR)
-        self.stdout.write(self.style.SUCCESS('OK'))
-
-    def import_reviews(self):
-        self.stdout.write('  Импорт из review.csv... ', ending='')
-        with open(os.path.join(DATA_FILES_DIR, 'review.csv'),
-                  encoding='utf-8') as f:
-            csv_dict = csv.DictReader(f)
-            for line in csv_dict:
-                line['author'] = User.objects.get(pk=line['author'])
-                line['title'] = Title.objects.get(pk=line['title_id'])
-                try:
-                    Review.objects.create(**line)
-                except IntegrityError:
-                    raise CommandError(DATA_IMPORT_ERROR)
-        self.stdout.write(self.style.SUCCESS('OK'))
-
-    def import_comments(self):
-        self.stdout.write('  Импорт из comments.csv... ', ending='')
-        with open(os.path.join(DATA_FILES_DIR, 'comments.csv'),
-                  encoding='utf-8') as f:
-            csv_dict = csv.DictReader(f)
-            for line in csv_dict:
-                line['author'] = User.objects.get(pk=line['author'])
-                line['review'] = Review.objects.get(pk=line['review_id'])
-                try:
-                    Comment.objects.create(**line)
-                except IntegrityError:
-                    raise CommandError(DATA_IMPORT_ERROR)
-        self.stdout.write(self.style.SUCCESS('OK'))
-
-    def import_genre(self):
-        self.stdout.write('  Импорт из genre.csv... ', ending='')
-        with open(os.path.join(DATA_FILES_DIR, 'genre.csv'),
-                  encoding='utf-8') as f:
-            csv_dict = csv.DictReader(f)
-            for line in csv_dict:
-                try:
-                    Genre.objects.create(**line)
-                except IntegrityError:
-                    raise CommandError(DATA_IMPORT_ERROR)
-        self.stdout.write(self.style.SUCCESS('OK'))
-
-    def import_genre_title(self):
-        self.stdout.write('  Импорт из genre_title.csv... ', ending='')
-        with open(os.path.join(DATA_FILES_DIR, 'genre_title.csv'),
-                  encoding='utf-8') as f:
-            csv_dict = csv.DictReader(f)
-            for line in csv_dict:
-                try:
-                    TitleGenre.objects.create(
-                        title=Title.objects.get(pk=line['title_id']),
-                        genre=Genre.objects.get(pk=line['genre_id'])
+    def get_known_ids(self, model):
+        """Множество id модели в базе, пополняемое по ходу импорта."""
+        if model not in self.known_ids:
+            self.known_ids[model] = set(
+                model.objects.values_list('pk', flat=True).iterator()
+            )
+        return self.known_ids[model]
+
+    def build_rows(self, file, foreign_keys, columns, rows, first_line):
+        """Проверяет id и внешние ключи, возвращает значения по колонкам.
+
+        Строки не превращаются в объекты моделей: при загрузке через COPY
+        значения уходят в базу как есть.
+        """
+        for line_num, row in enumerate(rows, start=first_line):
+            if 'id' in row:
+                parse_id(row['id'], file, line_num, 'id')
+            for column, (field, related_model) in foreign_keys.items():
+                value = row.pop(column)
+                if value:
+                    pk = parse_id(value, file, line_num, column)
+                    if pk not in self.get_known_ids(related_model):
+                        raise CommandError(FOREIGN_KEY_ERROR.format(
+                            line_num, file,
+                            related_model._meta.verbose_name, value
+                        ))
+                row[field] = value
+            yield [row[column] for column in columns]
+
+    def insert_batches(self, model, columns, rows):
+        known_ids = self.known_ids.get(model)
+        id_index = columns.index('id') if 'id' in columns else None
+        batch = list(islice(rows, self.batch_size))
+        while batch:
+            save_rows(model, columns, batch, self.upsert, self.use_copy)
+            if known_ids is not None and id_index is not None:
+                known_ids.update(int(row[id_index]) for row in batch)
+            yield len(batch)
+            batch = list(islice(rows, self.batch_size))
+
+    def get_checkpoint(self, file):
+        checkpoint, _ = ImportCheckpoint.objects.get_or_create(file=file)
+        if not self.resume:
+            checkpoint.rows = 0
+            checkpoint.completed = False
+            checkpoint.save()
+        return checkpoint
+
+    def import_rows(self, file, reader, start_row):
+        model, foreign_keys = DATA_FILES_MAP[file]
+        columns = [
+            foreign_keys.get(column, (column,))[0]
+            for column in reader.fieldnames
+        ]
+        rows = self.build_rows(
+            file, foreign_keys, columns,
+            islice(reader, start_row, None), start_row + 2
+        )
+        batches = self.insert_batches(model, columns, rows)
+        imported = 0
+        while True:
+            with transaction.atomic():
+                count = next(batches, 0)
+                imported += count
+                ImportCheckpoint.objects.filter(file=file).update(
+                    rows=start_row + imported, completed=not count
+                )
+            if not count:
+                return imported
+            if self.verbosity > 1:
+                self.stdout.write('    {}: {} строк'.format(
+                    file, start_row + imported
+                ))
+
+    def import_file(self, file):
+        """Импортирует файл, сохраняя контрольную точку с каждой пачкой.
+
+        Без --resume файл загружается в одной транзакции, с --resume
+        каждая пачка фиксируется вместе с контрольной точкой.
+        """
+        started = time.monotonic()
+        with open(os.path.join(self.data_dir, file), encoding='utf-8',
+                  newline='') as f:
+            try:
+                with nullcontext() if self.resume else transaction.atomic():
+                    checkpoint = self.get_checkpoint(file)
+                    if checkpoint.completed:
+                        return {'skipped': True}
+                    imported = self.import_rows(
+                        file, csv.DictReader(f), checkpoint.rows
                     )
-                except IntegrityError:
-                    raise CommandError(DATA_IMPORT_ERROR)
-        self.stdout.write(self.style.SUCCESS('OK'))
+            except IntegrityError:
+                raise CommandError(DATA_IMPORT_ERROR)
+        return {
+            'rows': imported,
+            'resumed_from': checkpoint.rows,
+            'elapsed': time.monotonic() - started,
+        }
+
+    def report(self, file, stats):
+        self.stdout.write('  Импорт из {}... '.format(file), ending='')
+        if stats.get('skipped'):
+            self.stdout.write(self.style.WARNING('уже импортирован'))
+            return
+        message = 'OK ({} строк, {:.0f} строк/с)'.format(
+            stats['rows'],
+            stats['rows'] / stats['elapsed'] if stats['elapsed'] else 0
+        )
+        if stats['resumed_from']:
+            message += ', продолжен со строки {}'.format(
+                stats['resumed_from'] + 1
+            )
+        self.stdout.write(self.style.SUCCESS(message))
+
+    def import_stage(self, files, workers):
+        if workers < 2 or len(files) < 2:
+            for file in files:
+                self.report(file, self.import_file(file))
+            return
+        options = {
+            'data_dir': self.data_dir,
+            'batch_size': self.batch_size,
+            'resume': self.resume,
+            'upsert': self.upsert,
+            'use_copy': self.use_copy,
+        }
+        # процессы не должны делить соединение родителя
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=min(workers, len(files)),
+                                 initializer=django.setup) as pool:
+            futures = [
+                pool.submit(import_file_worker, file, options)
+                for file in files
+            ]
+            for file, future in zip(files, futures):
+                self.report(file, future.result())
+
+    def reset_sequences(self):
+        """Сдвигает последовательности id после вставки с явными id."""
+        sequence_sql = connection.ops.sequence_reset_sql(
+            no_style(), [model for _, model, _ in DATA_FILES]
+        )
+        with connection.cursor() as cursor:
+            for sql in sequence_sql:
+                cursor.execute(sql)
 
     def handle(self, *args, **options):
+        self.configure(
+            options['data_dir'], options['batch_size'], options['resume'],
+            options['upsert'], options['use_copy'], options['verbosity']
+        )
+        workers = options['workers']
+        if workers > 1 and connection.vendor == 'sqlite':
+            self.stdout.write(self.style.WARNING(SQLITE_WORKERS_WARNING))
+            workers = 1
         self.stdout.write(self.style.MIGRATE_HEADING(
-            'Проверка наличия файлов в каталоге static/data/:'
+            'Проверка наличия файлов в каталоге {}:'.format(self.data_dir)
         ))
         self.check_files()
         self.stdout.write(self.style.MIGRATE_HEADING(
             'Импорт данных из файлов:'
         ))
-        self.import_users()
-        self.import_category()
-        self.import_titles()
-        self.import_reviews()
-        self.import_comments()
-        self.import_genre()
-        self.import_genre_title()
+        for files in get_import_stages():
+            self.import_stage(files, workers)
+        self.reset_sequences()
+        notify_changed(*(model for _, model, _ in DATA_FILES))
+        call_command('rebuildratings', stdout=self.stdout)
+        call_command('rebuildstats', stdout=self.stdout)
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Coalesce
+from reviews.models import Title
+from reviews.signals import notify_changed
+from reviews.stats import rebuild_title_ratings
+
+RATING_OK_MESSAGE = 'Счетчики рейтинга в порядке'
+RATING_MISMATCH_ERROR = 'Счетчики рейтинга расходятся у {} произведений!'
+
+
+class Command(BaseCommand):
+    help = 'Пересчет и проверка сохраненного рейтинга произведений'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Только проверить счетчики, ничего не изменяя'
+        )
+
+    def find_mismatched(self):
+        return (
+            Title.objects
+            .annotate(
+                actual_sum=Coalesce(Sum('reviews__score'), 0),
+                actual_count=Count('reviews')
+            )
+            .exclude(
+                rating_sum=F('actual_sum'), rating_count=F('actual_count')
+            )
+            .order_by('id')
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            mismatched = list(self.find_mismatched())
+            for title in mismatched:
+                self.stdout.write(
+                    '  {} (id={}): {}/{} вместо {}/{}'.format(
+                        title.name, title.id,
+                        title.rating_sum, title.rating_count,
+                        title.actual_sum, title.actual_count
+                    )
+                )
+            if mismatched:
+                raise CommandError(
+                    RATING_MISMATCH_ERROR.format(len(mismatched))
+                )
+            self.stdout.write(self.style.SUCCESS(RATING_OK_MESSAGE))
+            return
+        updated = rebuild_title_ratings()
+        notify_changed(Title)
+        self.stdout.write(self.style.SUCCESS(
+            'Рейтинг пересчитан для {} произведений'.format(updated)
+        ))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from reviews.models import TitleStats
+from reviews.signals import notify_changed
+from reviews.stats import rebuild_title_stats
+
+
+class Command(BaseCommand):
+    help = 'Пересчет статистики отзывов и комментариев произведений'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--title', type=int, nargs='+', dest='title_ids',
+            help='id произведений для пересчета (по умолчанию все)'
+        )
+
+    def handle(self, *args, **options):
+        rebuilt = rebuild_title_stats(options['title_ids'])
+        notify_changed(TitleStats)
+        self.stdout.write(self.style.SUCCESS(
+            'Статистика пересчитана для {} произведений'.format(rebuilt)
+        ))
@@ -0,0 +1,67 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from reviews.mail import (MAX_ATTEMPTS, claim_batch, deliver, mark_failed,
+                          mark_sent)
+
+
+class Command(BaseCommand):
+    help = 'Отправка писем из очереди OutboxEmail'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads', type=int, default=4,
+            help='Количество потоков, одновременно отправляющих письма'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=50,
+            help='Количество писем, выбираемых из очереди за раз'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=5,
+            help='Пауза в секундах, если очередь пуста'
+        )
+        parser.add_argument(
+            '--max-attempts', type=int, default=MAX_ATTEMPTS,
+            help='Количество попыток, после которых письмо не отправляется'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Отправить письма, которым пора уйти, и завершиться'
+        )
+
+    def process_batch(self, pool, batch_size, max_attempts):
+        """Отправляет пачку писем, статусы обновляются в основном потоке."""
+        emails = claim_batch(batch_size)
+        futures = [(email, pool.submit(deliver, email)) for email in emails]
+        sent = []
+        for email, future in futures:
+            error = future.exception()
+            if error is None:
+                sent.append(email)
+                continue
+            mark_failed(email, error, max_attempts)
+            self.stderr.write('  {}: {!r}'.format(email.recipient, error))
+        mark_sent(sent)
+        if emails and self.verbosity > 0:
+            self.stdout.write('Отправлено писем: {} из {}'.format(
+                len(sent), len(emails)
+            ))
+        return len(emails)
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+            try:
+                while True:
+                    processed = self.process_batch(
+                        pool, options['batch_size'], options['max_attempts']
+                    )
+                    if processed:
+                        continue
+                    if options['once']:
+                        return
+                    time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                self.stdout.write('Отправка остановлена')
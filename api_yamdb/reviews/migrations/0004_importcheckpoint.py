@@ -0,0 +1,27 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0003_title_rating'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportCheckpoint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.CharField(max_length=255, unique=True, verbose_name='Файл')),
+                ('rows', models.PositiveIntegerField(default=0, verbose_name='Импортировано строк')),
+                ('completed', models.BooleanField(default=False, verbose_name='Импорт завершен')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+            ],
+            options={
+                'verbose_name': 'контрольная точка импорта',
+                'verbose_name_plural': 'контрольные точки импорта',
+            },
+        ),
+    ]
@@ -0,0 +1,82 @@
+import warnings
+
+from django.db import DatabaseError, migrations, transaction
+
+# Выражения индексов совпадают с SQL, который строит TitleFilter:
+# поиск по SearchVector с весами и фильтр name__icontains
+CREATE_SEARCH_INDEX = (
+    "CREATE INDEX reviews_title_search_idx ON reviews_title USING gin (("
+    "setweight(to_tsvector('russian'::regconfig, "
+    "COALESCE(name, '')), 'A') || "
+    "setweight(to_tsvector('russian'::regconfig, "
+    "COALESCE(description, '')), 'B')))"
+)
+CREATE_TRIGRAM_INDEX = (
+    'CREATE INDEX reviews_title_name_trgm_idx ON reviews_title '
+    'USING gin ((UPPER(name::text)) gin_trgm_ops)'
+)
+TRIGRAM_SKIPPED_WARNING = (
+    'Расширение pg_trgm не создано ({}), индекс для фильтра по названию '
+    'пропущен. Создайте расширение от имени владельца базы и примените '
+    'миграцию заново.'
+)
+DROP_INDEXES = (
+    'DROP INDEX IF EXISTS reviews_title_search_idx',
+    'DROP INDEX IF EXISTS reviews_title_name_trgm_idx',
+)
+
+
+def trigram_available(schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+        )
+        return cursor.fetchone() is not None
+
+
+def create_trigram_extension(schema_editor):
+    """Создает pg_trgm, если это возможно.
+
+    Сборки PostgreSQL без contrib не содержат pg_trgm, а на управляемых
+    базах у роли приложения может не быть прав на создание расширений.
+    Тогда фильтр по названию остается последовательным просмотром.
+    """
+    if not trigram_available(schema_editor):
+        return False
+    try:
+        # ошибка в точке сохранения не прерывает транзакцию миграции
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    except DatabaseError as error:
+        warnings.warn(TRIGRAM_SKIPPED_WARNING.format(
+            str(error).strip()
+        ))
+        return False
+    return True
+
+
+def create_indexes(apps, schema_editor):
+    # на SQLite поиск работает без индексов
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(CREATE_SEARCH_INDEX)
+    if create_trigram_extension(schema_editor):
+        schema_editor.execute(CREATE_TRIGRAM_INDEX)
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for sql in DROP_INDEXES:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0004_importcheckpoint'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
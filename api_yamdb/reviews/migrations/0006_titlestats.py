@@ -0,0 +1,73 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Max
+
+
+def fill_stats(apps, schema_editor):
+    # копия пересчета на момент миграции: reviews.stats может меняться
+    Review = apps.get_model('reviews', 'Review')
+    Comment = apps.get_model('reviews', 'Comment')
+    Title = apps.get_model('reviews', 'Title')
+    TitleStats = apps.get_model('reviews', 'TitleStats')
+    stats = {
+        pk: TitleStats(title_id=pk)
+        for pk in Title.objects.values_list('pk', flat=True).iterator()
+    }
+    review_totals = (
+        Review.objects.values('title_id', 'score')
+        .annotate(count=Count('id'), latest=Max('pub_date')).order_by()
+    )
+    comment_totals = (
+        Comment.objects.values('review__title_id')
+        .annotate(count=Count('id'), latest=Max('pub_date')).order_by()
+    )
+    for row in review_totals.iterator():
+        title_stats = stats[row['title_id']]
+        setattr(title_stats, 'score_{}'.format(row['score']), row['count'])
+        title_stats.reviews_count += row['count']
+        title_stats.last_activity = max(
+            filter(None, (title_stats.last_activity, row['latest']))
+        )
+    for row in comment_totals.iterator():
+        title_stats = stats[row['review__title_id']]
+        title_stats.comments_count = row['count']
+        title_stats.last_activity = max(
+            filter(None, (title_stats.last_activity, row['latest']))
+        )
+    TitleStats.objects.bulk_create(stats.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_title_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleStats',
+            fields=[
+                ('title', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='reviews.Title', verbose_name='Произведение')),
+                ('score_1', models.PositiveIntegerField(default=0, verbose_name='Оценок 1')),
+                ('score_2', models.PositiveIntegerField(default=0, verbose_name='Оценок 2')),
+                ('score_3', models.PositiveIntegerField(default=0, verbose_name='Оценок 3')),
+                ('score_4', models.PositiveIntegerField(default=0, verbose_name='Оценок 4')),
+                ('score_5', models.PositiveIntegerField(default=0, verbose_name='Оценок 5')),
+                ('score_6', models.PositiveIntegerField(default=0, verbose_name='Оценок 6')),
+                ('score_7', models.PositiveIntegerField(default=0, verbose_name='Оценок 7')),
+                ('score_8', models.PositiveIntegerField(default=0, verbose_name='Оценок 8')),
+                ('score_9', models.PositiveIntegerField(default=0, verbose_name='Оценок 9')),
+                ('score_10', models.PositiveIntegerField(default=0, verbose_name='Оценок 10')),
+                ('reviews_count', models.PositiveIntegerField(default=0, verbose_name='Количество отзывов')),
+                ('comments_count', models.PositiveIntegerField(default=0, verbose_name='Количество комментариев')),
+                ('last_activity', models.DateTimeField(blank=True, null=True, verbose_name='Последняя активность')),
+            ],
+            options={
+                'verbose_name': 'статистика произведения',
+                'verbose_name_plural': 'статистика произведений',
+            },
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Min
+
+
+def remove_duplicate_genres(apps, schema_editor):
+    # повторы жанров произведения мешают уникальному индексу
+    TitleGenre = apps.get_model('reviews', 'TitleGenre')
+    duplicates = (
+        TitleGenre.objects.values('title_id', 'genre_id')
+        .annotate(first_id=Min('id'), count=Count('id'))
+        .filter(count__gt=1).order_by()
+    )
+    for row in duplicates:
+        TitleGenre.objects.filter(
+            title_id=row['title_id'], genre_id=row['genre_id']
+        ).exclude(id=row['first_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_tokenuser'),
+    ]
+
+    # новые индексы создаются раньше, чем удаляются покрытые ими индексы
+    # внешних ключей
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['review', 'pub_date', 'id'], name='comment_review_pub_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['title', 'pub_date', 'id'], name='review_title_pub_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['category', 'year'], name='title_category_year_idx'),
+        ),
+        migrations.RunPython(
+            remove_duplicate_genres, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='titlegenre',
+            constraint=models.UniqueConstraint(fields=('title', 'genre'), name='unique_title_genre'),
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='review',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='reviews.Review', verbose_name='Отзыв'),
+        ),
+        migrations.AlterField(
+            model_name='review',
+            name='title',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='reviews', to='reviews.Title', verbose_name='Произведение'),
+        ),
+        migrations.AlterField(
+            model_name='title',
+            name='category',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='titles', to='reviews.Category', verbose_name='Категория'),
+        ),
+        migrations.AlterField(
+            model_name='titlegenre',
+            name='title',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='reviews.Title'),
+        ),
+    ]
@@ -1,7 +1,10 @@
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.core.exceptions import ObjectDoesNotExist
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.db.models.functions import Greatest
+from django.utils import timezone
 
 from .utils import get_current_year
 
@@ -74,6 +77,24 @@ class User(AbstractUser):
         ]
 
 
+class TokenUser(User):
+    """Пользователь, восстановленный из утверждений токена без запроса.
+
+    Заполнены только id, username, role и is_staff, поэтому такой
+    пользователь годится для проверки прав и ссылок на автора, но не для
+    сохранения.
+    """
+
+    class Meta:
+        proxy = True
+
+    def save(self, *args, **kwargs):
+        raise TypeError(
+            'Пользователь из токена доступен только для чтения, '
+            'для сохранения загрузите его из базы'
+        )
+
+
 class BaseModel(models.Model):
     pub_date = models.DateTimeField(auto_now_add=True, db_index=True)
 
@@ -117,32 +138,75 @@ class Title(models.Model):
             MaxValueValidator(get_current_year)
         ])
     description = models.TextField(verbose_name='Описание')
+    # поиск по категории покрывает индекс (category, year)
     category = models.ForeignKey(
         Category, on_delete=models.SET_NULL, related_name='titles',
         verbose_name='Категория',
-        blank=True, null=True
+        blank=True, null=True, db_index=False
     )
     genre = models.ManyToManyField(
         Genre, related_name='genres', through='TitleGenre'
     )
+    rating_sum = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Сумма оценок'
+    )
+    rating_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Количество оценок'
+    )
 
     class Meta:
         verbose_name = 'произведение'
         verbose_name_plural = 'произведения'
+        indexes = [
+            models.Index(
+                fields=['category', 'year'], name='title_category_year_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
+    @property
+    def rating(self):
+        if not self.rating_count:
+            return None
+        return self.rating_sum / self.rating_count
+
+    @classmethod
+    def update_rating(cls, title_id, score_delta, count_delta=0):
+        """Атомарно сдвигает счетчики рейтинга без чтения строки."""
+        cls.objects.filter(pk=title_id).update(
+            rating_sum=models.F('rating_sum') + score_delta,
+            rating_count=models.F('rating_count') + count_delta
+        )
+
+    def get_stats(self):
+        """Статистика произведения, пустая, если ее еще нет в базе."""
+        try:
+            return self.stats
+        except ObjectDoesNotExist:
+            return TitleStats(title=self)
+
 
 class TitleGenre(models.Model):
-    title = models.ForeignKey(Title, on_delete=models.CASCADE)
+    # поиск по произведению покрывает уникальный индекс (title, genre)
+    title = models.ForeignKey(Title, on_delete=models.CASCADE, db_index=False)
     genre = models.ForeignKey(Genre, on_delete=models.CASCADE)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['title', 'genre'], name='unique_title_genre'
+            )
+        ]
+
 
 class Review(BaseModel):
+    # ленту отзывов произведения и поиск по нему покрывает индекс
+    # (title, pub_date, id)
     title = models.ForeignKey(
         Title, on_delete=models.CASCADE, related_name='reviews',
-        verbose_name='Произведение',
+        verbose_name='Произведение', db_index=False
     )
     text = models.TextField(verbose_name='Текст')
     author = models.ForeignKey(
@@ -161,6 +225,11 @@ class Review(BaseModel):
                 name='unique_author_title'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['title', 'pub_date', 'id'], name='review_title_pub_idx'
+            ),
+        ]
         verbose_name = 'отзыв'
         verbose_name_plural = 'отзывы'
 
@@ -169,9 +238,10 @@ class Review(BaseModel):
 
 
 class Comment(BaseModel):
+    # ленту комментариев отзыва покрывает индекс (review, pub_date, id)
     review = models.ForeignKey(
         Review, on_delete=models.CASCADE, related_name='comments',
-        verbose_name='Отзыв'
+        verbose_name='Отзыв', db_index=False
     )
     text = models.TextField(verbose_name='Текст')
     author = models.ForeignKey(
@@ -180,8 +250,155 @@ class Comment(BaseModel):
     )
 
     class Meta(BaseModel.Meta):
+        indexes = [
+            models.Index(
+                fields=['review', 'pub_date', 'id'],
+                name='comment_review_pub_idx'
+            ),
+        ]
         verbose_name = 'комментарий'
         verbose_name_plural = 'комментарии'
 
     def __str__(self):
         return f'{self.text[:30]}...'
+
+
+class TitleStats(models.Model):
+    """Счетчики отзывов и комментариев произведения.
+
+    Обновляются при записи отзывов и комментариев через API,
+    пересчитываются командой rebuildstats.
+    """
+    SCORE_FIELD = 'score_{}'
+    SCORES = range(1, 11)
+
+    title = models.OneToOneField(
+        Title, on_delete=models.CASCADE, primary_key=True,
+        related_name='stats', verbose_name='Произведение'
+    )
+    score_1 = models.PositiveIntegerField(default=0, verbose_name='Оценок 1')
+    score_2 = models.PositiveIntegerField(default=0, verbose_name='Оценок 2')
+    score_3 = models.PositiveIntegerField(default=0, verbose_name='Оценок 3')
+    score_4 = models.PositiveIntegerField(default=0, verbose_name='Оценок 4')
+    score_5 = models.PositiveIntegerField(default=0, verbose_name='Оценок 5')
+    score_6 = models.PositiveIntegerField(default=0, verbose_name='Оценок 6')
+    score_7 = models.PositiveIntegerField(default=0, verbose_name='Оценок 7')
+    score_8 = models.PositiveIntegerField(default=0, verbose_name='Оценок 8')
+    score_9 = models.PositiveIntegerField(default=0, verbose_name='Оценок 9')
+    score_10 = models.PositiveIntegerField(
+        default=0, verbose_name='Оценок 10'
+    )
+    reviews_count = models.PositiveIntegerField(
+        default=0, verbose_name='Количество отзывов'
+    )
+    comments_count = models.PositiveIntegerField(
+        default=0, verbose_name='Количество комментариев'
+    )
+    last_activity = models.DateTimeField(
+        null=True, blank=True, verbose_name='Последняя активность'
+    )
+
+    class Meta:
+        verbose_name = 'статистика произведения'
+        verbose_name_plural = 'статистика произведений'
+
+    def __str__(self):
+        return str(self.title_id)
+
+    @property
+    def histogram(self):
+        return {
+            score: getattr(self, self.SCORE_FIELD.format(score))
+            for score in self.SCORES
+        }
+
+    @classmethod
+    def update_counters(cls, title_id, scores=None, reviews=0, comments=0,
+                        activity=None):
+        """Атомарно сдвигает счетчики, создавая строку при первой записи.
+
+        scores - словарь {оценка: изменение числа отзывов с этой оценкой},
+        activity - время новой записи. Счетчики не уходят ниже нуля, даже
+        если статистика не была пересчитана после загрузки данных.
+        """
+        deltas = {
+            cls.SCORE_FIELD.format(score): delta
+            for score, delta in (scores or {}).items()
+        }
+        deltas['reviews_count'] = reviews
+        deltas['comments_count'] = comments
+        changes = {
+            field: Greatest(models.F(field) + delta, 0)
+            for field, delta in deltas.items() if delta
+        }
+        if activity is not None:
+            changes['last_activity'] = activity
+        if not changes:
+            return
+        stats = cls.objects.filter(title_id=title_id)
+        if not stats.update(**changes):
+            cls.objects.get_or_create(title_id=title_id)
+            stats.update(**changes)
+
+
+class ImportCheckpoint(models.Model):
+    file = models.CharField(max_length=255, unique=True, verbose_name='Файл')
+    rows = models.PositiveIntegerField(
+        default=0, verbose_name='Импортировано строк'
+    )
+    completed = models.BooleanField(
+        default=False, verbose_name='Импорт завершен'
+    )
+    updated = models.DateTimeField(auto_now=True, verbose_name='Обновлено')
+
+    class Meta:
+        verbose_name = 'контрольная точка импорта'
+        verbose_name_plural = 'контрольные точки импорта'
+
+    def __str__(self):
+        return self.file
+
+
+class OutboxEmail(models.Model):
+    """Письмо в очереди на отправку командой sendqueuedmail."""
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'Ожидает отправки'),
+        (SENT, 'Отправлено'),
+        (FAILED, 'Не отправлено'),
+    )
+
+    subject = models.CharField(max_length=255, verbose_name='Тема')
+    message = models.TextField(verbose_name='Текст')
+    from_email = models.CharField(max_length=254, verbose_name='Отправитель')
+    recipient = models.EmailField(verbose_name='Получатель')
+    status = models.CharField(
+        max_length=max(len(status) for status, _ in STATUS_CHOICES),
+        choices=STATUS_CHOICES, default=PENDING, verbose_name='Статус'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0, verbose_name='Попыток отправки'
+    )
+    next_attempt = models.DateTimeField(
+        default=timezone.now, verbose_name='Следующая попытка'
+    )
+    last_error = models.TextField(blank=True, verbose_name='Последняя ошибка')
+    created = models.DateTimeField(auto_now_add=True, verbose_name='Создано')
+    sent = models.DateTimeField(
+        null=True, blank=True, verbose_name='Отправлено'
+    )
+
+    class Meta:
+        verbose_name = 'письмо в очереди'
+        verbose_name_plural = 'очередь писем'
+        indexes = [
+            models.Index(
+                fields=['status', 'next_attempt'],
+                name='outbox_status_next_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipient}: {self.subject}'
@@ -0,0 +1,100 @@
+"""Регистрация пользователя одним запросом к базе.
+
+На PostgreSQL вставка нового пользователя, выдача кода существующему
+пользователю без кода и поиск конфликтующих записей выполняются одним
+выражением с изменяющими данные CTE, без отката неудачной вставки. На
+остальных СУБД те же шаги выполняются тремя запросами в транзакции.
+"""
+from django.db import connection, transaction
+from django.db.models import Q
+
+from .models import User
+
+SIGNUP_SQL = '''
+WITH inserted AS (
+    INSERT INTO {table} ({columns}) VALUES ({values})
+    ON CONFLICT DO NOTHING
+    RETURNING id, username, email, confirmation_code
+), updated AS (
+    UPDATE {table} SET confirmation_code = %s
+    WHERE username = %s AND email = %s AND confirmation_code = ''
+    RETURNING id, username, email, confirmation_code
+)
+SELECT username, email, confirmation_code FROM inserted
+UNION ALL
+SELECT username, email, confirmation_code FROM updated
+UNION ALL
+SELECT username, email, confirmation_code FROM {table}
+WHERE (username = %s OR email = %s) AND id NOT IN (SELECT id FROM updated)
+'''
+SIGNUP_ATTEMPTS = 2
+
+
+class SignupConflictError(Exception):
+    """Имя пользователя или email заняты другим пользователем."""
+
+    def __init__(self, field):
+        super().__init__(field)
+        self.field = field
+
+
+def upsert_rows(user):
+    quote_name = connection.ops.quote_name
+    fields = [
+        field for field in User._meta.concrete_fields
+        if not field.primary_key
+    ]
+    sql = SIGNUP_SQL.format(
+        table=quote_name(User._meta.db_table),
+        columns=', '.join(quote_name(field.column) for field in fields),
+        values=', '.join(['%s'] * len(fields)),
+    )
+    params = [
+        field.get_db_prep_save(field.pre_save(user, True), connection)
+        for field in fields
+    ] + [
+        user.confirmation_code, user.username, user.email,
+        user.username, user.email,
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def orm_upsert_rows(user):
+    with transaction.atomic():
+        User.objects.bulk_create([user], ignore_conflicts=True)
+        User.objects.filter(
+            username=user.username, email=user.email, confirmation_code=''
+        ).update(confirmation_code=user.confirmation_code)
+        return list(
+            User.objects.filter(
+                Q(username=user.username) | Q(email=user.email)
+            ).values_list('username', 'email', 'confirmation_code')
+        )
+
+
+def register_user(username, email, code):
+    """Возвращает код подтверждения пользователя с username и email.
+
+    Новый пользователь создается с кодом code, у существующего остается
+    прежний код. Если username или email принадлежат другому
+    пользователю, выбрасывается SignupConflictError с именем поля.
+    """
+    user = User(username=username, email=email, confirmation_code=code)
+    if connection.vendor == 'postgresql':
+        save = upsert_rows
+    else:
+        save = orm_upsert_rows
+    for _ in range(SIGNUP_ATTEMPTS):
+        rows = save(user)
+        # пусто, если конфликтующая запись была вставлена параллельно и
+        # еще не видна в снимке выражения
+        if rows:
+            break
+    for row_username, row_email, row_code in rows:
+        if (row_username, row_email) == (username, email):
+            return row_code
+    if not rows or username in {row[0] for row in rows}:
+        raise SignupConflictError('username')
+    raise SignupConflictError('email')
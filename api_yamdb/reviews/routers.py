@@ -0,0 +1,133 @@
+"""Чтение каталога с реплик базы.
+
+Запросы на чтение (reviews.utils.is_read_method) читают произведения,
+жанры, категории, отзывы и комментарии с одной из реплик DB_REPLICAS,
+выбранной по кругу с учетом весов; на весь запрос выбирается одна
+реплика. Пользователь, изменивший данные, следующие DB_REPLICA_PIN_SECONDS
+секунд читает с основной базы и видит свои изменения, даже если реплика
+отстает. Недоступная реплика пропускается DB_REPLICA_RETRY_SECONDS секунд,
+если недоступны все - чтение идет с основной базы. Вне запросов
+(команды, тесты) все запросы идут в основную базу.
+"""
+import threading
+import time
+from itertools import cycle
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+from .utils import is_read_method
+
+PINNED_KEY = 'db:pinned:{}'
+REPLICATED_MODELS = (
+    'reviews.Title', 'reviews.TitleGenre', 'reviews.TitleStats',
+    'reviews.Genre', 'reviews.Category', 'reviews.Review', 'reviews.Comment',
+)
+NOT_CHOSEN = object()
+
+state = threading.local()
+
+
+class Replicas:
+    """Очередь реплик по весам и отметки о недоступности."""
+
+    def __init__(self, weights):
+        self.count = sum(weights.values())
+        self.queue = cycle([
+            alias for alias, weight in weights.items()
+            for _ in range(weight)
+        ])
+        self.down_until = {}
+
+    def choose(self):
+        for _ in range(self.count):
+            alias = next(self.queue)
+            if self.down_until.get(alias, 0) > time.monotonic():
+                continue
+            try:
+                connections[alias].ensure_connection()
+            except DatabaseError:
+                self.down_until[alias] = (
+                    time.monotonic() + settings.DB_REPLICA_RETRY_SECONDS
+                )
+                continue
+            return alias
+        return None
+
+
+# очереди по настройкам реплик, чтобы тесты могли менять DB_REPLICAS
+replica_queues = {}
+
+
+def get_replicas():
+    key = tuple(settings.DB_REPLICAS.items())
+    if key not in replica_queues:
+        replica_queues[key] = Replicas(dict(settings.DB_REPLICAS))
+    return replica_queues[key]
+
+
+def start_request(request):
+    state.request = request
+    state.alias = NOT_CHOSEN
+
+
+def finish_request():
+    state.request = None
+    state.alias = NOT_CHOSEN
+
+
+def pin_writer(request, response):
+    """Закрепляет за пользователем основную базу после записи."""
+    user = getattr(request, 'user', None)
+    if (
+        settings.DB_REPLICAS and not is_read_method(request.method)
+        and response.status_code < 400
+        and user is not None and user.is_authenticated
+    ):
+        cache.set(
+            PINNED_KEY.format(user.id), True,
+            settings.DB_REPLICA_PIN_SECONDS
+        )
+
+
+def is_pinned(request):
+    user = getattr(request, 'user', None)
+    return (
+        user is not None and user.is_authenticated
+        and cache.get(PINNED_KEY.format(user.id)) is not None
+    )
+
+
+def get_read_alias():
+    """Реплика для чтения в текущем запросе или None."""
+    request = getattr(state, 'request', None)
+    if request is None or not settings.DB_REPLICAS:
+        return None
+    if state.alias is NOT_CHOSEN:
+        state.alias = None
+        if is_read_method(request.method) and not is_pinned(request):
+            state.alias = get_replicas().choose()
+    return state.alias
+
+
+def used_replica():
+    return getattr(state, 'alias', None) not in (None, NOT_CHOSEN)
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if model._meta.label not in REPLICATED_MODELS:
+            return None
+        return get_read_alias()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # реплики содержат те же данные, что и основная база
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DB_REPLICAS
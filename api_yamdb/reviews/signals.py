@@ -0,0 +1,15 @@
+"""Сигнал об изменении данных в обход API.
+
+Его отправляют админка и команды импорта и пересчета. Приложение api по
+нему сбрасывает кэш ответов и меняет ETag и Last-Modified, которые
+вычисляются по версиям в кэше и сами по себе видят только запись через API.
+"""
+from django.dispatch import Signal
+
+# отправитель - модель, записи которой изменились
+data_changed = Signal()
+
+
+def notify_changed(*models):
+    for model in models:
+        data_changed.send(sender=model)
@@ -0,0 +1,84 @@
+"""Пересчет рейтинга и статистики произведений по отзывам и комментариям."""
+from django.db import transaction
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Review, Title, TitleStats
+
+
+def latest(*dates):
+    return max((date for date in dates if date is not None), default=None)
+
+
+def rating_totals(aggregate):
+    return Coalesce(
+        Subquery(
+            Review.objects.filter(title=OuterRef('pk'))
+            .order_by().values('title')
+            .annotate(total=aggregate).values('total'),
+            output_field=IntegerField()
+        ),
+        0
+    )
+
+
+def rebuild_title_ratings(title_ids=None):
+    """Пересчитывает счетчики рейтинга указанных или всех произведений.
+
+    Возвращает количество пересчитанных произведений.
+    """
+    titles = Title.objects.all()
+    if title_ids is not None:
+        titles = titles.filter(pk__in=title_ids)
+    return titles.update(
+        rating_sum=rating_totals(Sum('score')),
+        rating_count=rating_totals(Count('id'))
+    )
+
+
+def rebuild_title_stats(title_ids=None):
+    """Пересчитывает TitleStats для указанных или всех произведений.
+
+    Возвращает количество пересчитанных произведений.
+    """
+    titles = Title.objects.all()
+    reviews = Review.objects.all()
+    comments = Comment.objects.all()
+    if title_ids is not None:
+        titles = titles.filter(pk__in=title_ids)
+        reviews = reviews.filter(title_id__in=title_ids)
+        comments = comments.filter(review__title_id__in=title_ids)
+    stats = {
+        pk: TitleStats(title_id=pk)
+        for pk in titles.values_list('pk', flat=True).iterator()
+    }
+    review_totals = (
+        reviews.values('title_id', 'score')
+        .annotate(count=Count('id'), latest=Max('pub_date'))
+        .order_by()
+    )
+    for row in review_totals.iterator():
+        title_stats = stats[row['title_id']]
+        setattr(
+            title_stats, TitleStats.SCORE_FIELD.format(row['score']),
+            row['count']
+        )
+        title_stats.reviews_count += row['count']
+        title_stats.last_activity = latest(
+            title_stats.last_activity, row['latest']
+        )
+    comment_totals = (
+        comments.values('review__title_id')
+        .annotate(count=Count('id'), latest=Max('pub_date'))
+        .order_by()
+    )
+    for row in comment_totals.iterator():
+        title_stats = stats[row['review__title_id']]
+        title_stats.comments_count = row['count']
+        title_stats.last_activity = latest(
+            title_stats.last_activity, row['latest']
+        )
+    with transaction.atomic():
+        TitleStats.objects.filter(title_id__in=titles.values('pk')).delete()
+        TitleStats.objects.bulk_create(stats.values())
+    return len(stats)
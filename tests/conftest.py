@@ -1,9 +1,50 @@
 import sys
 from os.path import abspath, dirname, join
 
+import pytest
+
 root_dir = dirname(dirname(abspath(__file__)))
 sys.path.append(root_dir)
 infra_dir_path = join(root_dir, 'infra')
 
 pytest_plugins = [
+    'tests.fixtures.fixture_data',
+    'tests.fixtures.fixture_benchmark',
 ]
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        '--benchmark', action='store_true', default=False,
+        help='Запустить нагрузочные тесты на синтетических данных'
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        'markers', 'benchmark: нагрузочный тест, запускается с --benchmark'
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('--benchmark'):
+        return
+    skip_benchmark = pytest.mark.skip(reason='нужен флаг --benchmark')
+    for item in items:
+        if 'benchmark' in item.keywords:
+            item.add_marker(skip_benchmark)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    from api import slugs
+    from django.core.cache import cache
+
+    cache.clear()
+    slugs.clear()
+
+
+def pytest_terminal_summary(terminalreporter):
+    from .fixtures.fixture_benchmark import write_benchmark_report
+
+    write_benchmark_report(terminalreporter)
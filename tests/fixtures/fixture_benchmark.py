@@ -0,0 +1,274 @@
+import io
+import json
+import os
+import time
+from datetime import timedelta
+from itertools import islice
+
+import pytest
+
+BENCHMARK_SIZES = {
+    'titles': int(os.getenv('BENCHMARK_TITLES', 2000)),
+    'users': int(os.getenv('BENCHMARK_USERS', 200)),
+    'genres': int(os.getenv('BENCHMARK_GENRES', 30)),
+    'categories': int(os.getenv('BENCHMARK_CATEGORIES', 10)),
+    'reviews_per_title': int(os.getenv('BENCHMARK_REVIEWS_PER_TITLE', 100)),
+    'comments_per_review': int(
+        os.getenv('BENCHMARK_COMMENTS_PER_REVIEW', 1)
+    ),
+}
+BENCHMARK_ROUNDS = int(os.getenv('BENCHMARK_ROUNDS', 20))
+BENCHMARK_BATCH_SIZE = 5000
+
+# Бюджеты по умолчанию; переопределяются JSON-файлом из BENCHMARK_BUDGETS
+# вида {"titles-list": {"queries": 3, "p95_ms": 50}}
+DEFAULT_BUDGET = {'queries': 10, 'p95_ms': 500}
+BENCHMARK_BUDGETS = {
+    'categories-list': {'queries': 2},
+    'genres-list': {'queries': 2},
+    'titles-list': {'queries': 3},
+    'titles-filter': {'queries': 3},
+    'titles-search': {'queries': 3},
+    'titles-detail': {'queries': 2},
+    'titles-stats': {'queries': 1},
+    'titles-not-modified': {'queries': 0},
+    # отзывы и комментарии: плюс агрегат по родителю для ETag,
+    # авторы выбираются вместе с записями
+    'reviews-list': {'queries': 4},
+    'reviews-detail': {'queries': 3},
+    'reviews-not-modified': {'queries': 1},
+    'comments-list': {'queries': 4},
+    'comments-detail': {'queries': 3},
+    # страницы по 100 записей через .values() и через сериализаторы
+    'titles-page-lean': {'queries': 3},
+    'titles-page-drf': {'queries': 3},
+    'reviews-page-lean': {'queries': 4},
+    'reviews-page-drf': {'queries': 4},
+    'users-list': {'queries': 3},
+    'users-detail': {'queries': 2},
+    'users-me': {'queries': 1},
+    # поиск пользователя и письмо в очередь
+    'auth-signup': {'queries': 2},
+    'auth-token': {'queries': 1},
+    # SELECT 1 с подключением и по постоянному соединению с проверкой
+    'db-connect': {'queries': 0},
+    'db-reuse': {'queries': 0},
+}
+
+SAVEPOINT_STATEMENTS = (
+    'SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT'
+)
+
+benchmark_results = []
+
+
+def get_budget(name):
+    budgets = dict(BENCHMARK_BUDGETS)
+    budgets_file = os.getenv('BENCHMARK_BUDGETS')
+    if budgets_file:
+        with open(budgets_file, encoding='utf-8') as f:
+            for key, value in json.load(f).items():
+                budgets[key] = {**budgets.get(key, {}), **value}
+    return {**DEFAULT_BUDGET, **budgets.get(name, {})}
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    index = round(percent / 100 * (len(ordered) - 1))
+    return ordered[index]
+
+
+def bulk_insert(model, objects):
+    objects = iter(objects)
+    batch = list(islice(objects, BENCHMARK_BATCH_SIZE))
+    while batch:
+        model.objects.bulk_create(batch)
+        batch = list(islice(objects, BENCHMARK_BATCH_SIZE))
+
+
+def seed_benchmark_data(sizes):
+    """Заполняет базу синтетическими данными с явными id.
+
+    Явные id избавляют от перечитывания объектов после bulk_create,
+    последовательности после вставки сбрасываются.
+    """
+    from django.core.management import call_command
+    from django.core.management.color import no_style
+    from django.db import connection
+    from django.utils import timezone
+    from reviews.models import (Category, Comment, Genre, Review, Title,
+                                TitleGenre, User)
+
+    now = timezone.now()
+    bulk_insert(User, (
+        User(
+            id=i, username=f'bench-user-{i}',
+            email=f'bench-user-{i}@yamdb.fake',
+            role=User.ADMIN if i == 1 else User.USER,
+            confirmation_code=f'code-{i}'
+        )
+        for i in range(1, sizes['users'] + 1)
+    ))
+    bulk_insert(Category, (
+        Category(id=i, name=f'Категория {i}', slug=f'bench-category-{i}')
+        for i in range(1, sizes['categories'] + 1)
+    ))
+    bulk_insert(Genre, (
+        Genre(id=i, name=f'Жанр {i}', slug=f'bench-genre-{i}')
+        for i in range(1, sizes['genres'] + 1)
+    ))
+    bulk_insert(Title, (
+        Title(
+            id=i, name=f'Произведение {i}', year=1900 + i % 120,
+            description='Описание произведения',
+            category_id=i % sizes['categories'] + 1
+        )
+        for i in range(1, sizes['titles'] + 1)
+    ))
+    bulk_insert(TitleGenre, (
+        TitleGenre(title_id=title_id, genre_id=(title_id + shift)
+                   % sizes['genres'] + 1)
+        for title_id in range(1, sizes['titles'] + 1)
+        for shift in range(3)
+    ))
+    reviews_per_title = min(sizes['reviews_per_title'], sizes['users'])
+    bulk_insert(Review, (
+        Review(
+            id=(title_id - 1) * reviews_per_title + n + 1,
+            title_id=title_id, author_id=n + 1,
+            text='Текст отзыва', score=(title_id + n) % 10 + 1,
+            pub_date=now - timedelta(minutes=n)
+        )
+        for title_id in range(1, sizes['titles'] + 1)
+        for n in range(reviews_per_title)
+    ))
+    reviews_count = sizes['titles'] * reviews_per_title
+    bulk_insert(Comment, (
+        Comment(
+            review_id=review_id, author_id=(review_id + n)
+            % sizes['users'] + 1,
+            text='Текст комментария', pub_date=now - timedelta(minutes=n)
+        )
+        for review_id in range(1, reviews_count + 1)
+        for n in range(sizes['comments_per_review'])
+    ))
+    sequence_sql = connection.ops.sequence_reset_sql(
+        no_style(), (User, Category, Genre, Title, TitleGenre, Review, Comment)
+    )
+    with connection.cursor() as cursor:
+        for sql in sequence_sql:
+            cursor.execute(sql)
+    call_command('rebuildratings', stdout=io.StringIO())
+    call_command('rebuildstats', stdout=io.StringIO())
+
+
+def count_queries(captured):
+    # точки сохранения появляются только из-за транзакции теста,
+    # в рабочем режиме transaction.atomic дает BEGIN/COMMIT без запросов
+    return sum(
+        1 for query in captured
+        if not query['sql'].startswith(SAVEPOINT_STATEMENTS)
+    )
+
+
+class Benchmark:
+    def __init__(self, client, rounds=BENCHMARK_ROUNDS):
+        self.client = client
+        self.rounds = rounds
+
+    def __call__(self, name, method, path, data=None, **extra):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        send = getattr(self.client, method)
+        timings, queries = [], []
+        for _ in range(self.rounds):
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = send(path, data, **extra)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(count_queries(context.captured_queries))
+        assert response.status_code < 400, (
+            f'{name}: запрос {path} вернул {response.status_code}'
+        )
+        return self.record(
+            name, timings, max(queries), response.status_code,
+            len(response.content)
+        )
+
+    def measure(self, name, func):
+        """Время вызова func, например подключения к базе, без HTTP."""
+        timings = []
+        for _ in range(self.rounds):
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        return self.record(name, timings, 0, '-', 0)
+
+    def record(self, name, timings, queries, status, size):
+        result = {
+            'name': name,
+            'status': status,
+            'queries': queries,
+            'p50_ms': percentile(timings, 50),
+            'p95_ms': percentile(timings, 95),
+            'bytes': size,
+        }
+        benchmark_results.append(result)
+        budget = get_budget(name)
+        assert result['queries'] <= budget['queries'], (
+            f'{name}: {result["queries"]} SQL-запросов при бюджете '
+            f'{budget["queries"]}'
+        )
+        assert result['p95_ms'] <= budget['p95_ms'], (
+            f'{name}: p95 {result["p95_ms"]:.1f} мс при бюджете '
+            f'{budget["p95_ms"]} мс'
+        )
+        return result
+
+
+@pytest.fixture(scope='session')
+def benchmark_data(django_db_setup, django_db_blocker):
+    with django_db_blocker.unblock():
+        seed_benchmark_data(BENCHMARK_SIZES)
+    return BENCHMARK_SIZES
+
+
+@pytest.fixture
+def benchmark(benchmark_data, db, settings):
+    from api import slugs
+    from rest_framework.test import APIClient
+    from reviews.models import Category, Genre
+
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+    # повторы одного запроса не должны упираться в ограничения частоты
+    settings.REST_FRAMEWORK = {
+        **settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}
+    }
+    # слаги жанров и категорий в работающем процессе уже в памяти
+    slugs.get_ids(Genre, [])
+    slugs.get_ids(Category, [])
+    return Benchmark(APIClient())
+
+
+def write_benchmark_report(terminalreporter):
+    if not benchmark_results:
+        return
+    terminalreporter.section('benchmarks')
+    terminalreporter.write_line(
+        f'{"endpoint":<22}{"status":>7}{"queries":>9}'
+        f'{"p50, ms":>10}{"p95, ms":>10}{"bytes":>9}'
+    )
+    for result in benchmark_results:
+        terminalreporter.write_line(
+            f'{result["name"]:<22}{result["status"]:>7}'
+            f'{result["queries"]:>9}{result["p50_ms"]:>10.2f}'
+            f'{result["p95_ms"]:>10.2f}{result["bytes"]:>9}'
+        )
+    report_path = os.getenv('BENCHMARK_REPORT')
+    if report_path:
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(
+                {'sizes': BENCHMARK_SIZES, 'results': benchmark_results},
+                f, ensure_ascii=False, indent=2
+            )
@@ -0,0 +1,95 @@
+import pytest
+
+
+@pytest.fixture
+def catalog(db):
+    from reviews.models import Category, Genre, Title, TitleGenre
+
+    # bulk_create не возвращает первичные ключи на SQLite,
+    # поэтому созданные объекты перечитываются из базы
+    Category.objects.bulk_create(
+        Category(name=f'Категория {i}', slug=f'category-{i}')
+        for i in range(3)
+    )
+    categories = list(Category.objects.order_by('id'))
+    Genre.objects.bulk_create(
+        Genre(name=f'Жанр {i}', slug=f'genre-{i}') for i in range(4)
+    )
+    genres = list(Genre.objects.order_by('id'))
+    Title.objects.bulk_create(
+        Title(
+            name=f'Произведение {i}', year=2000 + i, description='',
+            category=categories[i % len(categories)]
+        )
+        for i in range(12)
+    )
+    titles = list(Title.objects.order_by('id'))
+    TitleGenre.objects.bulk_create(
+        TitleGenre(title=title, genre=genre)
+        for i, title in enumerate(titles)
+        for genre in genres[:i % len(genres) + 1]
+    )
+    return titles
+
+
+@pytest.fixture
+def api_client():
+    from rest_framework.test import APIClient
+
+    return APIClient()
+
+
+@pytest.fixture
+def authorize(api_client, db):
+    """Создает пользователя с ролью и авторизует api_client его токеном."""
+    from rest_framework_simplejwt.tokens import AccessToken
+    from reviews.models import User
+
+    def authorize(username, role=User.USER):
+        user = User.objects.create(
+            username=username, email=f'{username}@yamdb.fake', role=role
+        )
+        api_client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}'
+        )
+        return user
+
+    return authorize
+
+
+@pytest.fixture
+def title_reviews(catalog):
+    from django.utils import timezone
+    from reviews.models import Comment, Review, User
+
+    title = catalog[0]
+    User.objects.bulk_create(
+        User(username=f'reviewer-{i}', email=f'reviewer-{i}@yamdb.fake')
+        for i in range(12)
+    )
+    authors = list(User.objects.filter(username__startswith='reviewer-'))
+    Review.objects.bulk_create(
+        Review(title=title, author=author, text='Отзыв', score=i % 10 + 1)
+        for i, author in enumerate(authors)
+    )
+    reviews = list(Review.objects.filter(title=title).order_by('id'))
+    # половина отзывов с одинаковой датой, чтобы проверить порядок по id
+    Review.objects.filter(
+        id__in=[review.id for review in reviews[::2]]
+    ).update(pub_date=timezone.now())
+    Comment.objects.bulk_create(
+        Comment(review=reviews[0], author=author, text='Комментарий')
+        for author in authors
+    )
+    return reviews
+
+
+@pytest.fixture
+def slug_cache(catalog):
+    """Загружает слаги жанров и категорий каталога в память процесса."""
+    from api import slugs
+    from reviews.models import Category, Genre
+
+    slugs.get_ids(Genre, [])
+    slugs.get_ids(Category, [])
+    return slugs
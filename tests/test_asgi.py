@@ -0,0 +1,91 @@
+import asyncio
+import json
+
+import pytest
+from django.core.signals import request_finished
+from reviews.management.commands.loadtest import build_request, percentile
+
+
+def call_asgi(path, query_string=b''):
+    from api_yamdb.asgi import application
+
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b''}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        'type': 'http', 'http_version': '1.1', 'method': 'GET',
+        'path': path, 'root_path': '', 'query_string': query_string,
+        'headers': [(b'host', b'testserver')],
+        'server': ('testserver', 80), 'client': ('127.0.0.1', 5000),
+    }
+    asyncio.new_event_loop().run_until_complete(
+        application(scope, receive, send)
+    )
+    return messages
+
+
+@pytest.mark.django_db(transaction=True)
+class TestAsgi:
+
+    @pytest.fixture(autouse=True)
+    def close_connections(self, monkeypatch):
+        from django.db import connection
+
+        # потоки пула не должны держать соединения с тестовой базой
+        monkeypatch.setitem(connection.settings_dict, 'CONN_MAX_AGE', 0)
+
+    def test_read_paths(self, title_reviews):
+        review = title_reviews[0]
+        for path in (
+            '/api/v1/titles/',
+            f'/api/v1/titles/{review.title_id}/reviews/',
+            f'/api/v1/titles/{review.title_id}/reviews/{review.id}/comments/',
+        ):
+            start, *body = call_asgi(path)
+            assert start['type'] == 'http.response.start'
+            assert start['status'] == 200, path
+            data = json.loads(b''.join(
+                message.get('body', b'') for message in body
+            ))
+            assert data['count'] >= 1, path
+            assert body[-1].get('more_body', False) is False
+
+    def test_request_finished(self):
+        finished = []
+
+        def receiver(**kwargs):
+            finished.append(kwargs)
+
+        request_finished.connect(receiver)
+        try:
+            start = call_asgi('/api/v1/missing/')[0]
+        finally:
+            request_finished.disconnect(receiver)
+        assert start['status'] == 404
+        assert len(finished) == 1, (
+            'Проверьте, что ответ закрывается и соединения с базой '
+            'освобождаются после запроса'
+        )
+
+
+class TestLoadtest:
+
+    def test_build_request(self):
+        host, port, request = build_request(
+            'http://localhost:8000/api/v1/titles/?limit=5', 'abc'
+        )
+        assert (host, port) == ('localhost', 8000)
+        assert request.startswith(b'GET /api/v1/titles/?limit=5 HTTP/1.1\r\n')
+        assert b'Authorization: Bearer abc\r\n' in request
+        assert request.endswith(b'\r\n\r\n')
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        assert percentile(values, 50) == 51
+        assert percentile(values, 99) == 100
+        assert percentile([], 95) == 0
@@ -0,0 +1,211 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import AccessToken
+from reviews.models import OutboxEmail, TokenUser, User
+
+SIGNUP_URL = '/api/v1/auth/signup/'
+TOKEN_URL = '/api/v1/auth/token/'
+USERS_URL = '/api/v1/users/'
+
+
+def signup(api_client, username, email=None, **extra):
+    return api_client.post(SIGNUP_URL, {
+        'username': username, 'email': email or f'{username}@yamdb.fake'
+    }, **extra)
+
+
+@pytest.fixture
+def throttle_rates(settings):
+    def set_rates(**rates):
+        settings.REST_FRAMEWORK = {
+            **settings.REST_FRAMEWORK,
+            'DEFAULT_THROTTLE_RATES': {
+                scope.replace('_', '-'): rate for scope, rate in rates.items()
+            },
+        }
+    return set_rates
+
+
+@pytest.mark.django_db
+class TestSignup:
+
+    def test_new_user_gets_code(self, api_client):
+        response = signup(api_client, 'newcomer')
+        assert response.status_code == 200
+        user = User.objects.get(username='newcomer')
+        assert user.confirmation_code
+        assert user.confirmation_code in OutboxEmail.objects.get().message
+
+    def test_repeated_signup_keeps_code(self, api_client):
+        signup(api_client, 'newcomer')
+        code = User.objects.get(username='newcomer').confirmation_code
+        response = signup(api_client, 'newcomer')
+        assert response.status_code == 200
+        assert User.objects.get(username='newcomer').confirmation_code == (
+            code
+        ), 'Проверьте, что повторная регистрация не меняет код'
+        assert [email.message for email in OutboxEmail.objects.all()] == [
+            OutboxEmail.objects.first().message
+        ] * 2
+
+    def test_existing_user_without_code_gets_code(self, api_client):
+        User.objects.create(username='invited', email='invited@yamdb.fake')
+        response = signup(api_client, 'invited')
+        assert response.status_code == 200
+        assert User.objects.get(username='invited').confirmation_code
+
+    @pytest.mark.parametrize('username, email, field', [
+        ('taken', 'other@yamdb.fake', 'именем'),
+        ('other', 'taken@yamdb.fake', 'email'),
+    ])
+    def test_conflicts(self, api_client, username, email, field):
+        User.objects.create(username='taken', email='taken@yamdb.fake')
+        response = signup(api_client, username, email)
+        assert response.status_code == 400
+        assert field in response.data['error'], (
+            'Проверьте, что ошибка называет занятое поле'
+        )
+        assert User.objects.count() == 1
+        assert not OutboxEmail.objects.exists()
+
+    @pytest.mark.skipif(
+        connection.vendor != 'postgresql',
+        reason='одно выражение только на PostgreSQL'
+    )
+    def test_signup_resolves_user_in_one_statement(self, api_client):
+        with CaptureQueriesContext(connection) as context:
+            signup(api_client, 'newcomer')
+        statements = [
+            query['sql'] for query in context.captured_queries
+            if 'SAVEPOINT' not in query['sql']
+        ]
+        # пользователь и письмо в очередь
+        assert len(statements) == 2, statements
+
+
+@pytest.mark.django_db
+class TestAuthThrottling:
+
+    def test_username_throttle(self, api_client, throttle_rates):
+        throttle_rates(auth_username='2/min')
+        User.objects.create(
+            username='victim', email='victim@yamdb.fake',
+            confirmation_code='code'
+        )
+        for _ in range(2):
+            response = api_client.post(TOKEN_URL, {
+                'username': 'victim', 'confirmation_code': 'guess'
+            })
+            assert response.status_code == 400
+        response = api_client.post(TOKEN_URL, {
+            'username': 'victim', 'confirmation_code': 'code'
+        }, REMOTE_ADDR='10.0.0.2')
+        assert response.status_code == 429, (
+            'Проверьте, что подбор кода ограничен для имени пользователя '
+            'независимо от IP'
+        )
+        response = api_client.post(TOKEN_URL, {
+            'username': 'other', 'confirmation_code': 'code'
+        })
+        assert response.status_code == 404
+
+    def test_ip_throttle(self, api_client, throttle_rates):
+        throttle_rates(auth_ip='3/min')
+        for i in range(3):
+            assert signup(api_client, f'user-{i}').status_code == 200
+        assert signup(api_client, 'user-3').status_code == 429, (
+            'Проверьте, что число запросов с одного IP ограничено'
+        )
+        response = signup(api_client, 'user-4', REMOTE_ADDR='10.0.0.2')
+        assert response.status_code == 200
+
+
+@pytest.fixture
+def stateless_client(api_client, settings):
+    """Авторизует api_client токеном, выданным /auth/token/."""
+    settings.JWT_STATELESS_AUTH = True
+
+    def authorize(username, role=User.USER):
+        user = User.objects.create(
+            username=username, email=f'{username}@yamdb.fake', role=role,
+            confirmation_code='code'
+        )
+        response = api_client.post(TOKEN_URL, {
+            'username': username, 'confirmation_code': 'code'
+        })
+        api_client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {response.data["access"]}'
+        )
+        return user
+
+    return authorize
+
+
+@pytest.mark.django_db(transaction=True)
+class TestStatelessAuth:
+
+    def test_token_carries_role(self, api_client):
+        User.objects.create(
+            username='admin', email='admin@yamdb.fake', role=User.ADMIN,
+            confirmation_code='code'
+        )
+        response = api_client.post(TOKEN_URL, {
+            'username': 'admin', 'confirmation_code': 'code'
+        })
+        token = AccessToken(response.data['access'])
+        assert (token['username'], token['role'], token['is_staff']) == (
+            'admin', User.ADMIN, False
+        )
+
+    def test_user_is_not_queried(self, api_client, stateless_client,
+                                 django_assert_num_queries):
+        stateless_client('admin', User.ADMIN)
+        assert api_client.get(USERS_URL).status_code == 200
+        # выборка пользователей и COUNT для пагинации
+        with django_assert_num_queries(2):
+            response = api_client.get(USERS_URL)
+        assert response.status_code == 200
+
+    def test_role_change_revokes_token(self, api_client, stateless_client):
+        stateless_client('admin', User.ADMIN)
+        token = api_client._credentials['HTTP_AUTHORIZATION']
+        stateless_client('other', User.ADMIN)
+        assert api_client.get(USERS_URL).status_code == 200
+        response = api_client.patch(
+            f'{USERS_URL}admin/', {'role': User.USER}
+        )
+        assert response.status_code == 200
+        api_client.credentials(HTTP_AUTHORIZATION=token)
+        response = api_client.get(USERS_URL)
+        assert response.status_code == 401, (
+            'Проверьте, что после смены роли прежний токен отклоняется'
+        )
+
+    def test_me_and_reviews(self, api_client, stateless_client, catalog):
+        user = stateless_client('critic')
+        User.objects.filter(pk=user.pk).update(bio='Критик')
+        response = api_client.patch(f'{USERS_URL}me/', {'first_name': 'Имя'})
+        assert response.status_code == 200
+        user.refresh_from_db()
+        assert (user.bio, user.first_name, user.email) == (
+            'Критик', 'Имя', 'critic@yamdb.fake'
+        ), 'Проверьте, что профиль не затирается данными из токена'
+        response = api_client.post(
+            f'/api/v1/titles/{catalog[0].id}/reviews/',
+            {'text': 'Отзыв', 'score': 5}
+        )
+        assert response.status_code == 201
+        assert response.data['author'] == 'critic'
+
+    def test_token_without_claims(self, api_client, authorize, settings):
+        settings.JWT_STATELESS_AUTH = True
+        authorize('admin', User.ADMIN)
+        assert api_client.get(USERS_URL).status_code == 200, (
+            'Проверьте, что токены без утверждений о роли принимаются'
+        )
+
+    def test_token_user_is_read_only(self):
+        user = TokenUser(id=1, username='admin', role=User.ADMIN)
+        with pytest.raises(TypeError, match='только для чтения'):
+            user.save()
@@ -0,0 +1,185 @@
+import pytest
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db]
+
+
+def deep_page(count):
+    from django.conf import settings
+
+    return max(count // settings.REST_FRAMEWORK['PAGE_SIZE'], 1)
+
+
+def auth_header(user):
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    return {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(user)}'}
+
+
+@pytest.fixture
+def bench_admin(benchmark_data):
+    from reviews.models import User
+
+    return User.objects.get(username='bench-user-1')
+
+
+@pytest.fixture
+def bench_review(benchmark_data):
+    from reviews.models import Review
+
+    return Review.objects.filter(comments__isnull=False).order_by('id')[0]
+
+
+class TestBenchmarkCatalog:
+
+    @pytest.mark.parametrize('name, path', [
+        ('categories-list', '/api/v1/categories/'),
+        ('genres-list', '/api/v1/genres/'),
+        ('titles-filter', '/api/v1/titles/?genre=bench-genre-2&year=1901'),
+        ('titles-search', '/api/v1/titles/?search=Произведение%2042'),
+        ('titles-detail', '/api/v1/titles/1/'),
+        ('titles-stats', '/api/v1/titles/1/stats/'),
+    ])
+    def test_catalog(self, benchmark, name, path):
+        benchmark(name, 'get', path)
+
+    def test_titles_deep_page(self, benchmark, benchmark_data):
+        page = deep_page(benchmark_data['titles'])
+        benchmark('titles-list', 'get', f'/api/v1/titles/?page={page}')
+
+    def test_titles_not_modified(self, api_client, benchmark):
+        path = '/api/v1/titles/'
+        etag = api_client.get(path)['ETag']
+        benchmark('titles-not-modified', 'get', path,
+                  HTTP_IF_NONE_MATCH=etag)
+
+
+class TestBenchmarkReviews:
+
+    def test_reviews_list(self, benchmark, bench_review):
+        page = deep_page(bench_review.title.reviews.count())
+        benchmark(
+            'reviews-list', 'get',
+            f'/api/v1/titles/{bench_review.title_id}/reviews/?page={page}'
+        )
+
+    def test_reviews_not_modified(self, api_client, benchmark,
+                                  bench_review):
+        path = f'/api/v1/titles/{bench_review.title_id}/reviews/'
+        etag = api_client.get(path)['ETag']
+        benchmark('reviews-not-modified', 'get', path,
+                  HTTP_IF_NONE_MATCH=etag)
+
+    def test_reviews_detail(self, benchmark, bench_review):
+        benchmark(
+            'reviews-detail', 'get',
+            f'/api/v1/titles/{bench_review.title_id}'
+            f'/reviews/{bench_review.id}/'
+        )
+
+    def test_comments_list(self, benchmark, bench_review):
+        benchmark(
+            'comments-list', 'get',
+            f'/api/v1/titles/{bench_review.title_id}'
+            f'/reviews/{bench_review.id}/comments/'
+        )
+
+    def test_comments_detail(self, benchmark, bench_review):
+        comment = bench_review.comments.all()[0]
+        benchmark(
+            'comments-detail', 'get',
+            f'/api/v1/titles/{bench_review.title_id}'
+            f'/reviews/{bench_review.id}/comments/{comment.id}/'
+        )
+
+
+class TestBenchmarkUsers:
+
+    def test_users_list(self, benchmark, bench_admin, benchmark_data):
+        page = deep_page(benchmark_data['users'])
+        benchmark(
+            'users-list', 'get', f'/api/v1/users/?page={page}',
+            **auth_header(bench_admin)
+        )
+
+    def test_users_detail(self, benchmark, bench_admin):
+        benchmark(
+            'users-detail', 'get', '/api/v1/users/bench-user-2/',
+            **auth_header(bench_admin)
+        )
+
+    def test_users_me(self, benchmark, bench_admin):
+        benchmark(
+            'users-me', 'get', '/api/v1/users/me/',
+            **auth_header(bench_admin)
+        )
+
+
+class TestBenchmarkAuth:
+
+    def test_signup(self, benchmark):
+        benchmark('auth-signup', 'post', '/api/v1/auth/signup/', {
+            'username': 'bench-user-3', 'email': 'bench-user-3@yamdb.fake'
+        })
+
+    def test_token(self, benchmark):
+        benchmark('auth-token', 'post', '/api/v1/auth/token/', {
+            'username': 'bench-user-3', 'confirmation_code': 'code-3'
+        })
+
+
+class TestBenchmarkSerialization:
+    """Страницы по 100 записей без кэша: .values() против сериализаторов."""
+
+    @pytest.fixture(autouse=True)
+    def large_pages(self, settings, monkeypatch):
+        from rest_framework.pagination import PageNumberPagination
+
+        settings.API_CACHE_TIMEOUT = 0
+        monkeypatch.setattr(PageNumberPagination, 'page_size', 100)
+
+    @pytest.mark.parametrize('lean', [True, False], ids=['lean', 'drf'])
+    def test_titles_page(self, benchmark, settings, lean):
+        settings.API_LEAN_READS = lean
+        benchmark(
+            'titles-page-' + ('lean' if lean else 'drf'), 'get',
+            '/api/v1/titles/?page=2'
+        )
+
+    @pytest.mark.parametrize('lean', [True, False], ids=['lean', 'drf'])
+    def test_reviews_page(self, benchmark, settings, bench_review, lean):
+        settings.API_LEAN_READS = lean
+        benchmark(
+            'reviews-page-' + ('lean' if lean else 'drf'), 'get',
+            f'/api/v1/titles/{bench_review.title_id}/reviews/'
+        )
+
+
+class TestBenchmarkConnections:
+    """Подключение к базе на каждый запрос против постоянного соединения."""
+
+    @pytest.fixture
+    def connection(self):
+        from django.db import connection
+
+        connection = connection.copy()
+        yield connection
+        connection.close()
+
+    def test_new_connection(self, benchmark, connection):
+        def select():
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            connection.close()
+
+        benchmark.measure('db-connect', select)
+
+    def test_persistent_connection(self, benchmark, connection):
+        def select():
+            # так же, как ConnectionHealthCheckMiddleware перед запросом
+            if not connection.is_usable():
+                connection.close()
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+
+        connection.ensure_connection()
+        benchmark.measure('db-reuse', select)
@@ -0,0 +1,156 @@
+import json
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from reviews.models import Category, Genre, Title, User
+
+GENRES_URL = '/api/v1/genres/bulk/'
+CATEGORIES_URL = '/api/v1/categories/bulk/'
+TITLES_URL = '/api/v1/titles/bulk/'
+
+
+def post_ndjson(api_client, url, items):
+    return api_client.post(
+        url, '\n'.join(json.dumps(item) for item in items) + '\n',
+        content_type='application/x-ndjson'
+    )
+
+
+def error_indexes(response):
+    return [error['index'] for error in response.data['errors']]
+
+
+@pytest.mark.django_db
+class TestBulkWrite:
+
+    def test_admin_only(self, api_client, authorize):
+        items = [{'name': 'Жанр', 'slug': 'genre'}]
+        assert api_client.post(
+            GENRES_URL, items, format='json'
+        ).status_code == 401
+        authorize('user')
+        assert api_client.post(
+            GENRES_URL, items, format='json'
+        ).status_code == 403
+
+    def test_genres_create_reports_item_errors(self, api_client, authorize,
+                                               catalog):
+        authorize('admin', User.ADMIN)
+        response = api_client.post(GENRES_URL, [
+            {'name': 'Новый', 'slug': 'new'},
+            {'name': 'Повтор', 'slug': 'new'},
+            {'name': 'Занятый', 'slug': 'genre-0'},
+            {'name': 'Плохой', 'slug': 'bad slug'},
+            'не объект',
+            {'name': 'Еще', 'slug': 'other'},
+        ], format='json')
+        assert response.status_code == 201
+        assert response.data['saved'] == [
+            {'index': 0, 'slug': 'new'}, {'index': 5, 'slug': 'other'}
+        ]
+        assert error_indexes(response) == [1, 2, 3, 4], (
+            'Проверьте, что ошибки возвращаются с номером объекта'
+        )
+        assert Genre.objects.filter(slug__in=['new', 'other']).count() == 2
+
+    def test_categories_ndjson(self, api_client, authorize, catalog):
+        authorize('admin', User.ADMIN)
+        response = post_ndjson(api_client, CATEGORIES_URL, [
+            {'name': f'Категория {i}', 'slug': f'ndjson-{i}'}
+            for i in range(3)
+        ])
+        assert response.status_code == 201
+        assert Category.objects.filter(slug__startswith='ndjson-').count() == 3
+        response = api_client.patch(CATEGORIES_URL, [
+            {'name': 'Переименована', 'slug': 'ndjson-0'},
+            {'name': 'Нет такой', 'slug': 'missing'},
+        ], format='json')
+        assert response.status_code == 200
+        assert error_indexes(response) == [1]
+        assert Category.objects.get(slug='ndjson-0').name == 'Переименована'
+
+    def test_broken_ndjson(self, api_client, authorize):
+        authorize('admin', User.ADMIN)
+        response = api_client.post(
+            GENRES_URL, '{"name": "Жанр", "slug": "genre"}\n{oops\n',
+            content_type='application/x-ndjson'
+        )
+        assert response.status_code == 400
+        assert 'Строка 2' in response.data['detail']
+
+    def test_titles_create(self, api_client, authorize, catalog,
+                           slug_cache):
+        authorize('admin', User.ADMIN)
+        items = [
+            {'name': f'Пачка {i}', 'year': 2001, 'description': 'Описание',
+             'category': 'category-1',
+             'genre': ['genre-0', 'genre-2', 'genre-0']}
+            for i in range(20)
+        ] + [
+            {'name': 'Без категории', 'year': 2001, 'category': 'missing',
+             'genre': ['genre-0']},
+            {'name': 'Без жанра', 'year': 2001, 'category': 'category-1',
+             'genre': ['missing']},
+            {'name': 'Из будущего', 'year': 3000, 'category': 'category-1',
+             'genre': []},
+        ]
+        with CaptureQueriesContext(connection) as context:
+            response = api_client.post(TITLES_URL, items, format='json')
+        assert response.status_code == 201
+        statements = [
+            query['sql'] for query in context.captured_queries
+            if 'SAVEPOINT' not in query['sql']
+        ]
+        # пользователь, сверка id категорий и жанров с базой, вставка
+        # произведений и связей с жанрами: слаги берутся из памяти;
+        # без RETURNING произведения сохраняются по одному
+        if connection.vendor == 'postgresql':
+            assert len(statements) == 5, statements
+        assert error_indexes(response) == [20, 21, 22]
+        titles = Title.objects.filter(name__startswith='Пачка')
+        assert titles.count() == 20
+        title = titles.get(id=response.data['saved'][0]['id'])
+        assert title.category.slug == 'category-1'
+        assert sorted(title.genre.values_list('slug', flat=True)) == [
+            'genre-0', 'genre-2'
+        ]
+
+    def test_titles_update(self, api_client, authorize, catalog):
+        authorize('admin', User.ADMIN)
+        response = api_client.patch(TITLES_URL, [
+            {'id': catalog[0].id, 'name': 'Новое имя'},
+            {'id': catalog[1].id, 'genre': ['genre-3'],
+             'category': 'category-0'},
+            {'name': 'Без id'},
+            {'id': 0, 'name': 'Нет такого'},
+        ], format='json')
+        assert response.status_code == 200
+        assert error_indexes(response) == [2, 3]
+        first, second = (
+            Title.objects.get(id=catalog[0].id),
+            Title.objects.get(id=catalog[1].id),
+        )
+        assert first.name == 'Новое имя'
+        assert first.genre.count() == catalog[0].genre.count(), (
+            'Проверьте, что жанры меняются, только если переданы'
+        )
+        assert list(second.genre.values_list('slug', flat=True)) == [
+            'genre-3'
+        ]
+        assert second.category.slug == 'category-0'
+
+    def test_all_invalid(self, api_client, authorize, settings):
+        authorize('admin', User.ADMIN)
+        response = api_client.post(GENRES_URL, [{'name': 'Жанр'}],
+                                   format='json')
+        assert response.status_code == 400
+        assert response.data['saved'] == []
+        settings.API_BULK_MAX_ITEMS = 1
+        response = api_client.post(GENRES_URL, [
+            {'name': 'Жанр', 'slug': f'genre-{i}'} for i in range(2)
+        ], format='json')
+        assert response.status_code == 400
+        response = api_client.post(GENRES_URL, {'name': 'Жанр'},
+                                   format='json')
+        assert response.status_code == 400
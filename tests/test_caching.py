@@ -0,0 +1,103 @@
+import pytest
+from api.caching import get_stats
+from reviews.models import User
+
+
+@pytest.mark.django_db(transaction=True)
+class TestResponseCache:
+
+    def test_repeated_read_is_served_from_cache(
+            self, api_client, catalog, django_assert_num_queries):
+        first = api_client.get('/api/v1/titles/', {'year': 2003})
+        with django_assert_num_queries(0):
+            second = api_client.get('/api/v1/titles/', {'year': 2003})
+        assert first['X-Cache'] == 'MISS' and second['X-Cache'] == 'HIT', (
+            'Проверьте, что повторный запрос списка произведений '
+            'отдается из кэша'
+        )
+        assert second.data == first.data
+        assert get_stats('titles') == {'hits': 1, 'misses': 1}
+
+    def test_key_depends_on_query_and_role(self, api_client, authorize,
+                                           catalog):
+        api_client.get('/api/v1/genres/')
+        response = api_client.get('/api/v1/genres/', {'search': 'Жанр 1'})
+        assert response['X-Cache'] == 'MISS', (
+            'Проверьте, что параметры запроса входят в ключ кэша'
+        )
+        authorize('reader')
+        response = api_client.get('/api/v1/genres/')
+        assert response['X-Cache'] == 'MISS', (
+            'Проверьте, что роль пользователя входит в ключ кэша'
+        )
+
+    def test_genre_write_invalidates_genres_and_titles(
+            self, api_client, authorize, catalog):
+        api_client.get('/api/v1/genres/')
+        api_client.get(f'/api/v1/titles/{catalog[0].id}/')
+        authorize('admin', User.ADMIN)
+        api_client.delete('/api/v1/genres/genre-0/')
+        api_client.credentials()
+        genres = api_client.get('/api/v1/genres/')
+        title = api_client.get(f'/api/v1/titles/{catalog[0].id}/')
+        assert genres['X-Cache'] == title['X-Cache'] == 'MISS', (
+            'Проверьте, что удаление жанра сбрасывает кэш жанров '
+            'и произведений'
+        )
+        assert 'genre-0' not in [
+            genre['slug'] for genre in title.data['genre']
+        ]
+
+    def test_review_write_invalidates_rating(self, api_client, authorize,
+                                             catalog):
+        url = f'/api/v1/titles/{catalog[0].id}/'
+        assert api_client.get(url).data['rating'] is None
+        authorize('critic')
+        api_client.post(f'{url}reviews/', {'text': 'Отзыв', 'score': 7})
+        response = api_client.get(url)
+        assert response['X-Cache'] == 'MISS', (
+            'Проверьте, что новый отзыв сбрасывает кэш произведений'
+        )
+        assert response.data['rating'] == 7
+
+    def test_comment_write_keeps_titles_cache(self, api_client, authorize,
+                                              title_reviews):
+        review = title_reviews[0]
+        url = f'/api/v1/titles/{review.title_id}/'
+        etag = api_client.get('/api/v1/titles/')['ETag']
+        api_client.get(url)
+        comments = api_client.get(url, {'stats': 1}).data['stats']['comments_count']
+        authorize('reader')
+        response = api_client.post(
+            f'{url}reviews/{review.id}/comments/', {'text': 'Комментарий'}
+        )
+        assert response.status_code == 201
+        api_client.credentials()
+        assert api_client.get(url)['X-Cache'] == 'HIT', (
+            'Проверьте, что комментарий не сбрасывает кэш произведений'
+        )
+        assert api_client.get(
+            '/api/v1/titles/', HTTP_IF_NONE_MATCH=etag
+        ).status_code == 304
+        response = api_client.get(url, {'stats': 1})
+        assert response['X-Cache'] == 'MISS', (
+            'Проверьте, что комментарий сбрасывает кэш ответов '
+            'со статистикой'
+        )
+        assert response.data['stats']['comments_count'] == comments + 1
+
+    def test_cache_can_be_disabled(self, api_client, catalog, settings):
+        settings.API_CACHE_TIMEOUT = 0
+        api_client.get('/api/v1/categories/')
+        response = api_client.get('/api/v1/categories/')
+        assert 'X-Cache' not in response
+        assert get_stats('categories') == {'hits': 0, 'misses': 0}
+
+    @pytest.mark.parametrize('url', [
+        '/api/v1/genres/genre-0/', '/api/v1/categories/category-0/'
+    ])
+    def test_slug_detail_not_allowed(self, api_client, catalog, url):
+        response = api_client.get(url)
+        assert response.status_code == 405, (
+            'Проверьте, что жанр и категория не доступны по отдельности'
+        )
@@ -0,0 +1,146 @@
+import io
+
+import pytest
+from django.core.management import call_command
+from reviews.models import Review, Title, User
+
+
+@pytest.mark.django_db(transaction=True)
+class TestConditionalGet:
+
+    def test_titles_not_modified(self, api_client, catalog,
+                                 django_assert_num_queries):
+        response = api_client.get('/api/v1/titles/')
+        assert response.has_header('ETag') and response.has_header(
+            'Last-Modified'
+        ), 'Проверьте, что список произведений отдает ETag и Last-Modified'
+        with django_assert_num_queries(0):
+            not_modified = api_client.get(
+                '/api/v1/titles/', HTTP_IF_NONE_MATCH=response['ETag']
+            )
+        assert not_modified.status_code == 304, (
+            'Проверьте, что при совпадении ETag возвращается 304 без '
+            'запросов к базе'
+        )
+        assert not_modified['ETag'] == response['ETag']
+        not_modified = api_client.get(
+            '/api/v1/titles/',
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        assert not_modified.status_code == 304
+
+    def test_etag_depends_on_query(self, api_client, catalog):
+        etag = api_client.get('/api/v1/genres/')['ETag']
+        response = api_client.get(
+            '/api/v1/genres/', {'search': 'Жанр'}, HTTP_IF_NONE_MATCH=etag
+        )
+        assert response.status_code == 200
+
+    def test_category_write_changes_etag(self, api_client, authorize,
+                                         catalog):
+        etag = api_client.get('/api/v1/categories/')['ETag']
+        authorize('admin', User.ADMIN)
+        api_client.post(
+            '/api/v1/categories/', {'name': 'Новая', 'slug': 'new'}
+        )
+        api_client.credentials()
+        response = api_client.get(
+            '/api/v1/categories/', HTTP_IF_NONE_MATCH=etag
+        )
+        assert response.status_code == 200, (
+            'Проверьте, что создание категории меняет ETag списка'
+        )
+
+    def test_reviews_not_modified(self, api_client, title_reviews,
+                                  django_assert_num_queries):
+        url = f'/api/v1/titles/{title_reviews[0].title_id}/reviews/'
+        etag = api_client.get(url)['ETag']
+        # одна агрегация по отзывам произведения вместо выборки страницы
+        with django_assert_num_queries(1):
+            response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+
+    def test_review_update_changes_detail_etag(self, api_client, authorize,
+                                               catalog):
+        author = authorize('critic')
+        review = Review.objects.create(
+            title=catalog[0], author=author, text='Отзыв', score=5
+        )
+        url = f'/api/v1/titles/{catalog[0].id}/reviews/{review.id}/'
+        etag = api_client.get(url)['ETag']
+        api_client.patch(url, {'text': 'Исправленный отзыв'})
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что изменение отзыва меняет его ETag'
+        )
+        assert response.data['text'] == 'Исправленный отзыв'
+
+    @pytest.mark.parametrize('url', ['/api/v1/users/critic/',
+                                     '/api/v1/users/me/'])
+    def test_username_change_changes_etag(self, api_client, authorize,
+                                          catalog, url):
+        author = authorize('critic', User.ADMIN)
+        Review.objects.create(
+            title=catalog[0], author=author, text='Отзыв', score=5
+        )
+        reviews_url = f'/api/v1/titles/{catalog[0].id}/reviews/'
+        etag = api_client.get(reviews_url)['ETag']
+        assert api_client.patch(
+            url, {'username': 'renamed'}
+        ).status_code == 200
+        response = api_client.get(reviews_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что смена имени пользователя меняет ETag отзывов'
+        )
+        assert response.data['results'][0]['author'] == 'renamed'
+
+    def test_title_delete_changes_reviews_etag(self, api_client, authorize,
+                                               catalog):
+        url = f'/api/v1/titles/{catalog[0].id}/reviews/'
+        etag = api_client.get(url)['ETag']
+        authorize('admin', User.ADMIN)
+        assert api_client.delete(
+            f'/api/v1/titles/{catalog[0].id}/'
+        ).status_code == 204
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 404, (
+            'Проверьте, что удаление произведения меняет ETag его отзывов'
+        )
+
+    def test_comment_added_outside_api_changes_etag(self, api_client,
+                                                    title_reviews):
+        review = title_reviews[0]
+        url = (f'/api/v1/titles/{review.title_id}/reviews/{review.id}'
+               '/comments/')
+        etag = api_client.get(url)['ETag']
+        review.comments.create(author=review.author, text='Комментарий')
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что новый комментарий меняет ETag, даже если он '
+            'создан не через API'
+        )
+
+    def test_rebuild_changes_etag(self, api_client, catalog):
+        etag = api_client.get('/api/v1/titles/')['ETag']
+        Title.objects.filter(pk=catalog[0].pk).update(rating_sum=7,
+                                                      rating_count=1)
+        call_command('rebuildratings', stdout=io.StringIO())
+        response = api_client.get('/api/v1/titles/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что пересчет рейтинга меняет ETag произведений'
+        )
+
+    def test_admin_save_changes_etag(self, client, api_client, catalog):
+        etag = api_client.get('/api/v1/genres/')['ETag']
+        client.force_login(User.objects.create_superuser(
+            'root', 'root@yamdb.fake', 'password'
+        ))
+        response = client.post(
+            '/admin/reviews/genre/add/', {'name': 'Новый', 'slug': 'new'}
+        )
+        assert response.status_code == 302
+        response = api_client.get('/api/v1/genres/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что изменения в админке меняют ETag'
+        )
+        assert 'new' in [genre['slug'] for genre in response.data['results']]
@@ -0,0 +1,29 @@
+import pytest
+from django.db import InterfaceError, connection
+
+
+@pytest.fixture
+def broken_connection():
+    if connection.vendor != 'postgresql':
+        pytest.skip('is_usable проверяет соединение только в PostgreSQL')
+    connection.ensure_connection()
+    # соединение, разорванное базой или пулером между запросами
+    connection.connection.close()
+    yield connection
+    connection.close()
+
+
+@pytest.mark.django_db(transaction=True)
+class TestConnectionHealthChecks:
+
+    def test_broken_connection_is_replaced(self, api_client,
+                                           broken_connection):
+        assert api_client.get('/api/v1/categories/').status_code == 200, (
+            'Проверьте, что разорванное соединение заменяется новым'
+        )
+
+    def test_health_checks_disabled(self, api_client, broken_connection,
+                                    settings):
+        settings.DB_CONN_HEALTH_CHECKS = False
+        with pytest.raises(InterfaceError):
+            api_client.get('/api/v1/categories/')
@@ -0,0 +1,84 @@
+import csv
+import io
+import json
+from datetime import timedelta
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.utils import timezone
+from reviews.models import Review, Title, User
+
+EXPORT_URL = '/api/v1/export/{}/'
+
+
+def read_stream(response):
+    assert response.streaming, (
+        'Проверьте, что выгрузка отдается потоком'
+    )
+    return b''.join(response.streaming_content).decode()
+
+
+@pytest.mark.django_db
+class TestExport:
+
+    def test_admin_only(self, api_client, authorize):
+        assert api_client.get(EXPORT_URL.format('titles')).status_code == 401
+        authorize('user')
+        assert api_client.get(EXPORT_URL.format('titles')).status_code == 403
+
+    def test_titles_ndjson(self, api_client, authorize, catalog):
+        authorize('admin', User.ADMIN)
+        response = api_client.get(EXPORT_URL.format('titles'))
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('application/x-ndjson')
+        rows = [json.loads(line) for line in read_stream(response).split('\n')
+                if line]
+        assert [row['id'] for row in rows] == sorted(
+            title.id for title in catalog
+        )
+        assert rows[0]['category'] == catalog[0].category.slug
+
+    def test_reviews_csv_since(self, api_client, authorize, title_reviews):
+        authorize('admin', User.ADMIN)
+        old = timezone.now() - timedelta(days=30)
+        Review.objects.filter(
+            id__in=[review.id for review in title_reviews[:4]]
+        ).update(pub_date=old)
+        response = api_client.get(EXPORT_URL.format('reviews'), {
+            'format': 'csv',
+            'since': (old + timedelta(days=1)).date().isoformat(),
+        })
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/csv')
+        header, *rows = csv.reader(io.StringIO(read_stream(response)))
+        assert header == [
+            'id', 'title_id', 'author', 'text', 'score', 'pub_date'
+        ]
+        assert [int(row[0]) for row in rows] == [
+            review.id for review in title_reviews[4:]
+        ], 'Проверьте, что since оставляет только новые записи'
+        assert rows[0][2] == title_reviews[4].author.username
+
+    @pytest.mark.parametrize('name, params, status', [
+        ('titles', {'since': '2020-01-01'}, 400),
+        ('reviews', {'since': 'вчера'}, 400),
+        ('users', {}, 404),
+    ])
+    def test_errors(self, api_client, authorize, name, params, status):
+        authorize('admin', User.ADMIN)
+        response = api_client.get(EXPORT_URL.format(name), params)
+        assert response.status_code == status
+
+    def test_command(self, title_reviews, tmp_path):
+        stdout = io.StringIO()
+        call_command('exportdata', 'comments', stdout=stdout)
+        rows = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        assert len(rows) == title_reviews[0].comments.count()
+        assert rows[0]['title_id'] == title_reviews[0].title_id
+        output = tmp_path / 'titles.csv'
+        call_command('exportdata', 'titles', '--format', 'csv',
+                     '--output', str(output), '--chunk-size', '5')
+        with open(output, encoding='utf-8', newline='') as file:
+            assert len(list(csv.reader(file))) == Title.objects.count() + 1
+        with pytest.raises(CommandError):
+            call_command('exportdata', 'titles', '--since', '2020-01-01')
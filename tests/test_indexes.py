@@ -0,0 +1,33 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from reviews.management.commands.explainapi import explain
+
+
+@pytest.mark.django_db
+class TestIndexes:
+
+    def test_title_genre_unique(self, catalog):
+        from reviews.models import TitleGenre
+
+        link = TitleGenre.objects.first()
+        with pytest.raises(IntegrityError), transaction.atomic():
+            TitleGenre.objects.create(
+                title_id=link.title_id, genre_id=link.genre_id
+            )
+
+    def test_explain_reports_seq_scan(self, catalog):
+        _, tables = explain(connection, 'SELECT * FROM reviews_title')
+        assert tables == ['reviews_title']
+
+    def test_explainapi(self, title_reviews):
+        out = StringIO()
+        call_command('explainapi', '--min-rows', '1000000', stdout=out)
+        lines = out.getvalue().splitlines()
+        for name in ('titles', 'reviews', 'comments', 'comments-detail'):
+            assert any(
+                line.startswith(f'{name} /api/v1/') and ': 200,' in line
+                for line in lines
+            ), f'Проверьте, что explainapi проверяет ресурс {name}'
@@ -0,0 +1,82 @@
+import csv
+import io
+
+import pytest
+from django.db import connection, transaction
+from django.db.utils import IntegrityError
+from reviews.ingest import save_rows
+from reviews.models import Category, Title
+
+CATEGORIES_CSV = (
+    'id,name,slug\n'
+    '1,Фильм,movie\n'
+    '2,"Книга, ""бумажная""",book\n'
+)
+TITLES_CSV = (
+    'id,name,year,category_id\n'
+    '1,Произведение,2001,1\n'
+    '2,Без категории,2002,\n'
+)
+
+
+def read_csv(text):
+    """Колонки и строки CSV в том виде, в каком их передает loadtestdata."""
+    reader = csv.reader(io.StringIO(text))
+    return next(reader), list(reader)
+
+
+def load(model, text, update=False, use_copy=False):
+    columns, rows = read_csv(text)
+    save_rows(model, columns, rows, update, use_copy)
+
+
+@pytest.fixture(params=[False, True], ids=['orm', 'copy'])
+def use_copy(request):
+    if request.param and connection.vendor != 'postgresql':
+        pytest.skip('COPY поддерживается только в PostgreSQL')
+    return request.param
+
+
+@pytest.mark.django_db
+class TestSaveRows:
+
+    def test_rows_are_saved(self, use_copy):
+        load(Category, CATEGORIES_CSV, use_copy=use_copy)
+        assert list(
+            Category.objects.order_by('id').values_list('id', 'name', 'slug')
+        ) == [(1, 'Фильм', 'movie'), (2, 'Книга, "бумажная"', 'book')], (
+            'Проверьте, что значения строк сохраняются без изменений'
+        )
+
+    def test_missing_fields_get_defaults(self, use_copy):
+        load(Category, CATEGORIES_CSV, use_copy=use_copy)
+        load(Title, TITLES_CSV, use_copy=use_copy)
+        titles = list(Title.objects.order_by('id'))
+        assert [title.category_id for title in titles] == [1, None], (
+            'Проверьте, что пустое значение nullable-поля становится NULL'
+        )
+        for title in titles:
+            assert title.description == ''
+            assert (title.rating_sum, title.rating_count) == (0, 0)
+
+    def test_duplicate_without_update(self, use_copy):
+        load(Category, CATEGORIES_CSV, use_copy=use_copy)
+        with pytest.raises(IntegrityError), transaction.atomic():
+            load(Category, CATEGORIES_CSV, use_copy=use_copy)
+
+    def test_upsert_overwrites(self, use_copy):
+        load(Category, CATEGORIES_CSV, use_copy=use_copy)
+        load(
+            Category,
+            'id,name,slug\n2,Книга,books\n3,Музыка,music\n',
+            update=True, use_copy=use_copy
+        )
+        assert list(
+            Category.objects.order_by('id').values_list('id', 'name', 'slug')
+        ) == [
+            (1, 'Фильм', 'movie'), (2, 'Книга', 'books'),
+            (3, 'Музыка', 'music'),
+        ], (
+            'Проверьте, что upsert обновляет существующие строки и '
+            'добавляет новые'
+        )
@@ -0,0 +1,173 @@
+import io
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from reviews.management.commands.loadtestdata import (DATA_FILES,
+                                                      get_import_stages)
+from reviews.models import (Category, Comment, ImportCheckpoint, Review, Title,
+                            TitleGenre, User)
+
+DATA = {
+    'users.csv': (
+        'id,username,email,role,bio,first_name,last_name\n'
+        '100,alice,alice@yamdb.fake,user,,,\n'
+        '101,bob,bob@yamdb.fake,moderator,,,\n'
+        '102,carol,carol@yamdb.fake,admin,,,\n'
+    ),
+    'category.csv': 'id,name,slug\n1,Фильм,movie\n2,Книга,book\n',
+    'titles.csv': (
+        'id,name,year,category\n'
+        '1,Фильм,1994,1\n'
+        '2,Книга,2001,\n'
+    ),
+    'review.csv': (
+        'id,title_id,text,author,score,pub_date\n'
+        '1,1,"Отзыв\nв две строки",100,8,2019-09-24T21:08:21.567Z\n'
+        '2,1,Отзыв,101,6,2019-09-24T21:08:21.567Z\n'
+    ),
+    'comments.csv': (
+        'id,review_id,text,author,pub_date\n'
+        '1,1,Комментарий,102,2020-01-13T23:20:02.422Z\n'
+    ),
+    'genre.csv': 'id,name,slug\n1,Драма,drama\n',
+    'genre_title.csv': 'id,title_id,genre_id\n1,1,1\n2,2,1\n',
+}
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    """Каталог с небольшим набором CSV; файлы можно переписать в тесте."""
+    def write(**files):
+        for name, text in {**DATA, **files}.items():
+            (tmp_path / name).write_text(text, encoding='utf-8')
+        return str(tmp_path)
+
+    return write
+
+
+def load(data_dir, **options):
+    stdout = io.StringIO()
+    call_command('loadtestdata', data_dir=data_dir, stdout=stdout, **options)
+    return stdout.getvalue()
+
+
+@pytest.mark.django_db
+class TestLoadTestData:
+
+    def test_import(self, data_dir):
+        load(data_dir())
+        assert User.objects.count() == 3
+        assert list(
+            Title.objects.order_by('id').values_list('id', 'category_id')
+        ) == [(1, 1), (2, None)]
+        assert Review.objects.get(pk=1).text == 'Отзыв\nв две строки'
+        assert Comment.objects.get().author.username == 'carol'
+        assert TitleGenre.objects.count() == 2
+        title = Title.objects.get(pk=1)
+        assert (title.rating_sum, title.rating_count) == (14, 2), (
+            'Проверьте, что после импорта рейтинг пересчитывается'
+        )
+
+    def test_batches(self, data_dir):
+        output = load(data_dir(), batch_size=2, verbosity=2)
+        assert 'users.csv: 2 строк' in output
+        assert 'users.csv: 3 строк' in output, (
+            'Проверьте, что строки вставляются пачками по --batch-size'
+        )
+        assert User.objects.count() == 3
+
+    def test_missing_foreign_key(self, data_dir):
+        path = data_dir(**{'review.csv': (
+            'id,title_id,text,author,score,pub_date\n'
+            '1,1,Отзыв,100,8,2019-09-24T21:08:21.567Z\n'
+            '2,9,Отзыв,101,6,2019-09-24T21:08:21.567Z\n'
+        )})
+        with pytest.raises(CommandError, match='Строка 3 файла review.csv'):
+            load(path)
+
+    @pytest.mark.parametrize('file, text', [
+        ('titles.csv', 'id,name,year,category\n1,Фильм,1994,first\n'),
+        ('category.csv', 'id,name,slug\n1,Фильм,movie\nx,Книга,book\n'),
+    ])
+    def test_malformed_id(self, data_dir, file, text):
+        with pytest.raises(CommandError, match=f'Строка \\d файла {file}'):
+            load(data_dir(**{file: text}))
+
+    def test_sequences_are_reset(self, data_dir):
+        load(data_dir())
+        category = Category.objects.create(name='Музыка', slug='music')
+        assert category.id == 3, (
+            'Проверьте, что после импорта с явными id новые записи '
+            'получают следующие id'
+        )
+
+
+def test_import_stages():
+    stages = get_import_stages()
+    stage_of = {
+        file: index for index, files in enumerate(stages) for file in files
+    }
+    assert sorted(stage_of) == sorted(file for file, _, _ in DATA_FILES)
+    assert sorted(stages[0]) == ['category.csv', 'genre.csv', 'users.csv'], (
+        'Проверьте, что независимые файлы загружаются на первом этапе'
+    )
+    model_files = {model: file for file, model, _ in DATA_FILES}
+    for file, _, foreign_keys in DATA_FILES:
+        for _, related in foreign_keys.values():
+            assert stage_of[model_files[related]] < stage_of[file], (
+                f'Проверьте, что {file} загружается после файлов, '
+                'на которые ссылается'
+            )
+
+
+@pytest.mark.django_db
+class TestLoadTestDataModes:
+
+    def test_second_run_fails(self, data_dir):
+        path = data_dir()
+        load(path)
+        with pytest.raises(CommandError, match='--resume'):
+            load(path)
+
+    def test_resume_continues_file(self, data_dir):
+        # первая пачка users.csv загружена, импорт прерван
+        User.objects.create(id=100, username='alice',
+                            email='alice@yamdb.fake')
+        ImportCheckpoint.objects.create(file='users.csv', rows=1)
+        output = load(data_dir(), resume=True, batch_size=1)
+        assert 'продолжен со строки 2' in output
+        assert list(
+            User.objects.order_by('id').values_list('id', flat=True)
+        ) == [100, 101, 102], (
+            'Проверьте, что --resume не загружает строки повторно'
+        )
+        assert ImportCheckpoint.objects.get(file='users.csv').completed
+
+    def test_resume_skips_completed(self, data_dir):
+        path = data_dir()
+        load(path)
+        output = load(path, resume=True)
+        assert output.count('уже импортирован') == len(DATA_FILES)
+
+    def test_upsert_updates_rows(self, data_dir):
+        load(data_dir())
+        load(data_dir(**{
+            'category.csv': 'id,name,slug\n1,Кино,movie\n2,Книга,book\n'
+        }), upsert=True)
+        assert Category.objects.get(pk=1).name == 'Кино', (
+            'Проверьте, что --upsert обновляет существующие записи'
+        )
+        assert Category.objects.count() == 2
+        assert User.objects.count() == 3
+
+
+@pytest.mark.django_db(transaction=True)
+def test_parallel_workers(data_dir):
+    if connection.vendor == 'sqlite':
+        pytest.skip('SQLite импортирует в одном процессе')
+    load(data_dir(), workers=3)
+    assert User.objects.count() == 3
+    assert Comment.objects.count() == 1
+    assert TitleGenre.objects.count() == 2
@@ -0,0 +1,63 @@
+from datetime import timedelta
+
+import pytest
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from reviews.models import OutboxEmail
+
+SIGNUP = {'username': 'newcomer', 'email': 'newcomer@yamdb.fake'}
+
+
+class FailingBackend(BaseEmailBackend):
+    def send_messages(self, messages):
+        raise ConnectionError('SMTP недоступен')
+
+
+@pytest.fixture
+def locmem_mail(settings):
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+
+
+@pytest.mark.django_db
+class TestMailQueue:
+
+    def test_signup_enqueues_email(self, api_client, locmem_mail):
+        response = api_client.post('/api/v1/auth/signup/', SIGNUP)
+        assert response.status_code == 200
+        assert not mail.outbox, (
+            'Проверьте, что регистрация не отправляет письмо в запросе'
+        )
+        email = OutboxEmail.objects.get()
+        assert email.recipient == SIGNUP['email']
+        assert email.status == OutboxEmail.PENDING
+
+    def test_worker_sends_queued_email(self, api_client, locmem_mail):
+        api_client.post('/api/v1/auth/signup/', SIGNUP)
+        call_command('sendqueuedmail', '--once', '--threads', '2')
+        assert [message.to for message in mail.outbox] == [
+            [SIGNUP['email']]
+        ]
+        email = OutboxEmail.objects.get()
+        assert email.status == OutboxEmail.SENT
+        assert email.sent is not None and email.attempts == 1
+
+    def test_failed_delivery_is_retried_with_backoff(self, api_client,
+                                                     settings):
+        settings.EMAIL_BACKEND = 'tests.test_mail_queue.FailingBackend'
+        api_client.post('/api/v1/auth/signup/', SIGNUP)
+        call_command('sendqueuedmail', '--once', '--max-attempts', '2')
+        email = OutboxEmail.objects.get()
+        assert email.status == OutboxEmail.PENDING
+        assert email.attempts == 1
+        assert 'SMTP' in email.last_error
+        assert email.next_attempt > email.created + timedelta(seconds=20), (
+            'Проверьте, что повторная отправка откладывается'
+        )
+        # попытка еще не наступила, повторной отправки нет
+        call_command('sendqueuedmail', '--once', '--max-attempts', '2')
+        assert OutboxEmail.objects.get().attempts == 1
+        OutboxEmail.objects.update(next_attempt=email.created)
+        call_command('sendqueuedmail', '--once', '--max-attempts', '2')
+        email = OutboxEmail.objects.get()
+        assert (email.status, email.attempts) == (OutboxEmail.FAILED, 2)
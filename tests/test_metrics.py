@@ -0,0 +1,82 @@
+import logging
+
+import pytest
+from api import metrics
+from reviews.models import User
+
+METRICS_URL = '/api/v1/metrics/'
+
+
+@pytest.fixture(autouse=True)
+def clear_metrics():
+    metrics.registry.clear()
+
+
+def get_sample(text, name, **labels):
+    prefix = '{}{{{}}} '.format(name, ','.join(
+        f'{label}="{value}"' for label, value in sorted(labels.items())
+    ))
+    for line in text.splitlines():
+        if line.startswith(prefix):
+            return float(line[len(prefix):])
+    return None
+
+
+@pytest.mark.django_db
+class TestMetrics:
+
+    def test_admin_only(self, api_client, authorize):
+        assert api_client.get(METRICS_URL).status_code == 401
+        authorize('user')
+        assert api_client.get(METRICS_URL).status_code == 403
+
+    def test_requests_are_recorded(self, api_client, authorize, catalog):
+        for _ in range(2):
+            api_client.get('/api/v1/titles/')
+        api_client.get(f'/api/v1/titles/{catalog[0].id}/stats/')
+        api_client.get('/api/v1/missing/')
+        authorize('admin', User.ADMIN)
+        response = api_client.get(METRICS_URL)
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain')
+        text = response.content.decode()
+        assert get_sample(
+            text, 'yamdb_requests_total', view='TitleViewSet.list',
+            method='GET', status='200'
+        ) == 2, 'Проверьте, что запросы считаются по вьюсету и действию'
+        assert get_sample(
+            text, 'yamdb_requests_total', view='TitleViewSet.stats',
+            method='GET', status='200'
+        ) == 1
+        assert get_sample(
+            text, 'yamdb_requests_total', view=metrics.UNRESOLVED_VIEW,
+            method='GET', status='404'
+        ) == 1
+        assert get_sample(
+            text, 'yamdb_request_sql_queries_count', view='TitleViewSet.list'
+        ) == 2
+        assert get_sample(
+            text, 'yamdb_request_sql_queries_sum', view='TitleViewSet.list'
+        ) >= 2, 'Проверьте, что считаются SQL-запросы'
+        assert get_sample(
+            text, 'yamdb_request_duration_seconds_bucket',
+            view='TitleViewSet.list', le='+Inf'
+        ) == 2
+        assert get_sample(
+            text, 'yamdb_response_size_bytes_count', view='TitleViewSet.list'
+        ) == 2
+
+    def test_slow_request_log(self, api_client, catalog, settings, caplog):
+        settings.SLOW_REQUEST_MS = 0.001
+        with caplog.at_level(logging.WARNING, logger='api.slow_requests'):
+            api_client.get('/api/v1/titles/')
+        message = caplog.records[0].getMessage()
+        assert 'TitleViewSet.list' in message
+        assert 'SELECT' in message, (
+            'Проверьте, что в лог медленных запросов попадает SQL'
+        )
+
+    def test_disabled(self, api_client, catalog, settings):
+        settings.METRICS_ENABLED = False
+        api_client.get('/api/v1/titles/')
+        assert 'TitleViewSet' not in metrics.render()
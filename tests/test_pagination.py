@@ -0,0 +1,74 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from reviews.models import Review
+
+
+@pytest.mark.django_db
+class TestKeysetPagination:
+
+    def collect(self, api_client, url):
+        ids = []
+        while url:
+            response = api_client.get(url)
+            assert response.status_code == 200
+            assert 'count' not in response.data, (
+                'Проверьте, что постраничный вывод по курсору не считает '
+                'общее количество записей'
+            )
+            ids.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_reviews_cursor_pages(self, api_client, title_reviews):
+        title_id = title_reviews[0].title_id
+        ids = self.collect(
+            api_client,
+            f'/api/v1/titles/{title_id}/reviews/?pagination=cursor'
+        )
+        assert len(ids) == len(set(ids)) == len(title_reviews), (
+            'Проверьте, что курсор проходит все отзывы без пропусков и '
+            'повторов'
+        )
+        expected = list(
+            Review.objects.filter(title_id=title_id)
+            .order_by('-pub_date', '-id').values_list('id', flat=True)
+        )
+        assert ids == expected
+
+    def test_comments_cursor_pages(self, api_client, title_reviews):
+        review = title_reviews[0]
+        ids = self.collect(
+            api_client,
+            f'/api/v1/titles/{review.title_id}/reviews/{review.id}'
+            '/comments/?pagination=cursor'
+        )
+        assert len(ids) == len(set(ids)) == review.comments.count()
+
+    def test_cursor_page_has_no_count_query(self, api_client,
+                                            title_reviews):
+        title_id = title_reviews[0].title_id
+        url = f'/api/v1/titles/{title_id}/reviews/?pagination=cursor'
+        next_url = api_client.get(url).data['next']
+        with CaptureQueriesContext(connection) as context:
+            api_client.get(next_url)
+        # COUNT(*) пагинатора, а не проверка ETag по числу отзывов
+        assert not any(
+            '"__count"' in query['sql']
+            for query in context.captured_queries
+        )
+
+    def test_invalid_cursor(self, api_client, title_reviews):
+        title_id = title_reviews[0].title_id
+        response = api_client.get(
+            f'/api/v1/titles/{title_id}/reviews/?cursor=bad'
+        )
+        assert response.status_code == 404
+
+    def test_page_number_is_default(self, api_client, title_reviews):
+        title_id = title_reviews[0].title_id
+        response = api_client.get(f'/api/v1/titles/{title_id}/reviews/')
+        assert response.data['count'] == len(title_reviews), (
+            'Проверьте, что по умолчанию сохранен постраничный вывод '
+            'по номерам страниц'
+        )
@@ -0,0 +1,150 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.pagination import PageNumberPagination
+from reviews.models import User
+
+
+@pytest.mark.django_db
+class TestTitleQueryCount:
+    # COUNT(*) для пагинации, выборка страницы с категориями, жанры
+    LIST_QUERIES = 3
+    DETAIL_QUERIES = 2
+
+    @pytest.mark.parametrize('params', [
+        {},
+        {'page': 2},
+        {'genre': 'genre-1'},
+        {'category': 'category-1'},
+        {'name': 'Произведение', 'year': 2003},
+        {'search': 'Произведение'},
+    ])
+    def test_titles_list(self, api_client, catalog, slug_cache,
+                         django_assert_num_queries, params):
+        with django_assert_num_queries(self.LIST_QUERIES):
+            response = api_client.get('/api/v1/titles/', params)
+        assert response.status_code == 200, (
+            'Проверьте, что список произведений доступен без авторизации'
+        )
+        assert response.data['results'], (
+            f'Проверьте, что фильтр {params} возвращает произведения'
+        )
+
+    def test_titles_list_does_not_depend_on_page_size(
+            self, api_client, catalog, django_assert_num_queries,
+            monkeypatch):
+        monkeypatch.setattr(PageNumberPagination, 'page_size', len(catalog))
+        with django_assert_num_queries(self.LIST_QUERIES):
+            response = api_client.get('/api/v1/titles/')
+        assert len(response.data['results']) == len(catalog)
+
+    def test_titles_genre_filter_has_no_duplicates(self, api_client,
+                                                   catalog):
+        response = api_client.get('/api/v1/titles/', {'genre': 'genre-0'})
+        ids = [title['id'] for title in response.data['results']]
+        assert len(ids) == len(set(ids)), (
+            'Проверьте, что фильтр по жанру не дублирует произведения'
+        )
+
+    def test_title_detail(self, api_client, catalog,
+                          django_assert_num_queries):
+        title = catalog[-1]
+        with django_assert_num_queries(self.DETAIL_QUERIES):
+            response = api_client.get(f'/api/v1/titles/{title.id}/')
+        assert response.status_code == 200
+        assert len(response.data['genre']) == title.genre.count()
+
+
+@pytest.mark.django_db
+class TestFeedQueryCount:
+    # родитель, агрегат для ETag, COUNT для пагинации, страница с авторами
+    LIST_QUERIES = 4
+    # родитель, агрегат для ETag, запись с автором
+    DETAIL_QUERIES = 3
+
+    def get_urls(self, review):
+        reviews_url = f'/api/v1/titles/{review.title_id}/reviews/'
+        comments_url = f'{reviews_url}{review.id}/comments/'
+        return {
+            'reviews': (reviews_url, review.id),
+            'comments': (comments_url, review.comments.first().id),
+        }
+
+    @pytest.mark.parametrize('resource', ['reviews', 'comments'])
+    def test_list_does_not_depend_on_page_size(
+            self, api_client, title_reviews, django_assert_num_queries,
+            monkeypatch, resource):
+        url, _ = self.get_urls(title_reviews[0])[resource]
+        for page_size in (5, len(title_reviews)):
+            monkeypatch.setattr(PageNumberPagination, 'page_size', page_size)
+            with django_assert_num_queries(self.LIST_QUERIES):
+                response = api_client.get(url)
+            assert len(response.data['results']) == page_size
+            assert all(item['author'] for item in response.data['results'])
+
+    @pytest.mark.parametrize('resource', ['reviews', 'comments'])
+    def test_detail(self, api_client, title_reviews,
+                    django_assert_num_queries, resource):
+        url, pk = self.get_urls(title_reviews[0])[resource]
+        with django_assert_num_queries(self.DETAIL_QUERIES):
+            response = api_client.get(f'{url}{pk}/')
+        assert response.data['author'].startswith('reviewer-')
+
+    def test_permission_does_not_load_author(
+            self, api_client, authorize, title_reviews,
+            django_assert_num_queries):
+        author = authorize('moderator', User.MODERATOR)
+        url, pk = self.get_urls(title_reviews[0])['comments']
+        with django_assert_num_queries(self.DETAIL_QUERIES + 1):
+            response = api_client.get(f'{url}{pk}/')
+        assert response.status_code == 200
+        response = api_client.patch(f'{url}{pk}/', {'text': 'Правка'})
+        assert response.status_code == 200, (
+            'Проверьте, что модератор может редактировать комментарии'
+        )
+        comment = api_client.post(url, {'text': 'Свой'}).data
+        with CaptureQueriesContext(connection) as context:
+            response = api_client.patch(
+                f'{url}{comment["id"]}/', {'text': 'Правка'}
+            )
+        assert response.status_code == 200
+        assert response.data['author'] == author.username
+        user_queries = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('SELECT')
+            and f'FROM "{User._meta.db_table}"' in query['sql']
+        ]
+        # только аутентификация
+        assert len(user_queries) == 1, user_queries
+
+    def test_review_create_resolves_title_once(
+            self, api_client, authorize, catalog):
+        authorize('critic')
+        url = f'/api/v1/titles/{catalog[0].id}/reviews/'
+        with CaptureQueriesContext(connection) as context:
+            response = api_client.post(url, {'text': 'Отзыв', 'score': 5})
+        assert response.status_code == 201
+        statements = [
+            query['sql'] for query in context.captured_queries
+            if 'SAVEPOINT' not in query['sql']
+        ]
+        insert = next(
+            i for i, sql in enumerate(statements) if sql.startswith('INSERT')
+        )
+        # пользователь из токена и произведение
+        assert insert == 2, statements[:insert]
+        response = api_client.post(url, {'text': 'Еще', 'score': 5})
+        assert response.status_code == 400, (
+            'Проверьте, что повторный отзыв отклоняется'
+        )
+        assert 'non_field_errors' in response.data
+
+    def test_comments_of_review_from_other_title(self, api_client,
+                                                  title_reviews, catalog):
+        review = title_reviews[0]
+        response = api_client.get(
+            f'/api/v1/titles/{catalog[1].id}/reviews/{review.id}/comments/'
+        )
+        assert response.status_code == 404, (
+            'Проверьте, что отзыв ищется в произведении из URL'
+        )
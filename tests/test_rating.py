@@ -0,0 +1,141 @@
+import io
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from reviews.models import Review, Title, TitleStats, User
+
+
+def rating_counters(title):
+    title.refresh_from_db()
+    return title.rating_sum, title.rating_count
+
+
+@pytest.mark.django_db
+class TestRatingCounters:
+
+    def post_review(self, api_client, authorize, title, username, score):
+        """Отзыв от нового пользователя или, без username, от текущего."""
+        if username is not None:
+            authorize(username)
+        response = api_client.post(
+            f'/api/v1/titles/{title.id}/reviews/',
+            {'text': 'Отзыв', 'score': score}
+        )
+        assert response.status_code == 201
+        return f'/api/v1/titles/{title.id}/reviews/{response.data["id"]}/'
+
+    def test_score_update(self, api_client, authorize, catalog):
+        title = catalog[0]
+        url = self.post_review(api_client, authorize, title, 'critic', 7)
+        self.post_review(api_client, authorize, title, 'reader', 5)
+        authorize('moderator', User.MODERATOR)
+        assert api_client.patch(url, {'score': 2}).status_code == 200
+        assert rating_counters(title) == (7, 2), (
+            'Проверьте, что изменение оценки сдвигает сумму оценок'
+        )
+        api_client.patch(url, {'text': 'Без изменения оценки'})
+        assert rating_counters(title) == (7, 2)
+
+    def test_review_delete(self, api_client, authorize, catalog):
+        title = catalog[0]
+        url = self.post_review(api_client, authorize, title, 'critic', 7)
+        self.post_review(api_client, authorize, title, 'reader', 5)
+        authorize('moderator', User.MODERATOR)
+        assert api_client.delete(url).status_code == 204
+        assert rating_counters(title) == (5, 1), (
+            'Проверьте, что удаление отзыва вычитает его оценку'
+        )
+        assert api_client.get(f'/api/v1/titles/{title.id}/').data[
+            'rating'
+        ] == 5
+
+    def test_user_delete(self, api_client, authorize, catalog):
+        self.post_review(api_client, authorize, catalog[0], 'critic', 7)
+        self.post_review(api_client, authorize, catalog[1], None, 3)
+        self.post_review(api_client, authorize, catalog[0], 'reader', 5)
+        authorize('admin', User.ADMIN)
+        response = api_client.delete('/api/v1/users/critic/')
+        assert response.status_code == 204
+        assert rating_counters(catalog[0]) == (5, 1), (
+            'Проверьте, что удаление пользователя вычитает оценки '
+            'его отзывов'
+        )
+        assert rating_counters(catalog[1]) == (0, 0)
+
+    def test_check_detects_mismatch(self, api_client, authorize, catalog):
+        self.post_review(api_client, authorize, catalog[0], 'critic', 7)
+        call_command('rebuildratings', '--check', stdout=io.StringIO())
+        Title.objects.filter(pk=catalog[0].pk).update(rating_sum=100)
+        with pytest.raises(CommandError, match='у 1 произведений'):
+            call_command('rebuildratings', '--check', stdout=io.StringIO())
+        assert rating_counters(catalog[0]) == (100, 1), (
+            'Проверьте, что --check ничего не изменяет'
+        )
+        call_command('rebuildratings', stdout=io.StringIO())
+        assert rating_counters(catalog[0]) == (7, 1)
+
+
+@pytest.mark.django_db
+class TestAdminRatingCounters:
+
+    @pytest.fixture
+    def admin_client(self, client):
+        client.force_login(User.objects.create_superuser(
+            'root', 'root@yamdb.fake', 'password'
+        ))
+        return client
+
+    def test_review_save_and_delete(self, admin_client, catalog):
+        title, other = catalog[0], catalog[1]
+        author = User.objects.create(username='critic',
+                                     email='critic@yamdb.fake')
+        response = admin_client.post('/admin/reviews/review/add/', {
+            'title': title.id, 'text': 'Отзыв', 'author': author.id,
+            'score': 7,
+        })
+        assert response.status_code == 302
+        assert rating_counters(title) == (7, 1), (
+            'Проверьте, что отзыв из админки учитывается в рейтинге'
+        )
+        review = Review.objects.get()
+        response = admin_client.post(
+            f'/admin/reviews/review/{review.id}/change/', {
+                'title': other.id, 'text': 'Отзыв', 'author': author.id,
+                'score': 3,
+            }
+        )
+        assert response.status_code == 302
+        assert rating_counters(title) == (0, 0)
+        assert rating_counters(other) == (3, 1), (
+            'Проверьте, что изменение отзыва в админке пересчитывает '
+            'рейтинг обоих произведений'
+        )
+        assert TitleStats.objects.get(title=other).reviews_count == 1
+        assert TitleStats.objects.get(title=title).reviews_count == 0
+        response = admin_client.post(
+            f'/admin/reviews/review/{review.id}/delete/', {'post': 'yes'}
+        )
+        assert response.status_code == 302
+        assert rating_counters(other) == (0, 0)
+        assert TitleStats.objects.get(title=other).score_3 == 0
+
+    def test_user_delete(self, admin_client, catalog):
+        author = User.objects.create(username='critic',
+                                     email='critic@yamdb.fake')
+        for title, score in ((catalog[0], 7), (catalog[1], 4)):
+            Review.objects.create(title=title, author=author, text='Отзыв',
+                                  score=score)
+        call_command('rebuildratings', stdout=io.StringIO())
+        response = admin_client.post('/admin/reviews/user/', {
+            'action': 'delete_selected', '_selected_action': [author.id],
+            'post': 'yes',
+        })
+        assert response.status_code == 302
+        assert rating_counters(catalog[0]) == rating_counters(
+            catalog[1]
+        ) == (0, 0), (
+            'Проверьте, что удаление пользователя в админке вычитает '
+            'оценки его отзывов'
+        )
+        assert TitleStats.objects.get(title=catalog[0]).reviews_count == 0
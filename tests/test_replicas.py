@@ -0,0 +1,123 @@
+from contextlib import ExitStack
+
+import pytest
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from reviews import routers
+from reviews.models import Title
+
+REPLICAS = {'replica_1': 2, 'replica_2': 1}
+
+
+def add_alias(alias, **settings_dict):
+    connections.databases[alias] = {
+        **connections.databases['default'], **settings_dict
+    }
+
+
+@pytest.fixture
+def replicas(settings):
+    """Реплики - те же тестовые базы под другими именами соединений."""
+    settings.API_CACHE_TIMEOUT = 0
+    settings.DB_REPLICAS = dict(REPLICAS)
+    for alias in REPLICAS:
+        add_alias(alias)
+    yield REPLICAS
+    for alias in REPLICAS:
+        connections[alias].close()
+        delattr(connections._connections, alias)
+        del connections.databases[alias]
+
+
+@pytest.fixture
+def broken_replica(settings):
+    if connections['default'].vendor == 'sqlite':
+        add_alias('replica_broken', NAME='/missing/replica.sqlite3')
+    else:
+        add_alias('replica_broken', NAME='missing_replica')
+    settings.DB_REPLICAS = {'replica_broken': 1}
+    yield 'replica_broken'
+    if hasattr(connections._connections, 'replica_broken'):
+        delattr(connections._connections, 'replica_broken')
+    del connections.databases['replica_broken']
+
+
+def capture(stack, *aliases):
+    return {
+        alias: stack.enter_context(CaptureQueriesContext(connections[alias]))
+        for alias in aliases
+    }
+
+
+def get(api_client, path, *aliases):
+    """Ответ и количество SQL-запросов к каждому соединению."""
+    with ExitStack() as stack:
+        contexts = capture(stack, 'default', *aliases)
+        response = api_client.get(path)
+    return response, {
+        alias: len(context.captured_queries)
+        for alias, context in contexts.items()
+    }
+
+
+@pytest.mark.django_db(transaction=True)
+class TestReplicaRouting:
+
+    def test_reads_go_to_replica(self, api_client, catalog, replicas):
+        response, queries = get(api_client, '/api/v1/titles/', *replicas)
+        assert response.status_code == 200
+        assert response.data['count'] == len(catalog)
+        assert queries['default'] == 0, (
+            'Проверьте, что запросы на чтение каталога идут на реплики'
+        )
+        assert sum(queries[alias] for alias in replicas) > 0
+        assert len([alias for alias in replicas if queries[alias]]) == 1, (
+            'Проверьте, что на весь запрос выбирается одна реплика'
+        )
+
+    def test_weighted_round_robin(self, api_client, catalog, replicas):
+        served = {alias: 0 for alias in replicas}
+        for _ in range(6):
+            _, queries = get(api_client, '/api/v1/genres/', *replicas)
+            for alias in replicas:
+                served[alias] += bool(queries[alias])
+        assert served == {'replica_1': 4, 'replica_2': 2}
+
+    def test_writer_reads_primary(self, api_client, authorize, catalog,
+                                  replicas):
+        authorize('writer')
+        path = f'/api/v1/titles/{catalog[0].id}/reviews/'
+        response = api_client.post(path, {'text': 'Отзыв', 'score': 5})
+        assert response.status_code == 201
+        response, queries = get(api_client, path, *replicas)
+        assert response.data['count'] == 1
+        assert not any(queries[alias] for alias in replicas), (
+            'Проверьте, что после записи пользователь читает '
+            'с основной базы'
+        )
+
+    def test_writes_go_to_primary(self, api_client, authorize, catalog,
+                                  replicas):
+        authorize('writer')
+        with ExitStack() as stack:
+            contexts = capture(stack, *replicas)
+            response = api_client.post(
+                f'/api/v1/titles/{catalog[0].id}/reviews/',
+                {'text': 'Отзыв', 'score': 5}
+            )
+        assert response.status_code == 201
+        assert not any(
+            context.captured_queries for context in contexts.values()
+        )
+
+    def test_fallback_to_primary(self, api_client, catalog, broken_replica):
+        response, queries = get(api_client, '/api/v1/titles/')
+        assert response.status_code == 200
+        assert queries['default'] > 0, (
+            'Проверьте, что при недоступной реплике чтение идет '
+            'с основной базы'
+        )
+        assert routers.get_replicas().down_until.get(broken_replica)
+
+    def test_outside_requests(self, replicas):
+        assert Title.objects.all().db == 'default'
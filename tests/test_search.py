@@ -0,0 +1,90 @@
+import importlib
+
+import pytest
+from django.apps import apps
+from django.db import connection
+from reviews.models import Title
+
+
+@pytest.mark.django_db
+class TestTitleSearch:
+
+    def search(self, api_client, **params):
+        response = api_client.get('/api/v1/titles/', params)
+        assert response.status_code == 200
+        return [title['name'] for title in response.data['results']]
+
+    def test_search_orders_by_relevance(self, api_client, catalog):
+        Title.objects.create(
+            name='Сериал', year=2001, description='Побег из тюрьмы'
+        )
+        Title.objects.create(
+            name='Побег из Шоушенка', year=1994, description='Фильм'
+        )
+        assert self.search(api_client, search='Побег') == [
+            'Побег из Шоушенка', 'Сериал'
+        ], (
+            'Проверьте, что поиск находит совпадения в названии и описании '
+            'и ставит совпадения в названии выше'
+        )
+
+    def test_search_without_matches(self, api_client, catalog):
+        assert self.search(api_client, search='отсутствует') == []
+
+    def test_slug_filters_match_exactly(self, api_client, catalog):
+        assert self.search(api_client, category='category') == [], (
+            'Проверьте, что категория сравнивается по slug целиком'
+        )
+        assert self.search(api_client, genre='genre') == [], (
+            'Проверьте, что жанр сравнивается по slug целиком'
+        )
+        names = self.search(api_client, category='category-1')
+        assert names and all(
+            Title.objects.get(name=name).category.slug == 'category-1'
+            for name in names
+        )
+
+
+@pytest.mark.django_db
+class TestSearchIndexesMigration:
+
+    def index_names(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT indexname FROM pg_indexes "
+                "WHERE tablename = 'reviews_title'"
+            )
+            return {row[0] for row in cursor.fetchall()}
+
+    def test_without_extension_privilege(self, monkeypatch):
+        if connection.vendor != 'postgresql':
+            pytest.skip('Индексы поиска создаются только в PostgreSQL')
+        migration = importlib.import_module(
+            'reviews.migrations.0005_title_search_indexes'
+        )
+        # без прав (или без файлов pg_trgm) CREATE EXTENSION завершается
+        # ошибкой, даже если расширение числится доступным
+        monkeypatch.setattr(
+            migration, 'trigram_available', lambda schema_editor: True
+        )
+        # изменения откатываются вместе с транзакцией теста
+        with connection.cursor() as cursor:
+            cursor.execute('DROP EXTENSION IF EXISTS pg_trgm CASCADE')
+            cursor.execute('DROP INDEX IF EXISTS reviews_title_search_idx')
+            cursor.execute('CREATE ROLE yamdb_limited')
+            cursor.execute('GRANT ALL ON SCHEMA public TO yamdb_limited')
+            cursor.execute('ALTER TABLE reviews_title OWNER TO yamdb_limited')
+            cursor.execute('SET ROLE yamdb_limited')
+        try:
+            with pytest.warns(UserWarning, match='pg_trgm'):
+                with connection.schema_editor() as schema_editor:
+                    migration.create_indexes(apps, schema_editor)
+            indexes = self.index_names()
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute('RESET ROLE')
+        assert 'reviews_title_search_idx' in indexes, (
+            'Проверьте, что без прав на pg_trgm миграция создает '
+            'полнотекстовый индекс'
+        )
+        assert 'reviews_title_name_trgm_idx' not in indexes
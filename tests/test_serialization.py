@@ -0,0 +1,81 @@
+import pytest
+from api import parsers, renderers
+
+LIST_URLS = (
+    '/api/v1/titles/',
+    '/api/v1/titles/?genre=genre-2&page=2',
+    '/api/v1/titles/?search=Произведение',
+    '/api/v1/titles/{title}/reviews/',
+    '/api/v1/titles/{title}/reviews/?pagination=cursor',
+    '/api/v1/titles/{title}/reviews/{review}/comments/?page=2',
+)
+
+
+@pytest.fixture
+def no_cache(settings):
+    settings.API_CACHE_TIMEOUT = 0
+
+
+@pytest.mark.django_db
+class TestSerialization:
+
+    @pytest.mark.parametrize('url', LIST_URLS)
+    def test_lean_lists_match_serializers(self, api_client, settings,
+                                          no_cache, title_reviews, url):
+        review = title_reviews[0]
+        url = url.format(title=review.title_id, review=review.id)
+        responses = []
+        for lean in (True, False):
+            settings.API_LEAN_READS = lean
+            response = api_client.get(url)
+            assert response.status_code == 200
+            responses.append(response.content)
+        assert responses[0] == responses[1], (
+            'Проверьте, что списки из .values() совпадают с выводом '
+            'сериализаторов'
+        )
+
+    def test_lean_titles_with_rating(self, api_client, settings, no_cache,
+                                     title_reviews):
+        from django.core.management import call_command
+
+        call_command('rebuildratings')
+        responses = []
+        for lean in (True, False):
+            settings.API_LEAN_READS = lean
+            responses.append(api_client.get('/api/v1/titles/').content)
+        assert responses[0] == responses[1]
+        assert b'"rating":null' not in responses[0].split(b'},{')[0]
+
+    def test_fallback_without_orjson(self, api_client, authorize,
+                                     monkeypatch, no_cache, catalog):
+        expected = api_client.get('/api/v1/titles/').content
+        monkeypatch.setattr(renderers, 'orjson', None)
+        monkeypatch.setattr(parsers, 'orjson', None)
+        assert api_client.get('/api/v1/titles/').content == expected, (
+            'Проверьте, что orjson и стандартный рендерер дают один ответ'
+        )
+        authorize('admin', 'admin')
+        response = api_client.post(
+            '/api/v1/genres/', {'name': 'Жанр', 'slug': 'new'}, format='json'
+        )
+        assert response.status_code == 201
+
+    def test_invalid_json(self, api_client, authorize):
+        authorize('admin', 'admin')
+        response = api_client.post(
+            '/api/v1/genres/', '{"name": ', content_type='application/json'
+        )
+        assert response.status_code == 400
+
+    def test_errors_with_index_keys(self, api_client, authorize, catalog):
+        # ListField возвращает ошибки элементов по номеру элемента
+        authorize('admin', 'admin')
+        response = api_client.post('/api/v1/titles/bulk/', [{
+            'name': 'Произведение', 'year': 2001, 'description': 'Описание',
+            'category': 'category-1', 'genre': ['bad slug!'],
+        }], format='json')
+        assert response.status_code == 400, (
+            'Проверьте, что ошибки с нестроковыми ключами отдаются как 400'
+        )
+        assert '0' in response.json()['errors'][0]['errors']['genre']
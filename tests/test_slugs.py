@@ -0,0 +1,105 @@
+import pytest
+from api import slugs
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from reviews.models import Category, Genre, Title, User
+
+TITLE = {
+    'name': 'Новое произведение', 'year': 2001, 'description': 'Описание',
+    'category': 'category-1', 'genre': ['genre-0', 'genre-2'],
+}
+
+
+def slug_queries(context):
+    """Запросы id жанров и категорий по слагам."""
+    return [
+        query['sql'] for query in context.captured_queries
+        if any(
+            f'SELECT "{table}"."slug", "{table}"."id"' in query['sql']
+            or f'FROM "{table}" WHERE "{table}"."slug"' in query['sql']
+            for table in ('reviews_genre', 'reviews_category')
+        )
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestSlugCache:
+
+    def test_title_write_does_not_query_slugs(
+            self, api_client, authorize, slug_cache):
+        authorize('admin', User.ADMIN)
+        with CaptureQueriesContext(connection) as context:
+            response = api_client.post('/api/v1/titles/', TITLE,
+                                       format='json')
+        assert response.status_code == 201, response.data
+        assert response.data['category'] == 'category-1'
+        assert not slug_queries(context), (
+            'Проверьте, что слаги жанров и категорий берутся из памяти'
+        )
+
+    def test_filter_does_not_query_slugs(self, api_client, slug_cache):
+        with CaptureQueriesContext(connection) as context:
+            response = api_client.get('/api/v1/titles/', {'genre': 'genre-3'})
+        assert response.data['results']
+        assert not slug_queries(context)
+
+    def test_created_genre_is_visible(self, api_client, authorize,
+                                      slug_cache):
+        authorize('admin', User.ADMIN)
+        response = api_client.post(
+            '/api/v1/genres/', {'name': 'Новый', 'slug': 'new-genre'}
+        )
+        assert response.status_code == 201
+        assert 'new-genre' in slugs.caches[Genre].get_ids(), (
+            'Проверьте, что создание жанра обновляет слаги в памяти'
+        )
+        response = api_client.post(
+            '/api/v1/titles/', {**TITLE, 'genre': ['new-genre']},
+            format='json'
+        )
+        assert response.status_code == 201, response.data
+
+    def test_deleted_category_is_rejected(self, api_client, authorize,
+                                          slug_cache):
+        authorize('admin', User.ADMIN)
+        assert api_client.delete(
+            '/api/v1/categories/category-1/'
+        ).status_code == 204
+        response = api_client.post('/api/v1/titles/', TITLE, format='json')
+        assert response.status_code == 400
+        assert 'category' in response.data
+
+    def test_slug_created_outside_api(self, slug_cache):
+        category = Category.objects.create(name='Вне API', slug='outside')
+        assert slugs.get_id(Category, 'outside') == category.id, (
+            'Проверьте, что слаг, которого нет в памяти, ищется в базе'
+        )
+        assert slugs.get_id(Category, 'missing') is None
+
+    def test_category_deleted_outside_api(self, api_client, authorize,
+                                          slug_cache):
+        authorize('admin', User.ADMIN)
+        slugs.get_ids(Category, ['category-1'])
+        Category.objects.filter(slug='category-1').delete()
+        response = api_client.post('/api/v1/titles/', TITLE, format='json')
+        assert response.status_code == 400, (
+            'Проверьте, что при записи id из памяти сверяются с базой'
+        )
+        assert 'category' in response.data
+        response = api_client.post(
+            '/api/v1/titles/bulk/', [TITLE], format='json'
+        )
+        assert response.status_code == 400
+        assert 'category' in response.data['errors'][0]['errors']
+
+    def test_recreated_genre_is_found(self, api_client, authorize,
+                                      slug_cache):
+        authorize('admin', User.ADMIN)
+        slugs.get_ids(Genre, ['genre-0'])
+        Genre.objects.filter(slug='genre-0').delete()
+        genre = Genre.objects.create(name='Заново', slug='genre-0')
+        response = api_client.post('/api/v1/titles/', TITLE, format='json')
+        assert response.status_code == 201, response.data
+        assert Title.objects.filter(
+            pk=response.data['id'], genre=genre
+        ).exists()
@@ -0,0 +1,87 @@
+import pytest
+from django.core.management import call_command
+from reviews.models import Title, TitleStats, User
+
+
+def expected_histogram(**counts):
+    return {str(score): counts.get(f's{score}', 0) for score in range(1, 11)}
+
+
+@pytest.mark.django_db
+class TestTitleStats:
+
+    def get_stats(self, api_client, title):
+        response = api_client.get(f'/api/v1/titles/{title.id}/stats/')
+        assert response.status_code == 200, (
+            'Проверьте, что статистика произведения доступна без авторизации'
+        )
+        return response.data
+
+    def test_review_and_comment_writes_update_stats(
+            self, api_client, authorize, catalog):
+        title = catalog[0]
+        authorize('critic')
+        reviews_url = f'/api/v1/titles/{title.id}/reviews/'
+        review = api_client.post(
+            reviews_url, {'text': 'Отзыв', 'score': 7}
+        ).data
+        review_url = f'{reviews_url}{review["id"]}/'
+        api_client.post(f'{review_url}comments/', {'text': 'Комментарий'})
+        stats = self.get_stats(api_client, title)
+        assert stats['scores'] == expected_histogram(s7=1)
+        assert (stats['reviews_count'], stats['comments_count']) == (1, 1)
+        assert stats['last_activity'] is not None
+
+        api_client.patch(review_url, {'score': 3})
+        stats = self.get_stats(api_client, title)
+        assert stats['scores'] == expected_histogram(s3=1), (
+            'Проверьте, что изменение оценки переносит отзыв в гистограмме'
+        )
+
+        api_client.delete(review_url)
+        stats = self.get_stats(api_client, title)
+        assert stats['scores'] == expected_histogram()
+        assert (stats['reviews_count'], stats['comments_count']) == (0, 0), (
+            'Проверьте, что удаление отзыва вычитает и его комментарии'
+        )
+
+    def test_stats_of_title_without_activity(self, api_client, catalog):
+        stats = self.get_stats(api_client, catalog[1])
+        assert stats['reviews_count'] == 0
+        assert stats['last_activity'] is None
+        response = api_client.get('/api/v1/titles/0/stats/')
+        assert response.status_code == 404
+
+    def test_rebuild_command(self, api_client, title_reviews):
+        title = title_reviews[0].title
+        call_command('rebuildstats')
+        stats = TitleStats.objects.get(title=title)
+        assert stats.reviews_count == len(title_reviews)
+        assert stats.comments_count == title_reviews[0].comments.count()
+        assert sum(stats.histogram.values()) == len(title_reviews)
+        assert stats.histogram[1] == title_reviews[0].title.reviews.filter(
+            score=1
+        ).count()
+        assert TitleStats.objects.count() == Title.objects.count()
+
+    def test_user_delete_rebuilds_stats(self, api_client, authorize,
+                                        title_reviews):
+        call_command('rebuildratings')
+        call_command('rebuildstats')
+        title = title_reviews[0].title
+        author = title_reviews[0].author
+        authorize('admin', User.ADMIN)
+        api_client.delete(f'/api/v1/users/{author.username}/')
+        stats = TitleStats.objects.get(title=title)
+        assert stats.reviews_count == len(title_reviews) - 1
+        assert stats.comments_count == 0
+
+    def test_stats_are_optional_in_titles(self, api_client, catalog,
+                                          django_assert_num_queries):
+        response = api_client.get('/api/v1/titles/')
+        assert 'stats' not in response.data['results'][0], (
+            'Проверьте, что статистика выводится только по запросу'
+        )
+        with django_assert_num_queries(3):
+            response = api_client.get('/api/v1/titles/', {'stats': 1})
+        assert response.data['results'][0]['stats']['reviews_count'] == 0